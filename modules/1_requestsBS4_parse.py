@@ -1,7 +1,11 @@
 """
 This script is a web scraper designed to extract product data from a specific product page on the Ukrainian e-commerce website Rozetka.
 
-It uses `cloudscraper` and `BeautifulSoup` to bypass Cloudflare protection and parse the HTML content of the page. The script collects key mobile phone product details such as:
+It uses `cloudscraper` and `BeautifulSoup` to bypass Cloudflare protection and parse the HTML content of the page.
+Most fields are read straight from the JSON state embedded into the page (`rz-client-state` / `ld+json`, see `client_state.py`);
+HTML is only parsed for the fields that are missing there and for the "Характеристики" tab (see `product_parser.py`),
+with a selectable backend: `--parser html.parser|lxml|selectolax` (compare them with `benchmark_parsers.py`).
+The script collects key mobile phone product details such as:
 
 - Product name
 - Price (regular and promotional)
@@ -13,215 +17,223 @@ It uses `cloudscraper` and `BeautifulSoup` to bypass Cloudflare protection and p
 - Full product specifications (grouped into sections)
 
 The collected data is:
-1. Saved to an Excel file using a templated workbook (`openpyxl_templates`);
-2. Saved to a Django database, creating a new `Mobile` object (or retrieving one if it already exists);
-3. Saves each photo URL as a `Photo` object linked via ForeignKey to the corresponding `Mobile` entry.
+1. Saved to an Excel file: a templated workbook (`openpyxl_templates`) for a single page, a streaming write-only workbook
+   with one row per product (`--output`) in batch mode;
+2. Saved to a Django database in batches (`parser_app.bulk.upsert_products`): `Mobile` rows are upserted on `product_code`
+   (a price change updates the existing product);
+3. Saves each photo URL as a `Photo` object linked via ForeignKey to the corresponding `Mobile` entry (known photos are skipped).
+
+Batch mode:
+- Pass product URLs as arguments (or a file with `--file`, one URL per line) to scrape many pages in one run.
+- Pages are fetched concurrently by `--workers` threads; each worker keeps one pooled, Cloudflare-cleared
+  `cloudscraper` session for the whole run (see `scraper_pool.py`), and the run reports pages/second.
+- Without arguments the script scrapes the single default `url`, as before.
+
+Search queries can be passed instead of URLs: the first search result (or the product the search redirects to)
+is resolved once and kept in the query -> product URL cache shared with the browser scrapers (`url_cache.py`,
+`--url-cache-ttl`, `--no-url-cache`), so repeated queries fetch the product page directly.
+
+Responses go through an on-disk cache (`http_cache.py`): `--cache on` revalidates stored pages with
+`If-None-Match` / `If-Modified-Since` (`--cache-ttl` seconds skip even that), `--cache only` re-parses stored pages
+without any network access, `--cache off` disables it.
+
+Every product page gets a fingerprint (a hash of its normalized record, stored as `Mobile.fingerprint`). In batch mode
+the stored fingerprints are loaded once; a product whose page hashes the same is counted as unchanged and skipped
+before its characteristics tab is fetched, and is neither written to Excel nor to the database (`--no-skip` turns
+this off, e.g. to pick up specification changes).
+
+Requests go through the shared adaptive rate limiter (`rate_limit.py`, `--rate`, `--max-rate`, `--no-rate-limit`).
+A page that is still blocked after its retries (403/429/503 or a Cloudflare challenge) raises `rate_limit.Blocked`
+instead of being parsed into an empty product; `hybrid_parser.py` escalates such pages to a browser.
+
+Every stage is timed and counted under the `requests` engine (`metrics.py`): `fetch`, `spec_fetch`, `parse`,
+`spec_parse`, the Excel and database writes, bytes downloaded (cache hits are counted apart) and missing fields.
+The summary is printed and saved under `results/metrics/` at the end of the run; while it runs, the numbers are
+served by the Django `/metrics` endpoint.
 
 The script can be used as part of a larger data aggregation or e-commerce monitoring system to collect structured information from product pages.
 """
 
 
+import os
+import re
+import argparse
+from functools import partial
+from urllib.parse import quote_plus, urljoin
+
 import requests
 import cloudscraper
 # from requests.AttributeErrors import ProxyError,ConnectionError,Timeout
-from bs4 import BeautifulSoup
 
 from load_django import *
 from parser_app.models import Photo, Mobile
-from _7_exel_template_write import save_to_exel
+from parser_app.bulk import stored_fingerprints, upsert_products
+from _7_exel_template_write import RESULTS_DIR, ExelExporter, save_to_exel
+from html_backends import BACKENDS, DEFAULT_BACKEND, parse
+from product_parser import FIELDS, fingerprint, parse_product_page, parse_characteristics
+from scraper_pool import fetch_all, get_scraper
+from http_cache import CACHE_MODES, ResponseCache
+from url_cache import DEFAULT_TTL, UrlCache, is_url, read_items
+import rate_limit
+import metrics
 
 
 
 
-data={}
 headers = {
     "User-Agent":"Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/117.0.0.0 Safari/537.36"
 }
 url = "https://rozetka.com.ua/apple-iphone-15-128gb-black/p395460480/"
+SEARCH_URL = "https://rozetka.com.ua/ua/search/?text={}"
+PRODUCT_URL = re.compile(r"/p\d+/?$")
+ENGINE = "requests"
+
+
+def get_page(scraper, url, cache=None, stage="fetch"):
+    with metrics.stage(stage, ENGINE):
+        if cache is None:
+            response = scraper.get(url, headers=headers)
+        else:
+            response = cache.get(scraper, url, headers=headers)
+        # a challenge / throttling page has none of the fields - do not store it as a product
+        if rate_limit.is_blocked(response):
+            raise rate_limit.Blocked(f"{response.status_code} for {url}")
+    if getattr(response, "from_cache", False):
+        metrics.count("cache_hits", engine=ENGINE)
+    else:
+        metrics.count("bytes_downloaded", len(response.content), engine=ENGINE)
+    return response
+
+
+def resolve_query(scraper, query, backend=DEFAULT_BACKEND, cache=None):
+    response = get_page(scraper, SEARCH_URL.format(quote_plus(query)), cache)
+    # an exact match redirects straight to the product page
+    if PRODUCT_URL.search(response.url.split("?")[0]):
+        return response.url.split("?")[0]
+    link = parse(response.text, backend).select_one("ul.catalog-grid > li a")
+    if link is None or not link.attr("href"):
+        raise LookupError(f"Nothing found for {query!r}")
+    return urljoin(response.url, link.attr("href"))
+
+
+def product_url(scraper, item, backend=DEFAULT_BACKEND, cache=None, url_cache=None):
+    if is_url(item):
+        return item, False
+    hit = url_cache.get(item) if url_cache else None
+    if hit:
+        return hit[0], True
+    return resolve_query(scraper, item, backend, cache), False
+
+
+def parse_product(scraper, item, backend=DEFAULT_BACKEND, cache=None, url_cache=None, fingerprints=None):
+    url, cached = product_url(scraper, item, backend, cache, url_cache)
+    response = get_page(scraper, url, cache)
+    if cached and response.status_code == 404:
+        # the product moved - search again
+        url_cache.forget(item)
+        url, _ = product_url(scraper, item, backend, cache, url_cache)
+        response = get_page(scraper, url, cache)
+    with metrics.stage("parse", ENGINE):
+        data, link_c = parse_product_page(response.text, backend)
+        data["fingerprint"] = fingerprint(data)
+    metrics.record_fields(data, ENGINE, FIELDS)
+
+    if url_cache and not is_url(item):
+        url_cache.put(item, url, data.get("product_code"))
+
+    # the product page is exactly as stored - skip the characteristics tab and every write
+    if fingerprints is not None and fingerprints.get(data.get("product_code")) == data["fingerprint"]:
+        data["unchanged"] = True
+        metrics.count("products", engine=ENGINE, outcome="unchanged")
+        return data
+
+    product_specifications = None
+    if link_c:
+        response_c = get_page(scraper, link_c, cache, stage="spec_fetch")
+        with metrics.stage("spec_parse", ENGINE):
+            product_specifications = parse_characteristics(response_c.text, backend)
+    data["product_specifications"] = product_specifications
+    metrics.count("products", engine=ENGINE, outcome="parsed")
+    return data
+
+
+def save_products(records, exporter=None):
+    records = [data for data in records if not data.get("unchanged")]
+    for data in records:
+        if exporter is None:
+            save_to_exel(data,"requestsBS4_parse")
+        else:
+            exporter.write(data)
+    upsert_products(records, stage=metrics.stage)
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Scrape Rozetka product pages with cloudscraper + BeautifulSoup.")
+    arg_parser.add_argument("urls", nargs="*", help="product page URLs or search queries (default: the iPhone 15 page)")
+    arg_parser.add_argument("--file", help="text file with one product URL or search query per line")
+    arg_parser.add_argument("--workers", type=int, default=8, help="number of concurrent workers in batch mode")
+    arg_parser.add_argument("--parser", choices=BACKENDS, default=DEFAULT_BACKEND, help="HTML parser backend (see benchmark_parsers.py)")
+    arg_parser.add_argument("--cache", choices=CACHE_MODES, default="on", help="on-disk response cache: off, on (revalidate), only (no network)")
+    arg_parser.add_argument("--batch-size", type=int, default=100, help="products written to the database per transaction")
+    arg_parser.add_argument("--cache-ttl", type=int, default=0, help="seconds a cached page is used without revalidation")
+    arg_parser.add_argument("--output", default=os.path.join(RESULTS_DIR, "requestsBS4_parse.xlsx"), help="Excel file for batch mode")
+    arg_parser.add_argument("--url-cache-ttl", type=int, default=DEFAULT_TTL, help="seconds a resolved query -> product URL is reused (0: forever)")
+    arg_parser.add_argument("--no-url-cache", action="store_true", help="always search for queries")
+    arg_parser.add_argument("--no-skip", action="store_true", help="parse and write every product, even if its page did not change")
+    rate_limit.add_arguments(arg_parser)
+    args = arg_parser.parse_args()
+
+    metrics.configure("requestsBS4_parse", ENGINE)
+    try:
+        run(args)
+    finally:
+        metrics.finish()
 
 
-scraper = cloudscraper.create_scraper()
-response = scraper.get(url, headers=headers)
-
-soup = BeautifulSoup(response.text, 'html.parser')
-try:
-    data["full_name_of_the_product"] = soup.h1.text.strip()
-except AttributeError:
-    data["full_name_of_the_product"] = None
-
-try:
-    price = soup.find('p', class_='product-price__small')
-    data["regular_price"] = int(price.text.replace('\xa0', '').replace('₴', '').strip())
-except AttributeError:
-    data["regular_price"] = None
-try:
-    data["promotional_price"] =int( price.find_next('p').text.replace('\xa0', '').replace('₴', '').strip())
-except AttributeError:
-    data["promotional_price"] = None
-
-try:
-    var_options = soup.find_all('div', class_='var-options')
-    color_found = None
-    for v in var_options:
-        try:
-            color_span = v.find('p').find('span', string=lambda t: t and "Колір" in t)
-            if color_span:
-                color_found = color_span.find_next('span').text.strip()
-                break
-        except AttributeError:
-            continue
-    data["color"] = color_found
-except AttributeError:
-    data["color"] = None
-
-try:
-    memory_found = None
-    for v in var_options:
-        try:
-            memory_span = v.find('p').find('span', string=lambda t: t and "Вбудована пам'ять" in t)
-            if memory_span:
-                memory_found = memory_span.find_next('span').text.replace('ГБ', '').strip()
-                break
-        except AttributeError:
-            continue
-    data["memory_size"] = int(memory_found)
-except AttributeError:
-    data["memory_size"] = None
-
-try:
-    product_about = soup.find('div', class_='product-about__right')
-    rating_div = product_about.find('div', class_='rating text-base')
-    code_span = rating_div.find('span')
-    data["product_code"] = int(code_span.text.replace('\xa0', '').replace('Код:', '').strip())
-except AttributeError:
-    data["product_code"] = None
-
-try:
-    review_span = soup.find('div', class_="product-comment-rating").find('span', string=lambda t: t and "відгуки" in t)
-    data["number_of_reviews"] = int(review_span.text.replace("відгуки", '').strip())
-except AttributeError:
-    data["number_of_reviews"] = None
-
-try:
-    list_item = soup.find('dl', class_="list").find_all('dt', class_='label')
-    series = None
-    for lst in list_item:
-        span = lst.find('span', string=lambda t: t and "Серія" in t)
-        if span:
-            series = lst.find_next('dd').text.strip()
-            break
-    data["series"] = series
-except AttributeError:
-    data["series"] = None
-
-try:
-    diagonal = None
-    for lst in list_item:
-        span = lst.find('span', string=lambda t: t and "Діагональ екрана" in t)
-        if span:
-            diagonal = lst.find_next('dd').text.strip()
-            break
-    data["screen_diagonal"] = diagonal
-except AttributeError:
-    data["screen_diagonal"] = None
-
-try:
-    resolution = None
-    for lst in list_item:
-        span = lst.find('span', string=lambda t: t and "Роздільна здатність дисплея" in t)
-        if span:
-            resolution = lst.find_next('dd').text.strip()
-            break
-    data["display_resolution"] = resolution
-except AttributeError:
-    data["display_resolution"] = None
-
-try:
-    images = []
-    img_list = soup.find('app-slider', class_="preview-slider").find_all('img')
-    for img in img_list:
-        src = img.attrs.get('src')
-        if src:
-            images.append(src)
-    data["all_product_photos"] = images
-except AttributeError:
-    data["all_product_photos"] = None
-
-try:
-    seller_block = soup.find('p',class_="seller-title")
-    try:
-        seller_name = seller_block.find('a')
-        data["seller"] = seller_name.strip()
-    except Exception:
-        try:
-            seller_name = seller_block.find('img').get('alt')
-            data["seller"] = seller_name.strip()
-        except AttributeError:
-            pass
-    try:
-        seller_block = soup.find('div',class_="comment__vars").find('span', string=lambda t: t and "Продавець:" in t).text
-        data["seller"] = seller_block.replace("Продавець:", '').strip()
+def run(args):
+    cache = ResponseCache(ttl=args.cache_ttl, mode=args.cache) if args.cache != "off" else None
+    url_cache = None if args.no_url_cache else UrlCache(ttl=args.url_cache_ttl)
+    limiter = rate_limit.from_args(args)
 
-    except AttributeError:
-        data["seller"]= None
+    urls = list(args.urls)
+    if args.file:
+        urls += read_items(args.file)
 
-except AttributeError:
-    data["seller"]= None
+    if not urls:
+        data = parse_product(get_scraper(limiter), url, args.parser, cache)
+        print(data)
+        save_products([data])
 
-try:
-    product_specifications = {}
-    try:
-        link_c = soup.find('a', class_="product-characteristics").get('href')
-    except AttributeError:
-        link_c = None
+        mobiles = Mobile.objects.all()
 
-    if link_c:
-        response_c = scraper.get(link_c, headers=headers)
-        soup_c = BeautifulSoup(response_c.text, 'html.parser')
-        sections = soup_c.find('main', class_="product-tabs__content").find_all('section')
-
-        for i, section in enumerate(sections):
-            specs = {}
-            try:
-                divs = section.find_all('div')
-                for div in divs:
-                    dts = div.find_all('dt')
-                    dds = div.find_all('dd')
-                    for dt, dd in zip(dts, dds):
-                        specs[dt.text.strip()] = dd.text.strip()
-                product_specifications[f"product_specification_{i}"] = specs
-            except AttributeError:
+        for mobile in mobiles:
+            print(mobile)
+        return
+
+    fingerprints = None if args.no_skip else stored_fingerprints()
+    handler = partial(parse_product, backend=args.parser, cache=cache, url_cache=url_cache, fingerprints=fingerprints)
+    changed = unchanged = 0
+
+    batch = []
+    with ExelExporter(args.output) as exporter:
+        for page_url, data, error in fetch_all(urls, handler, workers=args.workers, limiter=limiter):
+            if error:
+                print(f"[{page_url}] Error: {error}")
+                metrics.count("errors", engine=ENGINE, error=type(error).__name__)
+                continue
+            if data.get("unchanged"):
+                unchanged += 1
                 continue
-    data["product_specifications"] = product_specifications or None
-except AttributeError:
-    data["product_specifications"] = None
-
-print(data)
-save_to_exel(data,"requestsBS4_parse")
-
-mobile_model,created = Mobile.objects.get_or_create(
-    full_name_of_the_product =data["full_name_of_the_product"],
-    color =data["color"],
-    memory_size = data["memory_size"],
-    seller = data["seller"],
-    regular_price = data["regular_price"],
-    promotional_price = data["promotional_price"],
-    product_code = data["product_code"],
-    number_of_reviews =data["number_of_reviews"],
-    series = data["series"],
-    screen_diagonal = data["screen_diagonal"],
-    display_resolution = data["display_resolution"],
-    product_specifications = data['product_specifications']
-
-)
-for d in data['all_product_photos']:
-    photo,created = Photo.objects.get_or_create(
-        url = d,
-        mobile_id = mobile_model
-
-    )
-
-mobiles = Mobile.objects.all()
-
-for mobile in mobiles:
-    print(mobile)
\ No newline at end of file
+            changed += 1
+            print(data)
+            batch.append(data)
+            if len(batch) >= args.batch_size:
+                save_products(batch, exporter)
+                batch = []
+        if batch:
+            save_products(batch, exporter)
+    print(f"{changed} products new or changed, {unchanged} unchanged (skipped)")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,7 +2,7 @@
 This script automates the process of scraping detailed product information from the Rozetka online store using Selenium and undetected-chromedriver.
 
 Key features:
-- Launches Chrome in undetectable mode to bypass anti-bot detection.
+- Launches Chrome in undetectable mode to bypass anti-bot detection (headless by default, `--no-headless` shows the window).
 - Navigates to Rozetka’s homepage and performs a search for "Apple iPhone 15 128GB Black".
 - Clicks on the first search result and extracts various product data, including:
   - Full name
@@ -14,49 +14,108 @@ Key features:
   - All product image links
   - Full product specifications from the "Характеристики" tab
 
+Every step waits for an explicit `WebDriverWait` condition instead of a fixed `time.sleep(10)`: the search input,
+the first search result, the product URL and title, the characteristics URL and sections.
+Human-like pacing is opt-in and applied once per navigation (`--jitter 3000-5000`, see `pacing.py`).
+Every navigation also waits for a token of the shared, adaptive rate limiter (`rate_limit.py`, `--rate`, `--max-rate`,
+`--no-rate-limit`); WebDriver exposes no status codes, so a product page that does not load is checked for a
+Cloudflare challenge and reported to the limiter, which then backs off for every scraper on the machine.
+
+Every stage is timed and counted under the `selenium` engine (`metrics.py`): `fetch` (opening the product page,
+through the search or by URL), `parse`, `spec_fetch`, `spec_parse`, the Excel writes, the bytes the browser
+transferred (Resource Timing, so cross-origin resources without `Timing-Allow-Origin` count as 0), challenges and
+missing fields. The summary is printed and saved under `results/metrics/` at the end of the run.
+
+Extraction (`--extract`):
+- `script` (default) - one `execute_script` of `extract_product.js` per page returns every field, the image srcs and
+  the specifications dict (see `dom_extraction.py`), instead of a WebDriver HTTP round-trip per element;
+- `elements` - the old way: `find_element` + `.text` per field, per image and per dt/dd.
+Both return the same `data` dict: the elements path reads the same raw strings and converts them with the same
+`product_data`, and numbers the specification sections the same way (see `tests/test_extraction.py`).
+
 Utility functions:
-- `human_typing()` simulates realistic typing delays.
+- `human_typing()` simulates realistic typing delays (only used with `--jitter`).
 - `parse_data()` handles basic element text extraction with safe error handling.
 - `wait_until()` ensures elements are visible before interacting with them.
 
-At the end, all collected data is saved to an Excel file using `save_to_exel()`.
+Pool mode: pass product URLs and/or search queries (or `--file`, one per line). `--workers` threads each own one
+long-lived driver that processes many products and is restarted every `--restart-after` products (to cap Chrome's memory)
+and after a WebDriver error. Products are streamed to one Excel file (`--output`).
+
+Search queries are resolved once: the product URL and code found through the search are kept in a persistent cache
+(`url_cache.py`, `--url-cache-ttl`, `--no-url-cache`), so a repeated query opens the product page directly
+and only falls back to the search when the cached page does not load.
+
+Without arguments the script scrapes the single default query and saves it with `save_to_exel()`.
 
 Requirements:
 - undetected_chromedriver
 - Selenium
 - openpyxl_templates (for saving to Excel)
 """
+import os
 import time
 import random
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.wait import WebDriverWait
-from selenium.common.exceptions import NoSuchElementException,NoSuchAttributeException
+from selenium.common.exceptions import NoSuchElementException,NoSuchAttributeException,TimeoutException,WebDriverException
 import undetected_chromedriver as uc
 from selenium.webdriver.support import expected_conditions as EC
 
-from _7_exel_template_write import save_to_exel
+from _7_exel_template_write import RESULTS_DIR, ExelExporter, save_to_exel
+from xpath_fields import *
+from pacing import Pacing
+from dom_extraction import SELENIUM_SCRIPT, extraction_args, product_data
+from url_cache import DEFAULT_TTL, UrlCache, is_url, read_items
+import rate_limit
+import metrics
 
 
 url = "https://rozetka.com.ua/"
-options = uc.ChromeOptions()
+QUERY = "Apple iPhone 15 128GB Black"
+TIMEOUT = 30
+ENGINE = "selenium"
+# bytes transferred by the document since the last call: the resource entries are cleared after reading them, the
+# navigation entry is counted once per document (the characteristics tab may be opened in the same document)
+TRANSFERRED_JS = """
+const sum = entries => entries.reduce((total, entry) => total + (entry.transferSize || 0), 0);
+const navigation = window.__metricsCounted ? 0 : sum(performance.getEntriesByType("navigation"));
+window.__metricsCounted = true;
+const resources = sum(performance.getEntriesByType("resource"));
+performance.clearResourceTimings();
+return navigation + resources;
+"""
+
+EXTRACT_MODES = ("script", "elements")
+# the same images as the element-by-element path: the first thumbnail list only
+SCRIPT_ARGS = extraction_args(photos=f"({PHOTOS_LIST})[1]/li//img")
 
-# options.add_experimental_option("excludeSwitches", ["enable-automation"])
-# options.add_experimental_option('useAutomationExtension', False)
+PRODUCT_URL = r"/p\d+/?(\?.*)?$"
+CHARACTERISTICS_URL = r"/characteristics/?(\?.*)?$"
 
-options.add_argument("--disable-blink-features=AutomationControlled")
-options.add_argument("--disable-notifications")
-# options.add_argument("--headless")
+# undetected_chromedriver patches the driver binary on start, two threads doing it at once step on each other
+_start_lock = threading.Lock()
 
-options.add_argument("user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/117.0.0.0 Safari/537.36")
-driver = uc.Chrome(options=options)
 
-driver.get(url)
-time.sleep(10)
+def make_driver(headless=True):
+    options = uc.ChromeOptions()
 
-wait = WebDriverWait(driver, 10) 
+    # options.add_experimental_option("excludeSwitches", ["enable-automation"])
+    # options.add_experimental_option('useAutomationExtension', False)
 
-def wait_until(element, timeout=10):
+    options.add_argument("--disable-blink-features=AutomationControlled")
+    options.add_argument("--disable-notifications")
+
+    options.add_argument("user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/117.0.0.0 Safari/537.36")
+    with _start_lock:
+        return uc.Chrome(options=options, headless=headless)
+
+
+def wait_until(driver, element, timeout=10):
     wait = WebDriverWait(driver, timeout)
     wait.until(lambda _ : element.is_displayed())
 
@@ -65,7 +124,7 @@ def human_typing(element, text, min_delay=0.05, max_delay=0.15):
         element.send_keys(char)
         time.sleep(random.uniform(min_delay, max_delay))
 
-def parse_data(element):
+def parse_data(driver, element):
     try:
         element = driver.find_element(By.XPATH, element)
         return element.text.strip()
@@ -75,146 +134,308 @@ def parse_data(element):
         print(f"[parse_data] Error: {e}")
         return None
 
-try:
 
-    text_box = wait.until(EC.presence_of_element_located((By.XPATH, '//input[@name="search"]')))
+def open_by_search(driver, query, pacing):
+    with metrics.stage("fetch", ENGINE):
+        _open_by_search(driver, query, pacing)
+
 
-    wait_until(text_box)
-    human_typing(text_box, "Apple iPhone 15 128GB Black")
+def _open_by_search(driver, query, pacing):
+    wait = WebDriverWait(driver, TIMEOUT)
 
-except NoSuchElementException as e:
-    print(f"Error when try find_element:text_box: {e}")
+    pacing.before_navigation_sync(url)
+    driver.get(url)
 
-try:
-    submit_button = wait.until(EC.element_to_be_clickable((By.XPATH, '//button[contains(text(),"Знайти")]')))
-    wait_until(submit_button)
+    text_box = wait.until(EC.visibility_of_element_located((By.XPATH, SEARCH_INPUT)))
+    if pacing.typing_delay_ms:
+        human_typing(text_box, query)
+    else:
+        text_box.send_keys(query)
 
-    
+    submit_button = wait.until(EC.element_to_be_clickable((By.XPATH, SEARCH_BUTTON)))
+    pacing.before_navigation_sync()
     submit_button.click()
-    time.sleep(10)
 
-except NoSuchElementException as e:
-    print(f"Error when try find_element:submit_button: {e}")
+    first_result_link = wait.until(EC.element_to_be_clickable((By.XPATH, FIRST_SEARCH_RESULT)))
+    pacing.before_navigation_sync()
+    first_result_link.click()
 
+    wait_for_product(driver, pacing)
 
-try:
-    first_result_link = driver.find_element(By.XPATH,'(//ul[@class="catalog-grid"]/li[1]//a)[1]')
-    wait_until(first_result_link)
 
-    first_result_link.click()
+def open_by_url(driver, product_url, pacing):
+    with metrics.stage("fetch", ENGINE):
+        pacing.before_navigation_sync(product_url)
+        driver.get(product_url)
+        wait_for_product(driver, pacing)
 
-except NoSuchElementException as e:
-    print(f"Error when try find_element:first_result: {e}")
 
-time.sleep(10)
+def wait_for_product(driver, pacing=None):
+    wait = WebDriverWait(driver, TIMEOUT)
+    limiter = pacing.limiter if pacing else None
+    try:
+        wait.until(EC.url_matches(PRODUCT_URL))
+        wait.until(EC.visibility_of_element_located((By.XPATH, FIELD_XPATHS["full_name_of_the_product"])))
+    except TimeoutException:
+        if limiter and rate_limit.is_challenge(text=driver.page_source):
+            limiter.record(driver.current_url, challenged=True)
+            metrics.count("challenges", engine=ENGINE)
+        raise
+    if limiter:
+        limiter.record(driver.current_url)
+
+
+def element_text(element):
+    # the same normalisation as `text()` in extract_product.js
+    return element.text.replace("\xa0", "").strip()
+
+
+def read_product(driver):
+    # the raw strings extract_product.js returns, converted by the same `product_data`, so both modes give one dict
+    fields = {}
+    for field, xpath in FIELD_XPATHS.items():
+        try:
+            fields[field] = element_text(driver.find_element(By.XPATH, xpath))
+        except NoSuchElementException:
+            fields[field] = None
+
+    seller = None
+    try:
+        seller_block = driver.find_element(By.XPATH, SELLER_BLOCK)
+        wait_until(driver, seller_block)
+        try:
+            seller = element_text(seller_block.find_element(By.XPATH, './/a'))
+        except NoSuchElementException:
+            try:
+                seller = seller_block.find_element(By.XPATH, './/img').get_attribute('alt')
+            except NoSuchElementException:
+                pass
+    except NoSuchElementException:
+        pass
+
+    images = []
+    try:
+        ul = driver.find_element(By.XPATH, PHOTOS_LIST)
+        images = [img.get_attribute("src") for img in ul.find_elements(By.XPATH, './li//img')]
+    except NoSuchElementException:
+        pass
 
-print("first_result_link.clicked ")
-print("="*50)
+    return product_data({"fields": fields, "seller": seller, "photos": images})
 
-data = {}
 
-data["full_name_of_the_product"] = parse_data('//h1')
+def open_characteristics(driver, pacing, by_click=True):
+    wait = WebDriverWait(driver, TIMEOUT)
 
-data["color"] = parse_data('//div[@class="var-options"]/p/span[contains(text(),"Колір")]/following-sibling::span')
-memory_size_raw = parse_data( '//div[@class="var-options"]/p/span[contains(text(),"Вбудована пам\'ять")]/following-sibling::span') 
-data["memory_size"] = int(memory_size_raw.replace('ГБ', '').strip()) if memory_size_raw else None
-promotional_price_raw =parse_data( '//p[@class="product-price__small"]/following-sibling::p') 
-data["promotional_price"] = int(promotional_price_raw.replace('₴', '').replace('\xa0', '').replace(' ', '').strip()) if promotional_price_raw else None
-regular_price_raw = parse_data( '//p[@class="product-price__small"]') 
-data["regular_price"] = int(regular_price_raw.replace('₴', '').replace('\xa0', '').replace(' ', '').strip()) if regular_price_raw else None
-product_code_raw = parse_data( '//div[@class="product-about__right"]//div[@class="rating text-base"]/span')
-data["product_code"] = int(product_code_raw.replace("Код:", "").strip()) if product_code_raw else None
-number_of_reviews_raw = parse_data( '//div[@class="product-about__right"]//div[@class="rating text-base"]/a')
-data["number_of_reviews"] =int( number_of_reviews_raw.replace("відгуки", "").strip()) if product_code_raw else None
-data["series"] = parse_data( '//dl/div[dt[@class="label" and span[contains(text(),"Серія")]]]/dd')
-data["screen_diagonal"] = parse_data( '//dl/div[dt[@class="label" and span[contains(text(),"Діагональ екрана")]]]/dd')
-data["display_resolution"] = parse_data( '//dl/div[dt[@class="label" and span[contains(text(),"Роздільна здатність дисплея")]]]/dd')
+    pacing.before_navigation_sync()
+    if by_click:
+        link_a = wait.until(EC.element_to_be_clickable((By.XPATH, '//a[contains(text(),"Характеристики")]')))
+        link_a.click()
+    else:
+        # the tab has its own URL, no need to find and click the link
+        driver.get(driver.current_url.split("?")[0].rstrip("/") + "/characteristics/")
 
-print("simple data parsed")
-print("="*50)
+    wait.until(EC.url_matches(CHARACTERISTICS_URL))
 
-try:
-    seller_block = driver.find_element(By.XPATH, '//p[@class="seller-title"]')
-    wait_until(seller_block)
 
+def read_specifications(driver):
+    product_specifications = {}
     try:
-        seller_name = seller_block.find_element(By.XPATH, './/a').text
-    except NoSuchElementException:
-        try:
-            seller_name = seller_block.find_element(By.XPATH, './/img').get_attribute('alt')
-        except NoSuchElementException:
-            seller_name = None
-            
-    data["seller"] = seller_name
+        WebDriverWait(driver, TIMEOUT).until(EC.visibility_of_element_located((By.XPATH, SPEC_SECTIONS)))
+    except TimeoutException:
+        return product_specifications
 
-except NoSuchElementException:
-    seller_name = None
+    # numbered per section, sections without rows left out - as in extract_product.js
+    for i, section in enumerate(driver.find_elements(By.XPATH, SPEC_SECTIONS)):
+        divs = section.find_elements(By.XPATH, './dl/div')
+        if not divs:
+            continue
+        specs = {}
+        for div in divs:
+            for dt, dd in zip(div.find_elements(By.XPATH, './dt'), div.find_elements(By.XPATH, './dd')):
+                specs[dt.text.strip()] = dd.text.strip()
+        product_specifications[f"product_specification_{i}"] = specs
+    return product_specifications
 
 
+def read_product_script(driver):
+    return product_data(driver.execute_script(SELENIUM_SCRIPT, SCRIPT_ARGS))
 
-images = []
 
-try:
-    ul = driver.find_element('xpath','//div[@class="scrollbar__content"]/ul')
-    wait_until(ul)
-except NoSuchElementException as e:
-    ul = None
+def read_specifications_script(driver):
+    try:
+        WebDriverWait(driver, TIMEOUT).until(EC.visibility_of_element_located((By.XPATH, SPEC_SECTIONS)))
+    except TimeoutException:
+        return {}
+    return driver.execute_script(SELENIUM_SCRIPT, SCRIPT_ARGS)["specifications"]
 
 
-if ul:
+def transferred_bytes(driver):
     try:
-        img_list = ul.find_elements(By.XPATH,'./li//img')
-        if img_list and len(img_list) > 0:
-            [wait_until(img) for img in img_list]
+        return driver.execute_script(TRANSFERRED_JS) or 0
+    except WebDriverException:
+        return 0
+
+
+def read_page(driver, pacing, extract, by_click):
+    with metrics.stage("parse", ENGINE):
+        data = read_product_script(driver) if extract == "script" else read_product(driver)
+    metrics.count("bytes_downloaded", transferred_bytes(driver), engine=ENGINE)
+    with metrics.stage("spec_fetch", ENGINE):
+        open_characteristics(driver, pacing, by_click)
+    with metrics.stage("spec_parse", ENGINE):
+        data["product_specifications"] = read_specifications_script(driver) if extract == "script" else read_specifications(driver)
+    metrics.count("bytes_downloaded", transferred_bytes(driver), engine=ENGINE)
+    metrics.record_fields(data, ENGINE)
+    metrics.count("products", engine=ENGINE, outcome="parsed")
+    return data
+
+
+def scrape(driver, item, pacing, extract="script", url_cache=None):
+    # a product URL is opened directly, a query too once it is in the URL cache, anything else goes through the search
+    if is_url(item):
+        open_by_url(driver, item, pacing)
+        return read_page(driver, pacing, extract, by_click=False)
+
+    cached = url_cache.get(item) if url_cache else None
+    if cached:
+        try:
+            open_by_url(driver, cached[0], pacing)
+            return read_page(driver, pacing, extract, by_click=False)
+        except TimeoutException as e:
+            print(f"[{item}] cached {cached[0]} failed, searching again: {e}")
+            url_cache.forget(item)
+
+    open_by_search(driver, item, pacing)
+    product_url = driver.current_url.split("?")[0]
+    data = read_page(driver, pacing, extract, by_click=True)
+    if url_cache:
+        url_cache.put(item, product_url, data.get("product_code"))
+    return data
+
+
+# ---------------------------------------------------------------- pool mode
+
+class DriverPool:
+    # one long-lived driver per worker thread, restarted every `restart_after` products and after WebDriver errors
+    def __init__(self, headless=True, restart_after=50):
+        self.headless = headless
+        self.restart_after = restart_after
+        self._local = threading.local()
+        self._drivers = []
+        self._lock = threading.Lock()
+
+    def get(self):
+        driver = getattr(self._local, "driver", None)
+        if driver is not None and self._local.pages >= self.restart_after:
+            self.discard()
+            driver = None
+        if driver is None:
+            driver = make_driver(self.headless)
+            self._local.driver = driver
+            self._local.pages = 0
+            with self._lock:
+                self._drivers.append(driver)
+        self._local.pages += 1
+        return driver
+
+    def discard(self):
+        driver = getattr(self._local, "driver", None)
+        if driver is None:
+            return
+        self._local.driver = None
+        with self._lock:
+            if driver in self._drivers:
+                self._drivers.remove(driver)
+        try:
+            driver.quit()
+        except Exception:
+            pass
 
-        if img_list:
-            for i,img in enumerate(img_list):
-                images.append(img.get_attribute("src"))
-                
-        data["all_product_photos"] = images
+    def close(self):
+        with self._lock:
+            drivers, self._drivers = self._drivers, []
+        for driver in drivers:
+            try:
+                driver.quit()
+            except Exception:
+                pass
 
-    except NoSuchElementException as e:
-        img_list = None
 
+def run_pool(items, workers=2, headless=True, restart_after=50, pacing=None, output=None, extract="script", url_cache=None):
+    pacing = pacing or Pacing()
+    pool = DriverPool(headless, restart_after)
 
-product_specifications = {}
+    def job(item):
+        try:
+            return scrape(pool.get(), item, pacing, extract, url_cache)
+        except WebDriverException:
+            # the driver may be in any state (crashed tab, dead session) - the next job starts a new one
+            pool.discard()
+            raise
+
+    done = failed = 0
+    started = time.perf_counter()
+    with ExelExporter(output or os.path.join(RESULTS_DIR, "selenium_parse.xlsx")) as exporter:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {executor.submit(job, item): item for item in dict.fromkeys(items)}
+            for future in as_completed(futures):
+                try:
+                    data = future.result()
+                except Exception as e:
+                    print(f"[{futures[future]}] Error: {e}")
+                    metrics.count("errors", engine=ENGINE, error=type(e).__name__)
+                    failed += 1
+                    continue
+                print(data)
+                exporter.write(data)
+                done += 1
+    pool.close()
+
+    elapsed = time.perf_counter() - started
+    print(f"{done} products, {failed} failed in {elapsed:.1f} s ({done / elapsed * 60:.1f} products/min)")
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Scrape Rozetka products with Selenium.")
+    arg_parser.add_argument("items", nargs="*", help="product URLs or search queries (pool mode); default: one search for the iPhone 15")
+    arg_parser.add_argument("--file", help="text file with one product URL or query per line")
+    arg_parser.add_argument("--workers", type=int, default=2, help="drivers working in parallel in pool mode")
+    arg_parser.add_argument("--restart-after", type=int, default=50, help="products per driver before it is restarted")
+    arg_parser.add_argument("--no-headless", action="store_true", help="show the browser window")
+    arg_parser.add_argument("--jitter", default="", help="random pause before every navigation in ms, e.g. 3000-5000 (default: none)")
+    arg_parser.add_argument("--output", help="Excel file for pool mode (default: results/selenium_parse.xlsx)")
+    arg_parser.add_argument("--url-cache-ttl", type=int, default=DEFAULT_TTL, help="seconds a resolved query -> product URL is reused (0: forever)")
+    arg_parser.add_argument("--no-url-cache", action="store_true", help="always go through the search")
+    arg_parser.add_argument("--extract", choices=EXTRACT_MODES, default="script", help="one execute_script per page (script) or a find_element per field (elements)")
+    rate_limit.add_arguments(arg_parser)
+    args = arg_parser.parse_args()
+
+    metrics.configure("selenium_parse", ENGINE)
+    try:
+        run(args)
+    finally:
+        metrics.finish()
 
-try:
-    link_a =  driver.find_element(By.XPATH,'//a[contains(text(),"Характеристики")]')
-    wait_until(link_a)
 
-    if link_a:       
-        link_a.click()
-        time.sleep(10)
-
-except NoSuchElementException as e:
-    link_a = None
-
-try:
-
-    wait.until(EC.presence_of_element_located((By.XPATH, '//main[@class="product-tabs__content"]//section')))
-    product_specifications_sections = driver.find_elements(By.XPATH,'//main[@class="product-tabs__content"]//section/dl')
-    wait_until(product_specifications_sections[0])
-
-    if product_specifications_sections:
-        for i,dl in enumerate(product_specifications_sections):
-            specs = {}
-            divs = dl.find_elements(By.XPATH,'./div')
-            for div in divs:
-                dts = div.find_elements(By.XPATH, './dt')
-                dds = div.find_elements(By.XPATH, './dd')
-                for dt, dd in zip(dts, dds):
-                    specs[dt.text.strip()] = dd.text.strip()
-                product_specifications[f"product_specification_{i}"] = specs
-    else:
-        product_specifications[f"product_specification_0"] = None
+def run(args):
+    pacing = Pacing.from_arg(args.jitter, rate_limit.from_args(args))
+    url_cache = None if args.no_url_cache else UrlCache(ttl=args.url_cache_ttl)
+    items = list(args.items)
+    if args.file:
+        items += read_items(args.file)
 
-    data["product_specifications"] = product_specifications
+    if items:
+        run_pool(items, args.workers, not args.no_headless, args.restart_after, pacing, args.output, args.extract, url_cache)
+        return
 
-except NoSuchElementException as e:
-    product_specifications_sections = None
+    driver = make_driver(not args.no_headless)
+    try:
+        data = scrape(driver, QUERY, pacing, args.extract, url_cache)
+        print(data)
+        save_to_exel(data,"selenium_parse")
+    finally:
+        driver.quit()
 
-print(data)
-save_to_exel(data,"selenium_parse")
 
-driver.quit()
+if __name__ == "__main__":
+    main()
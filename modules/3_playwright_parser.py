@@ -17,136 +17,141 @@ The process includes:
 
 Helper function `safe_text()` is used to handle optional fields gracefully.
 
+Waiting (`--wait`):
+- `events` (default) - waits for actual readiness: the search input / first result being visible, the product URL and
+  the product title, the characteristics URL and its sections. Fields are then read at once; a missing optional field
+  costs nothing instead of a timeout;
+- `sleep` - the old behaviour: a random 3-5 s sleep before every field and around every click.
+Extraction (`--extract`):
+- `evaluate` (default) - one `page.evaluate` of `extract_product.js` per page returns every field, the image URLs and
+  the nested specifications as a single JSON payload (see `dom_extraction.py`);
+- `locators` - the old way: a locator round-trip per field, per image and per spec row.
+Both produce the same `data` dict.
+
+Human-like pacing is a separate, opt-in policy applied once per navigation (`--jitter 3000-5000`, see `pacing.py`).
+Every navigation also waits for a token of the shared, adaptive rate limiter (`rate_limit.py`, `--rate`, `--max-rate`,
+`--no-rate-limit`); the status of every top-level document response (and Cloudflare's `cf-mitigated: challenge`)
+is fed back to it, so a 403/429/503 or a challenge slows down every scraper on the machine.
+
+Non-essential requests (images, fonts, video, analytics and ad hosts, the Cloudflare beacon) are blocked with
+`context.route` (see `request_blocking.py`); bytes saved are printed per page. Configure it with
+`--block-types image,font,media` (an empty value blocks no resource types), `--no-block-hosts` or `--no-block`.
+
+Every stage is timed and counted under the `playwright` engine (`metrics.py`): `fetch` (opening the product page,
+through the search or by URL), `parse`, `spec_fetch`, `spec_parse`, the Excel writes, bytes loaded by the browser,
+challenges seen by the rate limiter and missing fields. The summary is printed and saved under `results/metrics/`
+at the end of the run.
+
 All the collected data is saved to an Excel file using the `save_to_exel()` function.
 
+Pool mode: pass product URLs and/or search queries (or `--file`, one per line). One browser is shared by `--workers`
+isolated contexts driven by `asyncio` and fed from a queue; each worker keeps its page between products (a product
+URL is opened directly, a query goes through the search), replaces its context every `--recycle-after` products
+and after any failure (a crashed page is never reused), and a crashed browser is launched again. Products are streamed
+to one Excel file (`--output`); use `--headless` on a render box.
+
+Search queries are resolved once: the product URL and code found through the search are kept in a persistent cache
+(`url_cache.py`, `--url-cache-ttl`, `--no-url-cache`), so a repeated query opens the product page directly
+and only falls back to the search when the cached page does not load.
+
 The script is useful for dynamically scraping product data from JavaScript-rendered pages where static HTML scraping is not sufficient.
 """
 
+import os
 import re
+import time
 import random
 import asyncio
+import argparse
 from patchright.async_api import Page, expect
 from patchright.async_api import async_playwright
 
-from _7_exel_template_write import save_to_exel
-
-data={}
+from _7_exel_template_write import RESULTS_DIR, ExelExporter, save_to_exel
+from xpath_fields import *
+from request_blocking import BLOCKED_HOSTS, BLOCKED_RESOURCE_TYPES, ResourceBlocker
+from pacing import Pacing
+from dom_extraction import EXTRACT_JS, extraction_args, product_data
+from url_cache import DEFAULT_TTL, UrlCache, is_url, read_items
+import rate_limit
+import metrics
 
 url = "https://rozetka.com.ua/"
+QUERY = "Apple iPhone 15 128GB Black"
 SECONDS = 1000
+ENGINE = "playwright"
 
-async def safe_text(page, xpath: str) -> str | None:
+WAIT_MODES = ("events", "sleep")
+EXTRACT_MODES = ("evaluate", "locators")
+PRODUCT_URL = re.compile(r"/p\d+/?(\?.*)?$")
+CHARACTERISTICS_URL = re.compile(r"/characteristics/?(\?.*)?$")
+
+
+async def safe_text(page, xpath: str, wait="events") -> str | None:
     locator = page.locator(xpath)
     try:
-        await page.wait_for_timeout(random.randint(3000, 5000))
-        text = await locator.inner_text()
+        if wait == "sleep":
+            await page.wait_for_timeout(random.randint(3000, 5000))
+            text = await locator.inner_text()
+        else:
+            # the page is already known to be ready, so a field that is not there is simply missing
+            if not await locator.count():
+                return None
+            text = await locator.first.inner_text(timeout=5 * SECONDS)
         return text.replace('\xa0', '')
     except Exception:
         return None
 
 
-async def run(p):
-    chromium = p.chromium
-    browser = await chromium.launch(channel="chrome", headless=False)
-
-    context = await browser.new_context(
-        locale='ua-UA',
-        color_scheme='dark',
-        timezone_id='Europe/Kiev',
-        user_agent='Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/117.0.0.0 Safari/537.36',
-        java_script_enabled=True,
-        viewport={ 'width': 1900, 'height': 1600 }
-    )
-    await context.set_extra_http_headers({
-        "Accept-Language": "uk-UA,uk;q=0.9,en-US;q=0.8,en;q=0.7",
-        "Referer": url,
-    })
-    page = await context.new_page()
-
-    try:
-        await page.goto(url, timeout = 300000, wait_until = "load")
-    except TimeoutError as e:
-        print(f"await page.goto doesn't load: {e}")
-
-    text_box = page.locator('//input[@name="search"]')
-    await expect(text_box).to_be_visible(timeout=10000)
-
-    await text_box.type('Apple iPhone 15 128GB Black', delay=random.randint(700, 900))
-    await page.wait_for_timeout(random.randint(3000, 5000))
-    
-    submit_button = page.locator('//button[contains(text(),"Знайти")]')
-    await expect(submit_button).to_be_visible(timeout=10000)
-
-    await submit_button.hover()
-    await submit_button.click()
-    await page.wait_for_timeout(random.randint(3000, 5000))
+async def settle(page, wait):
+    if wait == "sleep":
+        await page.wait_for_timeout(random.randint(3000, 5000))
 
-    first_result_link = page.locator('(//ul[@class="catalog-grid"]/li[1]//a)[1]')
-    await expect(first_result_link).to_be_visible(timeout=10000)
 
-    await first_result_link.hover()
-    await first_result_link.click()
+async def wait_for_product(page, wait):
+    if wait == "sleep":
+        return
+    await page.wait_for_url(PRODUCT_URL, timeout=30 * SECONDS)
+    await page.locator(FIELD_XPATHS["full_name_of_the_product"]).first.wait_for(state="visible", timeout=30 * SECONDS)
 
 
-    data["full_name_of_the_product"] = await safe_text(page, '//h1')
-    data["color"] = await safe_text(page, '//div[@class="var-options"]/p/span[contains(text(),"Колір")]/following-sibling::span')
-    memory_size_raw = await safe_text(page, '//div[@class="var-options"]/p/span[contains(text(),"Вбудована пам\'ять")]/following-sibling::span')
-    data["memory_size"] = int(memory_size_raw.replace('ГБ', '').strip()) if memory_size_raw else None
-    promotional_price_raw = await safe_text(page, '//p[@class="product-price__small"]/following-sibling::p')
-    data["promotional_price"] = int(promotional_price_raw.replace('₴', '').strip()) if promotional_price_raw else None
-    regular_price_raw = await safe_text(page, '//p[@class="product-price__small"]')
-    data["regular_price"] = int(regular_price_raw.replace('₴', '').strip()) if promotional_price_raw else None
-    product_code_raw = await safe_text(page, '//div[@class="product-about__right"]//div[@class="rating text-base"]/span')
-    data["product_code"] = int(product_code_raw.replace("Код:", "").strip()) if product_code_raw else None
-    number_of_reviews_raw = await safe_text(page, '//div[@class="product-about__right"]//div[@class="rating text-base"]/a')
-    data["number_of_reviews"] = int(number_of_reviews_raw.replace("відгуки", "").strip()) if number_of_reviews_raw else None
-    data["series"] = await safe_text(page, '//dl/div[dt[@class="label" and span[contains(text(),"Серія")]]]/dd')
-    data["screen_diagonal"] = await safe_text(page, '//dl/div[dt[@class="label" and span[contains(text(),"Діагональ екрана")]]]/dd')
-    data["display_resolution"] = await safe_text(page, '//dl/div[dt[@class="label" and span[contains(text(),"Роздільна здатність дисплея")]]]/dd')
+async def read_product_locators(page, wait):
+    # the raw strings extract_product.js returns, converted by the same `product_data`, so both modes give one dict
+    fields = {}
+    for field, xpath in FIELD_XPATHS.items():
+        text = await safe_text(page, xpath, wait)
+        fields[field] = text.strip() if text is not None else None
 
-    
+    seller = None
     try:
-        seller_name = await page.locator('//p[@class="seller-title"]//a').inner_text()
-        data["seller"] = seller_name
-
+        seller_link = page.locator(SELLER_LINK)
+        if wait != "sleep" and not await seller_link.count():
+            raise LookupError(SELLER_LINK)
+        seller = (await seller_link.inner_text()).replace('\xa0', '').strip()
     except Exception:
         try:
-            seller_name = await page.locator('//p[@class="seller-title"]//img').get_attribute('alt')
-            data["seller"] = seller_name
-
-        except AttributeError:
-            seller_name = None
+            seller_logo = page.locator(SELLER_LOGO)
+            if wait != "sleep" and not await seller_logo.count():
+                raise LookupError(SELLER_LOGO)
+            seller = await seller_logo.get_attribute('alt', timeout=5 * SECONDS)
+        except Exception:
+            pass
 
     images = []
+    img_elements = page.locator(PHOTOS)
+    for i in range(await img_elements.count()):
+        images.append(await img_elements.nth(i).get_attribute("src"))
 
-    try:
-        img_elements = page.locator('//div[@class="scrollbar__content"]/ul//li//img')
-        count = await img_elements.count()
-
-        for i in range(count):
-            img = img_elements.nth(i)
-            src = await img.get_attribute("src")
-            images.append(src)
-
-        data['all_product_photos'] = images
-
-    except AttributeError as e:
-        data['all_product_photos'] = []
-
-
-    link_a = page.locator('//a[contains(text()," Характеристики")]')
-    await expect(submit_button).to_be_visible(timeout=10000)
-
-    await link_a.hover()    
-    await link_a.click()
-
-    await page.wait_for_timeout(random.randint(3000, 5000))
+    return product_data({"fields": fields, "seller": seller, "photos": images})
 
 
+async def read_specifications_locators(page):
     product_specifications = {}
     try:
-        await page.wait_for_selector('//main[@class="product-tabs__content"]//section', timeout=15000)
-        sections = page.locator('//main[@class="product-tabs__content"]//section')
+        await page.wait_for_selector(SPEC_SECTIONS, timeout=15000)
+    except Exception:
+        return product_specifications
+    try:
+        sections = page.locator(SPEC_SECTIONS)
         count = await sections.count()
 
         for i in range(count):
@@ -154,6 +159,9 @@ async def run(p):
             section = sections.nth(i)
             divs = section.locator('xpath=./dl/div')
             divs_count = await divs.count()
+            # like extract_product.js: a section without a list of characteristics has no key
+            if not divs_count:
+                continue
 
             for d in range(divs_count):
                 div = divs.nth(d)
@@ -173,11 +181,198 @@ async def run(p):
 
                 product_specifications[f"product_specification_{i}"] = specs
 
-        data["product_specifications"] = product_specifications
-
     except AttributeError:
-        data["product_specifications"] = None
-        data["product_specifications"] = product_specifications
+        pass
+    return product_specifications
+
+
+async def read_product_evaluate(page):
+    return product_data(await page.evaluate(EXTRACT_JS, extraction_args()))
+
+
+async def read_specifications_evaluate(page):
+    try:
+        await page.wait_for_selector(SPEC_SECTIONS, timeout=15000)
+    except Exception:
+        return {}
+    raw = await page.evaluate(EXTRACT_JS, extraction_args())
+    return raw["specifications"]
+
+
+class Settings:
+    def __init__(self, wait="events", pacing=None, extract="evaluate", make_blocker=None, headless=False, url_cache=None):
+        self.wait = wait
+        self.pacing = pacing or Pacing()
+        self.extract = extract
+        self.make_blocker = make_blocker or (lambda: None)
+        self.headless = headless
+        self.url_cache = url_cache
+
+
+async def launch(p, settings):
+    return await p.chromium.launch(channel="chrome", headless=settings.headless)
+
+
+async def new_context(browser, settings):
+    context = await browser.new_context(
+        locale='ua-UA',
+        color_scheme='dark',
+        timezone_id='Europe/Kiev',
+        user_agent='Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/117.0.0.0 Safari/537.36',
+        java_script_enabled=True,
+        viewport={ 'width': 1900, 'height': 1600 }
+    )
+    await context.set_extra_http_headers({
+        "Accept-Language": "uk-UA,uk;q=0.9,en-US;q=0.8,en;q=0.7",
+        "Referer": url,
+    })
+    blocker = settings.make_blocker()
+    if blocker:
+        await blocker.install(context)
+    else:
+        # the blocker counts the loaded bytes itself
+        context.on("requestfinished", count_bytes)
+    if settings.pacing.limiter:
+        context.on("response", settings.pacing.limiter.on_playwright_response)
+    return context, blocker
+
+
+async def count_bytes(request):
+    try:
+        sizes = await request.sizes()
+    except Exception:
+        return
+    metrics.count("bytes_downloaded", sizes["responseBodySize"] + sizes["responseHeadersSize"], engine=ENGINE)
+
+
+async def open_by_search(page, query, settings, blocker=None):
+    with metrics.stage("fetch", ENGINE):
+        await _open_by_search(page, query, settings, blocker)
+
+
+async def _open_by_search(page, query, settings, blocker=None):
+    wait, pacing = settings.wait, settings.pacing
+
+    await pacing.before_navigation(url)
+    try:
+        await page.goto(url, timeout = 300000, wait_until = "load")
+    except TimeoutError as e:
+        print(f"await page.goto doesn't load: {e}")
+    if blocker:
+        blocker.report("home")
+
+    text_box = page.locator(SEARCH_INPUT)
+    await expect(text_box).to_be_visible(timeout=10000)
+
+    if wait == "sleep":
+        await text_box.type(query, delay=random.randint(700, 900))
+    elif pacing.typing_delay_ms:
+        await text_box.type(query, delay=pacing.typing_delay())
+    else:
+        await text_box.fill(query)
+    await settle(page, wait)
+    
+    submit_button = page.locator(SEARCH_BUTTON)
+    await expect(submit_button).to_be_visible(timeout=10000)
+
+    await pacing.before_navigation()
+    await submit_button.hover()
+    await submit_button.click()
+    await settle(page, wait)
+
+    first_result_link = page.locator(FIRST_SEARCH_RESULT)
+    await expect(first_result_link).to_be_visible(timeout=10000 if wait == "sleep" else 30 * SECONDS)
+    if blocker:
+        blocker.report("search")
+
+    await pacing.before_navigation()
+    await first_result_link.hover()
+    await first_result_link.click()
+    await wait_for_product(page, wait)
+
+
+async def open_by_url(page, product_url, settings):
+    with metrics.stage("fetch", ENGINE):
+        await settings.pacing.before_navigation(product_url)
+        await page.goto(product_url, timeout=60 * SECONDS, wait_until="domcontentloaded")
+        await wait_for_product(page, settings.wait)
+
+
+async def open_characteristics(page, settings, by_click=True):
+    wait, pacing = settings.wait, settings.pacing
+
+    await pacing.before_navigation()
+    if by_click:
+        link_a = page.locator('//a[contains(text()," Характеристики")]')
+        await link_a.hover()    
+        await link_a.click()
+    else:
+        # the tab has its own URL, no need to find and click the link
+        await page.goto(page.url.split("?")[0].rstrip("/") + "/characteristics/", timeout=60 * SECONDS, wait_until="domcontentloaded")
+
+    if wait == "sleep":
+        await settle(page, wait)
+    else:
+        await page.wait_for_url(CHARACTERISTICS_URL, timeout=30 * SECONDS)
+
+
+async def read_product(page, settings, blocker=None, by_click=True):
+    data = {}
+    with metrics.stage("parse", ENGINE):
+        if settings.extract == "evaluate":
+            await settle(page, settings.wait)
+            data.update(await read_product_evaluate(page))
+        else:
+            data.update(await read_product_locators(page, settings.wait))
+
+    if blocker:
+        blocker.report("product")
+
+    with metrics.stage("spec_fetch", ENGINE):
+        await open_characteristics(page, settings, by_click)
+
+    with metrics.stage("spec_parse", ENGINE):
+        if settings.extract == "evaluate":
+            data["product_specifications"] = await read_specifications_evaluate(page)
+        else:
+            data["product_specifications"] = await read_specifications_locators(page)
+
+    if blocker:
+        blocker.report("characteristics")
+    metrics.record_fields(data, ENGINE)
+    metrics.count("products", engine=ENGINE, outcome="parsed")
+    return data
+
+
+async def scrape(page, item, settings, blocker=None):
+    # a product URL is opened directly, a query too once it is in the URL cache, anything else goes through the search
+    if is_url(item):
+        await open_by_url(page, item, settings)
+        return await read_product(page, settings, blocker, by_click=False)
+
+    cached = settings.url_cache.get(item) if settings.url_cache else None
+    if cached:
+        try:
+            await open_by_url(page, cached[0], settings)
+            return await read_product(page, settings, blocker, by_click=False)
+        except Exception as e:
+            print(f"[{item}] cached {cached[0]} failed, searching again: {e}")
+            settings.url_cache.forget(item)
+
+    await open_by_search(page, item, settings, blocker)
+    product_url = page.url.split("?")[0]
+    data = await read_product(page, settings, blocker)
+    if settings.url_cache:
+        settings.url_cache.put(item, product_url, data.get("product_code"))
+    return data
+
+
+async def run(p, settings, query=QUERY):
+    browser = await launch(p, settings)
+    context, blocker = await new_context(browser, settings)
+    page = await context.new_page()
+
+    data = await scrape(page, query, settings, blocker)
 
     print(data)
     save_to_exel(data,"playwright_parse")
@@ -188,8 +383,132 @@ async def run(p):
     await browser.close()
 
 
+# ---------------------------------------------------------------- pool mode
+
+class BrowserHandle:
+    # one browser shared by all workers, launched again if it crashes
+    def __init__(self, p, settings):
+        self.p = p
+        self.settings = settings
+        self.browser = None
+        self._lock = asyncio.Lock()
+
+    async def get(self):
+        async with self._lock:
+            if self.browser is None or not self.browser.is_connected():
+                self.browser = await launch(self.p, self.settings)
+            return self.browser
+
+    async def close(self):
+        if self.browser is not None and self.browser.is_connected():
+            await self.browser.close()
+
+
+async def close_quietly(context):
+    if context is None:
+        return
+    try:
+        await context.close()
+    except Exception:
+        pass
+
+
+async def pool_worker(n, handle, queue, settings, exporter, recycle_after, stats):
+    context = page = blocker = None
+    jobs = 0
+    while True:
+        item = await queue.get()
+        if item is None:
+            break
+        try:
+            if page is None or page.is_closed() or jobs >= recycle_after:
+                await close_quietly(context)
+                context, blocker = await new_context(await handle.get(), settings)
+                page = await context.new_page()
+                jobs = 0
+            data = await scrape(page, item, settings, blocker)
+            jobs += 1
+            print(data)
+            exporter.write(data)
+            stats["done"] += 1
+        except Exception as e:
+            # a crashed page / context (or any half-finished navigation) is not reused
+            print(f"[worker {n}] {item}: {e}")
+            metrics.count("errors", engine=ENGINE, error=type(e).__name__)
+            stats["failed"] += 1
+            await close_quietly(context)
+            context = page = None
+    await close_quietly(context)
+
+
+async def run_pool(p, items, settings, workers=4, output=None, recycle_after=50):
+    queue = asyncio.Queue()
+    for item in dict.fromkeys(items):
+        queue.put_nowait(item)
+    for _ in range(workers):
+        queue.put_nowait(None)
+
+    handle = BrowserHandle(p, settings)
+    stats = {"done": 0, "failed": 0}
+    started = time.perf_counter()
+    with ExelExporter(output or os.path.join(RESULTS_DIR, "playwright_parse.xlsx")) as exporter:
+        await asyncio.gather(*(
+            pool_worker(n, handle, queue, settings, exporter, recycle_after, stats) for n in range(workers)
+        ))
+    await handle.close()
+
+    elapsed = time.perf_counter() - started
+    print(f"{stats['done']} products, {stats['failed']} failed in {elapsed:.1f} s ({stats['done'] / elapsed:.2f} products/s)")
+
+
+def blocker_factory(args):
+    if args.no_block:
+        return None
+    resource_types = [t.strip() for t in args.block_types.split(",") if t.strip()]
+    hosts = () if args.no_block_hosts else BLOCKED_HOSTS
+    return lambda: ResourceBlocker(resource_types, hosts)
+
+
 async def main():
+    arg_parser = argparse.ArgumentParser(description="Scrape a Rozetka product with Playwright.")
+    arg_parser.add_argument("items", nargs="*", help="product URLs or search queries (pool mode); default: one search for the iPhone 15")
+    arg_parser.add_argument("--file", help="text file with one product URL or query per line")
+    arg_parser.add_argument("--workers", type=int, default=4, help="browser contexts working in parallel in pool mode")
+    arg_parser.add_argument("--recycle-after", type=int, default=50, help="products per context before it is replaced")
+    arg_parser.add_argument("--output", help="Excel file for pool mode (default: results/playwright_parse.xlsx)")
+    arg_parser.add_argument("--headless", action="store_true", help="run the browser without a window")
+    arg_parser.add_argument("--url-cache-ttl", type=int, default=DEFAULT_TTL, help="seconds a resolved query -> product URL is reused (0: forever)")
+    arg_parser.add_argument("--no-url-cache", action="store_true", help="always go through the search")
+    arg_parser.add_argument("--block-types", default=",".join(BLOCKED_RESOURCE_TYPES), help="comma-separated resource types to block")
+    arg_parser.add_argument("--no-block-hosts", action="store_true", help="do not block analytics / ad hosts")
+    arg_parser.add_argument("--no-block", action="store_true", help="load every resource")
+    arg_parser.add_argument("--wait", choices=WAIT_MODES, default="events", help="wait for page readiness (events) or sleep 3-5 s per field (sleep)")
+    arg_parser.add_argument("--jitter", default="", help="random pause before every navigation in ms, e.g. 3000-5000 (default: none)")
+    arg_parser.add_argument("--extract", choices=EXTRACT_MODES, default="evaluate", help="one page.evaluate per page (evaluate) or a locator per field (locators)")
+    rate_limit.add_arguments(arg_parser)
+    args = arg_parser.parse_args()
+
+    metrics.configure("playwright_parse", ENGINE)
+    try:
+        await run_main(args)
+    finally:
+        metrics.finish()
+
+
+async def run_main(args):
+    url_cache = None if args.no_url_cache else UrlCache(ttl=args.url_cache_ttl)
+    pacing = Pacing.from_arg(args.jitter, rate_limit.from_args(args))
+    settings = Settings(args.wait, pacing, args.extract, blocker_factory(args), args.headless, url_cache)
+    items = list(args.items)
+    if args.file:
+        items += read_items(args.file)
+
     async with async_playwright() as playwright:
-        await run(playwright)
+        if items:
+            await run_pool(playwright, items, settings, args.workers, args.output, args.recycle_after)
+        else:
+            await run(playwright, settings)
+
 
-asyncio.run(main())
\ No newline at end of file
+if __name__ == "__main__":
+    asyncio.run(main())
\ No newline at end of file
@@ -9,17 +9,33 @@ It uses the `openpyxl_templates` library to:
     - Formats and writes it into the Excel sheet.
     - Serializes `product_specifications` (a nested dictionary) as JSON string.
     - Joins image URLs into a single string for saving.
-    - Saves the result to the `/results/` directory under the given filename.
+    - Saves the result to the `results/` directory (`RESULTS_DIR`) under the given filename.
+- Provide a streaming exporter for any number of records:
+    - `ExelExporter(path)` writes rows one by one into a write-only workbook (`openpyxl`, `write_only=True`),
+      rows are flushed to disk as they are appended, so memory stays constant and the file is saved once;
+    - `export_to_exel(records, path)` exports any iterable of `data` dicts (e.g. a generator);
+    - `mobile_records(queryset)` streams `Mobile` rows with their photos from the database via `.iterator()`.
+- Time every row written (`excel_write`) and the final save of the workbook (`excel_save`) in `metrics.py`.
+
+Run it as a script to export the whole `Mobile` table:
+
+    python _7_exel_template_write.py --output ../results/mobiles.xlsx
 
 Intended to be used as part of a web scraping pipeline (e.g. for Rozetka) to persist product data in a readable and analyzable Excel format.
 """
 
 
+import os
 import json
+import argparse
+
+from openpyxl import Workbook
 from openpyxl_templates.table_sheet import TableSheet
 from openpyxl_templates import TemplatedWorkbook, TemplatedWorksheet
 from openpyxl_templates.table_sheet.columns import CharColumn, IntColumn, FloatColumn
 
+import metrics
+
 
 class DictSheet(TemplatedWorksheet):
     def write(self, data):
@@ -43,7 +59,7 @@ class MobileSheet(TableSheet):
    memory_size = IntColumn()
    seller = CharColumn()
    regular_price = IntColumn()
-   promotional_price_= IntColumn()
+   promotional_price = IntColumn()
    all_product_photos = CharColumn()
    product_code = IntColumn()
    number_of_reviews = IntColumn()
@@ -55,26 +71,107 @@ class MobileSheet(TableSheet):
 class MobileRozetkaWorkbook(TemplatedWorkbook):
    mobile = MobileSheet()
 
+MODULE_DIR = os.path.dirname(os.path.abspath(__file__))
+RESULTS_DIR = os.path.join(MODULE_DIR, "..", "results")
+
+# the same column order as `MobileSheet`
+COLUMNS = (
+    "full_name_of_the_product",
+    "color",
+    "memory_size",
+    "seller",
+    "regular_price",
+    "promotional_price",
+    "all_product_photos",
+    "product_code",
+    "number_of_reviews",
+    "series",
+    "screen_diagonal",
+    "display_resolution",
+    "product_specifications",
+)
+
+
+def _row(data):
+    row = []
+    for column in COLUMNS:
+        value = data.get(column)
+        if column == "all_product_photos":
+            value = ", ".join(value or [])
+        elif column == "product_specifications":
+            value = json.dumps(value, ensure_ascii=False)
+        row.append(value)
+    return tuple(row)
+
+
 m = MobileRozetkaWorkbook()
-def save_to_exel(data,name):
-    m.mobile.write(objects=(
-        (
-            data["full_name_of_the_product"],
-            data["color"],
-            data["memory_size"],
-            data["seller"],
-            data["regular_price"],
-            data["promotional_price"],
-            ", ".join(data["all_product_photos"]),
-            data["product_code"],
-            data["number_of_reviews"],
-            data["series"],
-            data["screen_diagonal"],
-            data["display_resolution"],
-            json.dumps(data['product_specifications'], ensure_ascii=False) 
-        ),
-    ))
-
-    m.save(f"C:/Users/Admin/projects/rozetkacomua_project/results/{name}.xlsx")
-
-# save_to_exel(data,"test")
\ No newline at end of file
+def save_to_exel(data,name,results_dir=RESULTS_DIR):
+    with metrics.stage("excel_write"):
+        m.mobile.write(objects=(_row(data),))
+
+    os.makedirs(results_dir, exist_ok=True)
+    with metrics.stage("excel_save"):
+        m.save(os.path.join(results_dir, f"{name}.xlsx"))
+
+
+class ExelExporter:
+    def __init__(self, path, title="mobile"):
+        self.path = path
+        self.count = 0
+        self._workbook = Workbook(write_only=True)
+        self._sheet = self._workbook.create_sheet(title)
+        self._sheet.append(COLUMNS)
+
+    def write(self, data):
+        with metrics.stage("excel_write"):
+            self._sheet.append(_row(data))
+        self.count += 1
+
+    def write_many(self, records):
+        for data in records:
+            self.write(data)
+
+    def close(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        with metrics.stage("excel_save"):
+            self._workbook.save(self.path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def export_to_exel(records, path):
+    with ExelExporter(path) as exporter:
+        exporter.write_many(records)
+    return exporter.count
+
+
+def mobile_records(queryset=None, chunk_size=2000):
+    # Django is only needed here, so the module stays importable without a configured project
+    from django.db.models import Prefetch
+    from parser_app.models import Mobile, Photo
+
+    queryset = Mobile.objects.order_by("pk") if queryset is None else queryset
+    queryset = queryset.prefetch_related(Prefetch("mobile", queryset=Photo.objects.only("url", "mobile_id")))
+    for mobile in queryset.iterator(chunk_size=chunk_size):
+        data = {column: getattr(mobile, column) for column in COLUMNS if column != "all_product_photos"}
+        data["all_product_photos"] = [photo.url for photo in mobile.mobile.all()]
+        yield data
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Export the Mobile table to an Excel file")
+    arg_parser.add_argument("--output", default=os.path.join(RESULTS_DIR, "mobiles.xlsx"))
+    arg_parser.add_argument("--chunk-size", type=int, default=2000, help="rows fetched from the database at a time")
+    args = arg_parser.parse_args()
+
+    import load_django
+    count = export_to_exel(mobile_records(chunk_size=args.chunk_size), args.output)
+    print(f"{count} products exported to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+This script benchmarks the HTML parser backends from `html_backends.py` on the saved product page `iphone.html`.
+
+For every backend it parses the page `--runs` times and extracts all product fields through the HTML path
+(`product_parser.parse_html_fields`, i.e. without the JSON fast path), then reports:
+- mean / min time per parse + extraction;
+- peak Python heap during one parse (`tracemalloc`);
+- peak RSS of the process (where the `resource` module is available; C-level allocations of lxml/lexbor
+  are not visible to `tracemalloc`, so every backend runs in its own child process to keep RSS comparable).
+
+It also checks that every backend produced exactly the same `data` dict as `html.parser`, and that the HTML path
+gives the same values as the JSON fast path (`client_state.extract_state`) for every field the JSON has.
+
+Usage:
+    python benchmark_parsers.py --runs 20
+"""
+
+import os
+import time
+import argparse
+import tracemalloc
+import multiprocessing
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+from client_state import extract_state
+from html_backends import BACKENDS, parse
+from product_parser import parse_html_fields
+
+
+PAGE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "iphone.html")
+
+
+def _max_rss_mb():
+    if resource is None:
+        return None
+    # ru_maxrss is in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _bench(backend, html, runs, queue):
+    try:
+        tracemalloc.start()
+        data = parse_html_fields(parse(html, backend))
+        _, heap_peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        timings = []
+        for _ in range(runs):
+            started = time.perf_counter()
+            parse_html_fields(parse(html, backend))
+            timings.append(time.perf_counter() - started)
+
+        queue.put({
+            "backend": backend,
+            "data": data,
+            "mean_ms": sum(timings) / len(timings) * 1000,
+            "min_ms": min(timings) * 1000,
+            "heap_peak_mb": heap_peak / 1024 / 1024,
+            "max_rss_mb": _max_rss_mb(),
+        })
+    except ImportError as e:
+        queue.put({"backend": backend, "error": str(e)})
+
+
+def run(backends, runs, path=PAGE):
+    with open(path, encoding="utf-8") as f:
+        html = f.read()
+
+    results = []
+    for backend in backends:
+        queue = multiprocessing.Queue()
+        process = multiprocessing.Process(target=_bench, args=(backend, html, runs, queue))
+        process.start()
+        results.append(queue.get())
+        process.join()
+    return results
+
+
+def json_mismatches(html, data):
+    # fields the two extraction paths disagree on: field -> (JSON value, HTML value)
+    state, _ = extract_state(html)
+    return {field: (value, data[field]) for field, value in state.items() if field in data and data[field] != value}
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Benchmark HTML parser backends on iphone.html")
+    arg_parser.add_argument("--runs", type=int, default=20)
+    arg_parser.add_argument("--backend", action="append", choices=BACKENDS, help="backend to test (default: all)")
+    args = arg_parser.parse_args()
+
+    results = run(args.backend or BACKENDS, args.runs)
+    reference = next((r["data"] for r in results if "data" in r), None)
+
+    print(f"{'backend':<12} {'mean, ms':>10} {'min, ms':>10} {'heap, MB':>10} {'rss, MB':>10}  same output")
+    print("=" * 70)
+    for r in results:
+        if "error" in r:
+            print(f"{r['backend']:<12} skipped: {r['error']}")
+            continue
+        rss = f"{r['max_rss_mb']:.1f}" if r["max_rss_mb"] is not None else "n/a"
+        print(f"{r['backend']:<12} {r['mean_ms']:>10.1f} {r['min_ms']:>10.1f} {r['heap_peak_mb']:>10.1f} {rss:>10}  {r['data'] == reference}")
+
+    if reference is not None:
+        with open(PAGE, encoding="utf-8") as f:
+            mismatches = json_mismatches(f.read(), reference)
+        print(f"JSON fast path gives the same fields as HTML: {not mismatches}")
+        for field, (from_json, from_html) in mismatches.items():
+            print(f"  {field}: JSON {from_json!r}, HTML {from_html!r}")
+
+
+if __name__ == "__main__":
+    main()
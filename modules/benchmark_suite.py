@@ -0,0 +1,308 @@
+"""
+This script is an offline benchmark suite for the extraction logic of all three scrapers.
+
+Nothing is fetched: every run works on the saved product page `iphone.html` and on variants generated from it:
+- `original`       - the page as saved;
+- `no_state`       - the embedded JSON (`rz-client-state`, `ld+json`) removed, so every field goes through HTML;
+- `large_specs`    - 500 extra rows in the short spec list and a 40x40 "Характеристики" tab;
+- `many_images`    - 300 extra images in the photo slider and in the thumbnail list;
+- `missing_blocks` - JSON, prices, short spec list, variants and seller blocks removed.
+
+Engines:
+- `requestsBS4/<backend>` - `product_parser` (JSON fast path + HTML fallback) for every backend in `html_backends.py`;
+- `selenium`, `playwright` - the XPath field sets from `xpath_fields.py`, evaluated with `lxml` on the same HTML
+  (the browser round-trips are not part of it, only the extraction logic itself).
+
+For every variant and engine the suite reports per-stage and per-field latency (mean / min over `--runs`),
+the peak Python allocations of one call (`tracemalloc`), the total per page and the peak RSS of the process.
+Results are saved as JSON (`results/benchmarks/<timestamp>.json` by default) and can be compared with an earlier run:
+
+    python benchmark_suite.py --runs 5
+    python benchmark_suite.py --runs 5 --variant no_state --compare ../results/benchmarks/20250617-120000.json
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import argparse
+import platform
+import tracemalloc
+from datetime import datetime
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+try:
+    import lxml.html
+except ImportError:
+    lxml = None
+
+from client_state import extract_state
+from html_backends import BACKENDS, parse
+from product_parser import FIELDS, parse_html_fields, parse_product_page, parse_characteristics
+from xpath_fields import FIELD_XPATHS, SELLER_LINK, SELLER_LOGO, PHOTOS_LIST, PHOTOS, SPEC_SECTIONS
+
+
+MODULE_DIR = os.path.dirname(os.path.abspath(__file__))
+PAGE = os.path.join(MODULE_DIR, "iphone.html")
+RESULTS_DIR = os.path.join(MODULE_DIR, "..", "results", "benchmarks")
+
+
+VARIANTS = ("original", "no_state", "large_specs", "many_images", "missing_blocks")
+
+
+# ---------------------------------------------------------------- page variants
+
+def _insert_before(html, anchor, closing, chunk):
+    start = html.find(anchor)
+    if start == -1:
+        return html
+    end = html.find(closing, start)
+    if end == -1:
+        return html
+    return html[:end] + chunk + html[end:]
+
+
+def _remove_blocks(html, pattern):
+    return re.sub(pattern, "", html, flags=re.S)
+
+
+def without_state(html):
+    html = _remove_blocks(html, r'<script id="rz-client-state".*?</script>')
+    return _remove_blocks(html, r'<script type="application/ld\+json".*?</script>')
+
+
+def characteristics_page(sections=40, rows=40):
+    parts = ['<html><body><main class="product-tabs__content">']
+    for s in range(sections):
+        parts.append(f'<section><h3>Група {s}</h3><dl>')
+        for r in range(rows):
+            parts.append(
+                f'<div class="item"><dt class="label"><span>Характеристика {s}.{r}</span></dt>'
+                f'<dd class="value"><ul><li><a> Значення {r} </a><!-- --></li></ul></dd></div>'
+            )
+        parts.append('</dl></section>')
+    parts.append('</main></body></html>')
+    return "".join(parts)
+
+
+def variants(html):
+    no_state = without_state(html)
+
+    rows = "".join(
+        f'<div class="item"><dt class="label"><span>Додатково {i}</span></dt><dd class="value"> {i} </dd></div>'
+        for i in range(500)
+    )
+    large_specs = _insert_before(html, 'class="list"', '</dl>', rows)
+
+    slider_imgs = "".join(f'<img src="https://content.rozetka.com.ua/goods/images/medium/{i}.jpg">' for i in range(300))
+    list_imgs = "".join(f'<li><img src="https://content.rozetka.com.ua/goods/images/small/{i}.jpg"></li>' for i in range(300))
+    many_images = _insert_before(html, 'class="preview-slider"', '</app-slider>', slider_imgs)
+    many_images = _insert_before(many_images, 'class="scrollbar__content"', '</ul>', list_imgs)
+
+    missing = _remove_blocks(no_state, r'<p[^>]*class="product-price__small".*?</p>')
+    missing = _remove_blocks(missing, r'<dl[^>]*class="list".*?</dl>')
+    missing = _remove_blocks(missing, r'<div[^>]*class="var-options".*?</p>')
+    missing = _remove_blocks(missing, r'<div[^>]*class="comment__vars".*?</div>')
+
+    return {
+        "original": (html, characteristics_page(4, 10)),
+        "no_state": (no_state, characteristics_page(4, 10)),
+        "large_specs": (large_specs, characteristics_page(40, 40)),
+        "many_images": (many_images, characteristics_page(4, 10)),
+        "missing_blocks": (missing, characteristics_page(0, 0)),
+    }
+
+
+# ---------------------------------------------------------------- measuring
+
+def measure(fn, runs):
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "mean_ms": round(sum(timings) / len(timings) * 1000, 3),
+        "min_ms": round(min(timings) * 1000, 3),
+        "alloc_peak_kb": round(peak / 1024, 1),
+    }
+
+
+def _max_rss_mb():
+    if resource is None:
+        return None
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+
+def bench_requests_bs4(html, html_c, backend, runs):
+    root = parse(html, backend)
+    stages = {
+        "extract_state": measure(lambda: extract_state(html), runs),
+        "parse_html": measure(lambda: parse(html, backend), runs),
+        "characteristics": measure(lambda: parse_characteristics(html_c, backend), runs),
+    }
+    fields = {field: measure(lambda f=field: parse_html_fields(root, (f,)), runs) for field in FIELDS}
+    total = measure(lambda: (parse_product_page(html, backend), parse_characteristics(html_c, backend)), runs)
+    return {"total": total, "stages": stages, "fields": fields}
+
+
+def _xpath_text(tree, xpath):
+    found = tree.xpath(xpath)
+    return found[0].text_content().strip() if found else None
+
+
+def _xpath_seller(tree):
+    link = tree.xpath(SELLER_LINK)
+    if link:
+        return link[0].text_content().strip()
+    logo = tree.xpath(SELLER_LOGO)
+    return logo[0].get('alt') if logo else None
+
+
+def _xpath_specs(tree_c):
+    product_specifications = {}
+    for i, section in enumerate(tree_c.xpath(SPEC_SECTIONS)):
+        specs = {}
+        for div in section.xpath('./dl/div'):
+            for dt, dd in zip(div.xpath('./dt'), div.xpath('./dd')):
+                specs[dt.text_content().strip()] = dd.text_content().strip()
+        product_specifications[f"product_specification_{i}"] = specs
+    return product_specifications
+
+
+def bench_xpath(html, html_c, photos, runs):
+    tree = lxml.html.fromstring(html)
+    tree_c = lxml.html.fromstring(html_c)
+
+    def extract_all():
+        t = lxml.html.fromstring(html)
+        for xpath in FIELD_XPATHS.values():
+            _xpath_text(t, xpath)
+        _xpath_seller(t)
+        photos(t)
+        _xpath_specs(lxml.html.fromstring(html_c))
+
+    stages = {
+        "parse_html": measure(lambda: lxml.html.fromstring(html), runs),
+        "characteristics": measure(lambda: _xpath_specs(tree_c), runs),
+    }
+    fields = {field: measure(lambda x=xpath: _xpath_text(tree, x), runs) for field, xpath in FIELD_XPATHS.items()}
+    fields["seller"] = measure(lambda: _xpath_seller(tree), runs)
+    fields["all_product_photos"] = measure(lambda: photos(tree), runs)
+    return {"total": measure(extract_all, runs), "stages": stages, "fields": fields}
+
+
+def selenium_photos(tree):
+    return [img.get("src") for ul in tree.xpath(PHOTOS_LIST)[:1] for img in ul.xpath('./li//img')]
+
+
+def playwright_photos(tree):
+    return [img.get("src") for img in tree.xpath(PHOTOS)]
+
+
+def run_suite(runs, backends=BACKENDS, only=None, path=PAGE):
+    with open(path, encoding="utf-8") as f:
+        html = f.read()
+
+    results = {}
+    for name, (page, page_c) in variants(html).items():
+        if only and name not in only:
+            continue
+        results[name] = {}
+        for backend in backends:
+            try:
+                results[name][f"requestsBS4/{backend}"] = bench_requests_bs4(page, page_c, backend, runs)
+            except ImportError as e:
+                print(f"[{name}] requestsBS4/{backend} skipped: {e}")
+        if lxml is not None:
+            results[name]["selenium"] = bench_xpath(page, page_c, selenium_photos, runs)
+            results[name]["playwright"] = bench_xpath(page, page_c, playwright_photos, runs)
+        print(f"[{name}] done")
+
+    return {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "runs": runs,
+            "page_bytes": len(html.encode("utf-8")),
+            "max_rss_mb": _max_rss_mb(),
+        },
+        "results": results,
+    }
+
+
+# ---------------------------------------------------------------- reporting
+
+def print_report(report):
+    print(f"{'variant':<16} {'engine':<24} {'total, ms':>10} {'alloc, KB':>10}  slowest field")
+    print("=" * 90)
+    for variant, engines in report["results"].items():
+        for engine, result in engines.items():
+            slowest = max(result["fields"].items(), key=lambda item: item[1]["mean_ms"])
+            print(
+                f"{variant:<16} {engine:<24} {result['total']['mean_ms']:>10.2f} "
+                f"{result['total']['alloc_peak_kb']:>10.1f}  {slowest[0]} ({slowest[1]['mean_ms']:.2f} ms)"
+            )
+    print(f"peak RSS: {report['meta']['max_rss_mb']} MB")
+
+
+def compare(old, new, threshold):
+    regressions = []
+    for variant, engines in new["results"].items():
+        for engine, result in engines.items():
+            before = old.get("results", {}).get(variant, {}).get(engine)
+            if not before:
+                continue
+            rows = [("total", before["total"], result["total"])]
+            rows += [(f"field:{f}", before["fields"].get(f), m) for f, m in result["fields"].items()]
+            rows += [(f"stage:{s}", before["stages"].get(s), m) for s, m in result["stages"].items()]
+            for name, was, now in rows:
+                if was and now and was["mean_ms"] > 0 and now["mean_ms"] / was["mean_ms"] > threshold:
+                    regressions.append((variant, engine, name, was["mean_ms"], now["mean_ms"]))
+
+    for variant, engine, name, was, now in regressions:
+        print(f"REGRESSION {variant} {engine} {name}: {was:.2f} ms -> {now:.2f} ms ({now / was:.2f}x)")
+    if not regressions:
+        print(f"No regressions above {threshold:.2f}x")
+    return regressions
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Offline benchmark of the scrapers' extraction logic")
+    arg_parser.add_argument("--runs", type=int, default=5)
+    arg_parser.add_argument("--variant", action="append", choices=VARIANTS, help="page variant to run (default: all)")
+    arg_parser.add_argument("--backend", action="append", choices=BACKENDS, help="HTML backend for requestsBS4 (default: all)")
+    arg_parser.add_argument("--output", help="where to save the JSON results")
+    arg_parser.add_argument("--compare", help="earlier JSON results to compare with")
+    arg_parser.add_argument("--threshold", type=float, default=1.2, help="slowdown ratio reported as a regression")
+    args = arg_parser.parse_args()
+
+    report = run_suite(args.runs, args.backend or BACKENDS, args.variant)
+    print_report(report)
+
+    output = args.output or os.path.join(RESULTS_DIR, datetime.now().strftime("%Y%m%d-%H%M%S") + ".json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"saved to {output}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            if compare(json.load(f), report, args.threshold):
+                sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,322 @@
+"""
+This script crawls whole Rozetka categories (e.g. all smartphones) and feeds the products to the product parser.
+
+    python category_crawler.py https://rozetka.com.ua/ua/mobile-phones/c80003/ --max-pages 100 --workers 8
+
+1. Listing pages are walked page by page (`.../c80003/`, `.../c80003/page=2/`, ...) up to the last page of the
+   paginator, `--max-pages`, or a page without product tiles (or, without a paginator, a page with nothing new in this
+   category). Every `catalog-grid` tile gives a product URL and its product code (`/p<code>/`).
+2. Products go into a deduplicating frontier (keyed by product code, so the same product reached from two categories
+   or two pages is scraped once).
+3. Pending products are parsed by `1_requestsBS4_parse.py` (`parse_product`, with its response cache and batch upsert)
+   on `--workers` threads; `--no-scrape` only discovers them, `--export-urls` writes the pending URLs to a file for the
+   browser scrapers' pool mode (`2_selenium_parser.py --file`, `3_playwright_parser.py --file`).
+
+The frontier is a SQLite file (`results/crawl_frontier.sqlite` by default) holding the finished listing pages and every
+discovered product with its status, so an interrupted crawl resumes where it stopped: finished listing pages are not
+fetched again and only products that are still pending (or failed fewer than `--max-attempts` times) are parsed.
+`--recrawl` forgets the finished listing pages (to discover new products) but keeps the products.
+`--rescrape-after DAYS` puts products scraped more than that many days ago back to pending, so a repeated run refreshes
+their prices (and the price history in the database) instead of only scraping new products.
+A listing page that is still blocked after the rate limiter's retries (403/429/503, a Cloudflare challenge) is not
+saved: the category stops there and the next run continues from that page.
+
+Listing pages are timed as the `listing_fetch` / `listing_parse` stages next to the product parser's own stages
+(`metrics.py`); the run summary is printed and saved under `results/metrics/` at the end.
+"""
+
+import os
+import json
+import re
+import time
+import sqlite3
+import argparse
+import importlib
+import threading
+from functools import partial
+from urllib.parse import urljoin
+
+from html_backends import BACKENDS, DEFAULT_BACKEND, parse
+from scraper_pool import fetch_all, get_scraper
+from http_cache import CACHE_MODES, ResponseCache
+import rate_limit
+import metrics
+
+
+MODULE_DIR = os.path.dirname(os.path.abspath(__file__))
+FRONTIER_PATH = os.path.join(MODULE_DIR, "..", "results", "crawl_frontier.sqlite")
+
+headers = {
+    "User-Agent":"Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/117.0.0.0 Safari/537.36"
+}
+
+PRODUCT_CODE = re.compile(r"/p(\d+)/")
+PAGE_SEGMENT = re.compile(r"page=\d+/?")
+TILES = "ul.catalog-grid > li"
+PAGINATION_LINKS = "a.pagination__link"
+
+
+def listing_url(category_url, page):
+    base = PAGE_SEGMENT.sub("", category_url.split("?")[0]).rstrip("/") + "/"
+    return base if page == 1 else f"{base}page={page}/"
+
+
+def last_page(root):
+    pages = [int(link.text.strip()) for link in root.select(PAGINATION_LINKS) if link.text.strip().isdigit()]
+    return max(pages) if pages else None
+
+
+def product_tiles(root, base_url):
+    products = {}
+    for tile in root.select(TILES):
+        for link in tile.select("a"):
+            href = link.attr("href")
+            match = PRODUCT_CODE.search(href or "")
+            if match:
+                url = urljoin(base_url, href).split("?")[0].split("#")[0]
+                products.setdefault(int(match.group(1)), url)
+                break
+    return products
+
+
+class Frontier:
+    def __init__(self, path=FRONTIER_PATH):
+        self.path = os.path.abspath(path)
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._db = sqlite3.connect(self.path, check_same_thread=False)
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS listing_pages (
+                url TEXT PRIMARY KEY,
+                category TEXT NOT NULL,
+                page INTEGER NOT NULL,
+                products INTEGER NOT NULL,
+                new_products INTEGER NOT NULL,
+                last_page INTEGER,
+                fetched_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS products (
+                product_code INTEGER PRIMARY KEY,
+                url TEXT NOT NULL,
+                category TEXT NOT NULL,
+                status TEXT NOT NULL DEFAULT 'pending',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                error TEXT,
+                discovered_at REAL NOT NULL,
+                scraped_at REAL
+            );
+            CREATE INDEX IF NOT EXISTS products_status ON products (status);
+        """)
+        # added later: the product codes of a finished page, for the repeated-last-page check after a resume
+        columns = [row[1] for row in self._db.execute("PRAGMA table_info(listing_pages)")]
+        if "codes" not in columns:
+            self._db.execute("ALTER TABLE listing_pages ADD COLUMN codes TEXT")
+        self._db.commit()
+
+    def listing_page(self, url):
+        # (products, last_page, product codes) of a finished listing page, None if it still has to be fetched
+        with self._lock:
+            row = self._db.execute("SELECT products, last_page, codes FROM listing_pages WHERE url = ?", (url,)).fetchone()
+        if row is None:
+            return None
+        found, last, codes = row
+        return found, last, set(json.loads(codes or "[]"))
+
+    def add_listing_page(self, url, category, page, products, last=None):
+        now = time.time()
+        with self._lock:
+            before = self._db.total_changes
+            self._db.executemany(
+                "INSERT OR IGNORE INTO products (product_code, url, category, discovered_at) VALUES (?, ?, ?, ?)",
+                [(code, product_url, category, now) for code, product_url in products.items()],
+            )
+            new = self._db.total_changes - before
+            self._db.execute(
+                "INSERT OR REPLACE INTO listing_pages "
+                "(url, category, page, products, new_products, last_page, fetched_at, codes) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (url, category, page, len(products), new, last, now, json.dumps(sorted(products))),
+            )
+            self._db.commit()
+        return new
+
+    def forget_listing_pages(self):
+        with self._lock:
+            self._db.execute("DELETE FROM listing_pages")
+            self._db.commit()
+
+    def requeue_done(self, older_than):
+        # products scraped before `older_than` (a timestamp) are scraped again
+        with self._lock:
+            count = self._db.execute(
+                "UPDATE products SET status = 'pending', attempts = 0 WHERE status = 'done' AND scraped_at < ?",
+                (older_than,),
+            ).rowcount
+            self._db.commit()
+        return count
+
+    def pending(self, max_attempts=3):
+        with self._lock:
+            return self._db.execute(
+                "SELECT product_code, url FROM products WHERE status != 'done' AND attempts < ? ORDER BY discovered_at",
+                (max_attempts,),
+            ).fetchall()
+
+    def mark_done(self, codes):
+        with self._lock:
+            self._db.executemany(
+                "UPDATE products SET status = 'done', error = NULL, scraped_at = ? WHERE product_code = ?",
+                [(time.time(), code) for code in codes],
+            )
+            self._db.commit()
+
+    def mark_failed(self, code, error):
+        with self._lock:
+            self._db.execute(
+                "UPDATE products SET status = 'failed', attempts = attempts + 1, error = ? WHERE product_code = ?",
+                (str(error)[:500], code),
+            )
+            self._db.commit()
+
+    def stats(self):
+        with self._lock:
+            return dict(self._db.execute("SELECT status, COUNT(*) FROM products GROUP BY status").fetchall())
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+def crawl_category(frontier, category_url, max_pages=100, backend=DEFAULT_BACKEND, cache=None, limiter=None):
+    scraper = get_scraper(limiter)
+    last = None
+    seen = set()
+    for page in range(1, max_pages + 1):
+        if last is not None and page > last:
+            break
+        url = listing_url(category_url, page)
+
+        known = frontier.listing_page(url)
+        if known is not None:
+            found, page_last, codes = known
+            seen.update(codes)
+            print(f"[{url}] done before: {found} products")
+        else:
+            with metrics.stage("listing_fetch", "requests"):
+                response = cache.get(scraper, url, headers=headers) if cache else scraper.get(url, headers=headers)
+            if not getattr(response, "from_cache", False):
+                metrics.count("bytes_downloaded", len(response.content), engine="requests")
+            if response.status_code == 404:
+                break
+            # a block page has no tiles: saving it as finished would end the category on every resume
+            if response.status_code != 200 or rate_limit.is_blocked(response):
+                raise rate_limit.Blocked(f"{response.status_code} for {url}")
+            with metrics.stage("listing_parse", "requests"):
+                root = parse(response.text, backend)
+                products = product_tiles(root, url)
+                page_last = last_page(root)
+            found = len(products)
+            # without a paginator, past the last page Rozetka shows the last one again
+            if page_last is None and page > 1 and seen.issuperset(products):
+                break
+            seen.update(products)
+            new = frontier.add_listing_page(url, category_url, page, products, page_last)
+            print(f"[{url}] {found} products, {new} new")
+
+        last = page_last or last
+        if not found:
+            break
+
+
+def scrape_pending(frontier, workers=8, backend=DEFAULT_BACKEND, cache=None, batch_size=100, max_attempts=3, limiter=None):
+    # imported here: it sets up Django, which discovering products does not need
+    requests_parser = importlib.import_module("1_requestsBS4_parse")
+
+    codes = {url: code for code, url in frontier.pending(max_attempts)}
+    if not codes:
+        return
+
+    batch = []
+
+    def flush():
+        urls = {id(data): url for url, data in batch}
+        failed = set()
+
+        def rejected(data, error):
+            print(f"[{urls[id(data)]}] Error while saving: {error}")
+            failed.add(urls[id(data)])
+            frontier.mark_failed(codes[urls[id(data)]], error)
+
+        requests_parser.upsert_products([data for _, data in batch], stage=metrics.stage, on_error=rejected)
+        frontier.mark_done([codes[url] for url, _ in batch if url not in failed])
+        batch.clear()
+
+    handler = partial(requests_parser.parse_product, backend=backend, cache=cache)
+    for url, data, error in fetch_all(codes, handler, workers=workers, limiter=limiter):
+        if error:
+            print(f"[{url}] Error: {error}")
+            metrics.count("errors", engine="requests", error=type(error).__name__)
+            frontier.mark_failed(codes[url], error)
+            continue
+        batch.append((url, data))
+        if len(batch) >= batch_size:
+            flush()
+    if batch:
+        flush()
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Crawl Rozetka categories and scrape every product in them.")
+    arg_parser.add_argument("categories", nargs="+", help="category listing URLs, e.g. https://rozetka.com.ua/ua/mobile-phones/c80003/")
+    arg_parser.add_argument("--frontier", default=FRONTIER_PATH, help="SQLite file with the crawl state")
+    arg_parser.add_argument("--max-pages", type=int, default=100, help="listing pages per category")
+    arg_parser.add_argument("--workers", type=int, default=8, help="concurrent product page workers")
+    arg_parser.add_argument("--parser", choices=BACKENDS, default=DEFAULT_BACKEND, help="HTML parser backend")
+    arg_parser.add_argument("--cache", choices=CACHE_MODES, default="on", help="on-disk response cache for product pages")
+    arg_parser.add_argument("--batch-size", type=int, default=100, help="products written to the database per transaction")
+    arg_parser.add_argument("--max-attempts", type=int, default=3, help="failed products are retried until this many attempts")
+    arg_parser.add_argument("--recrawl", action="store_true", help="fetch the listing pages again to discover new products")
+    arg_parser.add_argument("--rescrape-after", type=float, metavar="DAYS", help="scrape again the products scraped more than DAYS days ago")
+    arg_parser.add_argument("--no-scrape", action="store_true", help="only discover products")
+    arg_parser.add_argument("--export-urls", help="write the pending product URLs to this file (for the browser scrapers)")
+    rate_limit.add_arguments(arg_parser)
+    args = arg_parser.parse_args()
+
+    metrics.configure("category_crawler", "requests")
+    try:
+        run(args)
+    finally:
+        metrics.finish()
+
+
+def run(args):
+    limiter = rate_limit.from_args(args)
+
+    frontier = Frontier(args.frontier)
+    if args.recrawl:
+        frontier.forget_listing_pages()
+    if args.rescrape_after is not None:
+        count = frontier.requeue_done(time.time() - args.rescrape_after * 24 * 3600)
+        print(f"frontier: {count} products scraped more than {args.rescrape_after:g} days ago are pending again")
+
+    for category in args.categories:
+        try:
+            crawl_category(frontier, category, args.max_pages, args.parser, limiter=limiter)
+        except rate_limit.Blocked as e:
+            # the page is not saved: the next run continues the category from it
+            print(f"[{category}] stopped, listing page blocked: {e}")
+    print(f"frontier: {frontier.stats()}")
+
+    if args.export_urls:
+        with open(args.export_urls, "w", encoding="utf-8") as f:
+            for _, url in frontier.pending(args.max_attempts):
+                f.write(url + "\n")
+
+    if not args.no_scrape:
+        cache = ResponseCache(mode=args.cache) if args.cache != "off" else None
+        scrape_pending(frontier, args.workers, args.parser, cache, args.batch_size, args.max_attempts, limiter)
+        print(f"frontier: {frontier.stats()}")
+
+
+if __name__ == "__main__":
+    main()
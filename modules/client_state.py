@@ -0,0 +1,208 @@
+"""
+This module reads product data straight from the JSON that Rozetka embeds into every product page, without building an HTML tree.
+
+A product page carries, besides the markup:
+- `<script type="application/ld+json" data-seo="Product">` with the name, SKU, images, offer price and rating count;
+- `<script id="rz-client-state" type="application/json">` - the Angular transfer state with the raw API responses
+  (`get-main`, `get-price`, `get-variables`, `get-characteristic`, `get-goods-total`, `getDetails`, ...).
+
+The blobs are located with plain `str.find` scans and only the blobs (and then only the API bodies that are needed)
+are decoded with `json.loads`, which is far cheaper than parsing the whole ~1 MB page into a soup.
+
+`extract_state(html)` returns `(data, characteristics_url)`. `data` holds only the fields that were actually found
+in the embedded JSON, so the caller can fall back to HTML parsing for the missing ones.
+`normalize_seller(name)` is the one spelling of a seller name used by every extraction path (JSON, HTML, browsers).
+"""
+
+import json
+
+
+STATE_SCRIPT = '<script id="rz-client-state" type="application/json">'
+LD_JSON_SCRIPT = '<script type="application/ld+json"'
+SCRIPT_END = '</script>'
+
+# rz-client-state escapes URLs inside its keys and values
+URL_ESCAPES = (
+    ("$hs$", "https://"),
+    ("$ht$", "http://"),
+    ("$sh$", "/"),
+    ("$dt$", "."),
+    ("$qr$", "?"),
+    ("$ad$", "&"),
+)
+
+COLOR_OPTION = "Колір"
+MEMORY_OPTION = "Вбудована пам'ять"
+SHORT_SPECS = {
+    "series": "Серія",
+    "screen_diagonal": "Діагональ екрана",
+    "display_resolution": "Роздільна здатність дисплея",
+}
+
+
+def unescape_url(value):
+    if not value:
+        return value
+    for escaped, char in URL_ESCAPES:
+        value = value.replace(escaped, char)
+    return value
+
+
+def script_bodies(html, marker):
+    start = html.find(marker)
+    while start != -1:
+        body_start = html.find('>', start) + 1
+        body_end = html.find(SCRIPT_END, body_start)
+        if body_start == 0 or body_end == -1:
+            return
+        yield html[body_start:body_end]
+        start = html.find(marker, body_end)
+
+
+def ld_json(html, seo_type):
+    for body in script_bodies(html, LD_JSON_SCRIPT):
+        try:
+            block = json.loads(body)
+        except ValueError:
+            continue
+        if isinstance(block, dict) and block.get("@type") == seo_type:
+            return block
+    return None
+
+
+def client_state(html):
+    for body in script_bodies(html, STATE_SCRIPT):
+        try:
+            return json.loads(body)
+        except ValueError:
+            return None
+    return None
+
+
+def state_body(state, endpoint):
+    for key, value in state.items():
+        if endpoint in key and isinstance(value, dict) and value.get("status") == 200:
+            try:
+                return json.loads(value["body"])
+            except (KeyError, TypeError, ValueError):
+                return None
+    return None
+
+
+def _to_int(value):
+    try:
+        return int(str(value).replace('\xa0', '').replace(' ', '').strip())
+    except (TypeError, ValueError):
+        return None
+
+
+def normalize_seller(name):
+    # the JSON has "Rozetka", the seller block "Rozetka." - one spelling, or the product fingerprint flips between them
+    if not name:
+        return None
+    return name.strip().rstrip(".,;:").strip() or None
+
+
+def _prices(data, price, old_price):
+    price, old_price = _to_int(price), _to_int(old_price)
+    if not price:
+        return
+    if old_price and old_price > price:
+        data["regular_price"] = old_price
+        data["promotional_price"] = price
+    else:
+        data["regular_price"] = price
+        data["promotional_price"] = None
+
+
+def _from_ld_json(data, product):
+    if product.get("name"):
+        data["full_name_of_the_product"] = product["name"].strip()
+    if _to_int(product.get("sku")):
+        data["product_code"] = _to_int(product["sku"])
+    rating = product.get("aggregateRating") or {}
+    if _to_int(rating.get("ratingCount")) is not None:
+        data["number_of_reviews"] = _to_int(rating["ratingCount"])
+    image = product.get("image")
+    if image:
+        # schema.org allows a single URL, a list of URLs or ImageObjects
+        images = [image] if isinstance(image, (str, dict)) else list(image)
+        photos = [item.get("contentUrl") or item.get("url") if isinstance(item, dict) else item for item in images]
+        data["all_product_photos"] = [photo for photo in photos if isinstance(photo, str) and photo]
+
+
+def _from_state(data, state):
+    main = (state_body(state, "goods$sh$get-main$qr$") or {}).get("data") or {}
+    if main.get("title"):
+        data["full_name_of_the_product"] = main["title"].strip()
+    if _to_int(main.get("id")):
+        data["product_code"] = _to_int(main["id"])
+    if main.get("price"):
+        _prices(data, main.get("price"), main.get("old_price"))
+
+    images = []
+    for image in main.get("images") or []:
+        medium = (image.get("medium") or {}).get("url")
+        if medium:
+            images.append(unescape_url(medium))
+    if images:
+        data["all_product_photos"] = images
+
+    code = data.get("product_code")
+
+    price = state_body(state, f"get-price$sh$$qr$id={code}$")
+    if price and price.get("price"):
+        _prices(data, price.get("price"), price.get("old_price"))
+
+    variables = (state_body(state, "goods$sh$get-variables$qr$") or {}).get("data") or {}
+    product = (variables.get("products") or {}).get(str(code)) or {}
+    for option_id, title in (product.get("option_titles") or {}).items():
+        option = (variables.get("options") or {}).get(option_id) or {}
+        if option.get("title") == COLOR_OPTION:
+            data["color"] = title.strip()
+        elif option.get("title") == MEMORY_OPTION:
+            memory_size = _to_int(title.replace('ГБ', ''))
+            if memory_size is not None:
+                data["memory_size"] = memory_size
+
+    totals = (state_body(state, "comments$sh$get-goods-total$qr$") or {}).get("data") or []
+    for total in totals:
+        if total.get("productId") == code and "amount" in (total.get("comments") or {}):
+            data["number_of_reviews"] = _to_int(total["comments"]["amount"])
+
+    characteristics = (state_body(state, "goods$sh$get-characteristic$qr$") or {}).get("data") or []
+    for group in characteristics:
+        for option in group.get("options") or []:
+            for field, title in SHORT_SPECS.items():
+                if option.get("title") == title and field not in data:
+                    values = [v["title"].strip() for v in option.get("values") or [] if v.get("title")]
+                    if values:
+                        data[field] = ", ".join(values)
+
+    details = (state_body(state, "goods$sh$getDetails$qr$") or {}).get("data") or []
+    for detail in details:
+        seller = detail.get("seller") or {}
+        if detail.get("id") == code and seller.get("title"):
+            data["seller"] = normalize_seller(seller["title"])
+
+    return unescape_url(main.get("href"))
+
+
+def extract_state(html):
+    data = {}
+    characteristics_url = None
+
+    product = ld_json(html, "Product")
+    if product:
+        _from_ld_json(data, product)
+
+    state = client_state(html)
+    if state:
+        href = _from_state(data, state)
+        if href:
+            characteristics_url = href.rstrip('/') + "/characteristics/"
+
+    if characteristics_url is None and product and product.get("url"):
+        characteristics_url = product["url"].rstrip('/') + "/characteristics/"
+
+    return data, characteristics_url
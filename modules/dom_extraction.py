@@ -0,0 +1,69 @@
+"""
+This module is the bulk DOM extraction shared by the browser scrapers.
+
+Reading every field, image and spec row through its own locator / `find_element` costs one browser round-trip each
+(hundreds per product with the characteristics tab). Instead, `extract_product.js` runs once in the page and returns
+all of it as a single JSON payload:
+
+- Playwright: `await page.evaluate(EXTRACT_JS, extraction_args())`;
+- Selenium:   `driver.execute_script(SELENIUM_SCRIPT, extraction_args(...))`.
+
+`product_data(raw)` turns the payload of the product page into the usual `data` fields (with the same int conversions
+as before), `raw["specifications"]` of the characteristics page is the `product_specifications` dict.
+"""
+
+import os
+
+from client_state import normalize_seller
+from xpath_fields import FIELD_XPATHS, SELLER_LINK, SELLER_LOGO, PHOTOS, SPEC_SECTIONS
+
+
+MODULE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def _load_script(name):
+    with open(os.path.join(MODULE_DIR, name), encoding="utf-8") as f:
+        # Playwright only recognises the text as a function if it starts with one
+        return "\n".join(line for line in f.read().splitlines() if not line.startswith("//")).strip()
+
+
+EXTRACT_JS = _load_script("extract_product.js")
+SELENIUM_SCRIPT = f"return ({EXTRACT_JS})(arguments[0]);"
+
+INT_FIELDS = {
+    "memory_size": ("ГБ",),
+    "promotional_price": ("₴", " "),
+    "regular_price": ("₴", " "),
+    "product_code": ("Код:",),
+    "number_of_reviews": ("відгуки",),
+}
+
+
+def extraction_args(photos=PHOTOS):
+    return {
+        "fields": FIELD_XPATHS,
+        "sellerLink": SELLER_LINK,
+        "sellerLogo": SELLER_LOGO,
+        "photos": photos,
+        "specSections": SPEC_SECTIONS,
+    }
+
+
+def to_int(raw, *remove):
+    if not raw:
+        return None
+    for part in remove:
+        raw = raw.replace(part, "")
+    try:
+        return int(raw.strip())
+    except ValueError:
+        return None
+
+
+def product_data(raw):
+    data = {}
+    for field, text in raw["fields"].items():
+        data[field] = to_int(text, *INT_FIELDS[field]) if field in INT_FIELDS else text
+    data["seller"] = normalize_seller(raw["seller"])
+    data["all_product_photos"] = raw["photos"]
+    return data
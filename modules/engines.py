@@ -0,0 +1,238 @@
+"""
+This module puts the three scrapers behind one interface, so a caller can pick the engine per page instead of per script.
+
+- `Parser.parse(item)` takes a product URL or a search query and returns a record with exactly `RECORD_FIELDS`
+  (the `data` dict every scraper already produces, plus `product_specifications`) and its `fingerprint`;
+  `close()` frees the engine. `Parser` is an `abc.ABC`: an engine without `parse` fails when it is created.
+- `RequestsParser` - `cloudscraper` + HTML (`1_requestsBS4_parse.py`): one HTTP request per page, no browser;
+- `SeleniumParser` - undetected Chrome (`2_selenium_parser.py`), up to `workers` drivers reused between pages;
+- `PlaywrightParser` - one shared browser (`3_playwright_parser.py`) on its own event loop thread, a fresh context
+  per page, up to `workers` pages at a time.
+- `TieredParser(tiers)` tries the tiers in order and moves a page to the next one only when the cheaper one was
+  blocked (`rate_limit.Blocked`: 403/429/503 or a Cloudflare challenge), failed, or returned a record without one
+  of the `required` fields. Every page's path through the tiers is counted (`stats`, `report()`) and, optionally,
+  appended to a JSON lines file, which shows which pages (and why) needed a browser; escalations are also counted
+  in `metrics.py` (`escalations`, by tier and reason).
+
+The engine modules are imported when the engine is created, so a run that never escalates does not need
+Selenium or Playwright installed.
+"""
+
+import abc
+import json
+import time
+import queue
+import asyncio
+import importlib
+import threading
+from collections import Counter
+
+from html_backends import DEFAULT_BACKEND
+from product_parser import FIELDS, fingerprint
+from request_blocking import BLOCKED_HOSTS, BLOCKED_RESOURCE_TYPES, ResourceBlocker
+from pacing import Pacing
+from rate_limit import Blocked
+import metrics
+
+
+RECORD_FIELDS = FIELDS + ("product_specifications",)
+REQUIRED_FIELDS = ("full_name_of_the_product", "product_code", "regular_price")
+
+
+def to_record(data):
+    record = {field: data.get(field) for field in RECORD_FIELDS}
+    record["fingerprint"] = data.get("fingerprint") or fingerprint(record)
+    return record
+
+
+def missing_fields(record, required=REQUIRED_FIELDS):
+    return [field for field in required if record.get(field) in (None, "", [], {})]
+
+
+class EscalationFailed(Exception):
+    pass
+
+
+class Parser(abc.ABC):
+    name = None
+
+    @abc.abstractmethod
+    def parse(self, item):
+        pass
+
+    def close(self):
+        pass
+
+
+class RequestsParser(Parser):
+    name = "requests"
+
+    def __init__(self, backend=DEFAULT_BACKEND, cache=None, url_cache=None, limiter=None):
+        self.module = importlib.import_module("1_requestsBS4_parse")
+        self.backend = backend
+        self.cache = cache
+        self.url_cache = url_cache
+        self.limiter = limiter
+
+    def parse(self, item):
+        scraper = self.module.get_scraper(self.limiter)
+        return to_record(self.module.parse_product(scraper, item, self.backend, self.cache, self.url_cache))
+
+
+class SeleniumParser(Parser):
+    name = "selenium"
+
+    def __init__(self, workers=1, headless=True, pacing=None, url_cache=None):
+        self.module = importlib.import_module("2_selenium_parser")
+        self.headless = headless
+        self.pacing = pacing or Pacing()
+        self.url_cache = url_cache
+        self._slots = threading.Semaphore(workers)
+        self._idle = queue.LifoQueue()
+        self._drivers = []
+        self._lock = threading.Lock()
+
+    def _driver(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            driver = self.module.make_driver(self.headless)
+            with self._lock:
+                self._drivers.append(driver)
+            return driver
+
+    def _quit(self, driver):
+        with self._lock:
+            if driver in self._drivers:
+                self._drivers.remove(driver)
+        try:
+            driver.quit()
+        except Exception:
+            pass
+
+    def parse(self, item):
+        with self._slots:
+            driver = self._driver()
+            try:
+                data = self.module.scrape(driver, item, self.pacing, "script", self.url_cache)
+            except self.module.WebDriverException:
+                # the driver may be in any state (crashed tab, dead session) - the next page starts a new one
+                self._quit(driver)
+                raise
+            self._idle.put(driver)
+            return to_record(data)
+
+    def close(self):
+        with self._lock:
+            drivers = list(self._drivers)
+        for driver in drivers:
+            self._quit(driver)
+
+
+class PlaywrightParser(Parser):
+    name = "playwright"
+
+    def __init__(self, workers=1, headless=True, pacing=None, url_cache=None, block=True):
+        self.module = importlib.import_module("3_playwright_parser")
+        make_blocker = (lambda: ResourceBlocker(BLOCKED_RESOURCE_TYPES, BLOCKED_HOSTS)) if block else None
+        self.settings = self.module.Settings("events", pacing, "evaluate", make_blocker, headless, url_cache)
+        self._slots = threading.Semaphore(workers)
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="playwright", daemon=True)
+        self._thread.start()
+        self._started = None
+        self._playwright = self._handle = None
+
+    async def _start(self):
+        self._playwright = await self.module.async_playwright().start()
+        self._handle = self.module.BrowserHandle(self._playwright, self.settings)
+
+    async def _scrape(self, item):
+        # the browser is launched by the first page that needs it
+        if self._started is None:
+            self._started = asyncio.ensure_future(self._start())
+        await self._started
+
+        context, blocker = await self.module.new_context(await self._handle.get(), self.settings)
+        try:
+            page = await context.new_page()
+            return await self.module.scrape(page, item, self.settings, blocker)
+        finally:
+            await self.module.close_quietly(context)
+
+    async def _stop(self):
+        if self._handle is not None:
+            await self._handle.close()
+            await self._playwright.stop()
+
+    def parse(self, item):
+        with self._slots:
+            return to_record(asyncio.run_coroutine_threadsafe(self._scrape(item), self._loop).result())
+
+    def close(self):
+        asyncio.run_coroutine_threadsafe(self._stop(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+
+
+class TieredParser(Parser):
+    name = "tiered"
+
+    def __init__(self, tiers, required=REQUIRED_FIELDS, log_path=None):
+        self.tiers = tiers
+        self.required = required
+        self.stats = Counter()
+        self._lock = threading.Lock()
+        self._log = open(log_path, "a", encoding="utf-8") if log_path else None
+
+    def parse(self, item):
+        escalations = []
+        best = best_tier = error = None
+        for tier in self.tiers:
+            started = time.perf_counter()
+            try:
+                record = tier.parse(item)
+            except Blocked as e:
+                reason, error = "blocked", e
+            except Exception as e:
+                reason, error = f"error: {type(e).__name__}", e
+            else:
+                missing = missing_fields(record, self.required)
+                if not missing:
+                    self._account(item, tier.name, escalations, complete=True)
+                    return record
+                reason = "missing: " + ",".join(missing)
+                best, best_tier = record, tier.name
+            escalations.append({"tier": tier.name, "reason": reason, "seconds": round(time.perf_counter() - started, 2)})
+
+        # no tier had every required field (e.g. a product without a price): keep the last incomplete record
+        self._account(item, best_tier, escalations, complete=False)
+        if best is not None:
+            return best
+        raise EscalationFailed("; ".join(f"{e['tier']}: {e['reason']}" for e in escalations)) from error
+
+    def _account(self, item, served_by, escalations, complete):
+        with self._lock:
+            if served_by is None:
+                self.stats["failed"] += 1
+            else:
+                self.stats[f"served by {served_by}" + ("" if complete else " (incomplete)")] += 1
+            for escalation in escalations:
+                self.stats[f"escalated from {escalation['tier']} ({escalation['reason']})"] += 1
+                metrics.count("escalations", engine=escalation["tier"], reason=escalation["reason"].split(":")[0])
+            if self._log:
+                self._log.write(json.dumps(
+                    {"item": item, "served_by": served_by, "complete": complete, "escalations": escalations, "at": time.time()},
+                    ensure_ascii=False,
+                ) + "\n")
+                self._log.flush()
+
+    def report(self):
+        for key, count in sorted(self.stats.items()):
+            print(f"[tiers] {key}: {count}")
+
+    def close(self):
+        for tier in self.tiers:
+            tier.close()
+        if self._log:
+            self._log.close()
@@ -0,0 +1,42 @@
+// Extracts everything the browser scrapers read from a Rozetka product page in one call.
+// Used by `dom_extraction.py` for `page.evaluate` (Playwright) and `driver.execute_script` (Selenium).
+// Takes the XPath expressions from `xpath_fields.py` and returns raw strings; conversion happens in Python.
+(args) => {
+  const all = (xpath, context = document) => {
+    const found = document.evaluate(xpath, context, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+    const nodes = [];
+    for (let i = 0; i < found.snapshotLength; i++) nodes.push(found.snapshotItem(i));
+    return nodes;
+  };
+  const first = (xpath, context = document) =>
+    document.evaluate(xpath, context, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;
+  const text = (node) => (node ? node.innerText.replace(/\u00a0/g, "").trim() : null);
+
+  const fields = {};
+  for (const [name, xpath] of Object.entries(args.fields)) {
+    fields[name] = text(first(xpath));
+  }
+
+  const sellerLink = first(args.sellerLink);
+  const sellerLogo = first(args.sellerLogo);
+  const seller = sellerLink ? text(sellerLink) : sellerLogo ? sellerLogo.getAttribute("alt") : null;
+
+  const photos = all(args.photos).map((img) => img.getAttribute("src"));
+
+  const specifications = {};
+  all(args.specSections).forEach((section, i) => {
+    const divs = all("./dl/div", section);
+    if (!divs.length) return;
+    const specs = {};
+    for (const div of divs) {
+      const dts = all("./dt", div);
+      const dds = all("./dd", div);
+      for (let j = 0; j < Math.min(dts.length, dds.length); j++) {
+        specs[dts[j].innerText.trim()] = dds[j].innerText.trim();
+      }
+    }
+    specifications[`product_specification_${i}`] = specs;
+  });
+
+  return { fields, seller, photos, specifications };
+}
@@ -0,0 +1,79 @@
+"""
+This module hides the HTML parser behind a tiny common interface, so the field extraction in `product_parser.py`
+is written once (with CSS selectors) and gives the same output with every backend.
+
+Available backends (`BACKENDS`):
+- `html.parser` - `BeautifulSoup` with the pure-Python parser from the standard library (the original, slowest one);
+- `lxml`        - `BeautifulSoup` with the `lxml` tree builder (needs `lxml`);
+- `selectolax`  - the `selectolax` binding to the lexbor engine (needs `selectolax`), no `BeautifulSoup` at all.
+
+`parse(html, backend)` returns the root `Node`. A `Node` has:
+- `select(css)` / `select_one(css)` - CSS queries relative to the node;
+- `text` - the text of the node and all its descendants;
+- `attr(name)` - an attribute value or `None`.
+"""
+
+from bs4 import BeautifulSoup
+
+try:
+    from selectolax.lexbor import LexborHTMLParser
+except ImportError:
+    LexborHTMLParser = None
+
+
+DEFAULT_BACKEND = "html.parser"
+BACKENDS = ("html.parser", "lxml", "selectolax")
+
+
+class SoupNode:
+    __slots__ = ("_tag",)
+
+    def __init__(self, tag):
+        self._tag = tag
+
+    def select(self, css):
+        return [SoupNode(tag) for tag in self._tag.select(css)]
+
+    def select_one(self, css):
+        tag = self._tag.select_one(css)
+        return SoupNode(tag) if tag is not None else None
+
+    @property
+    def text(self):
+        return self._tag.get_text()
+
+    def attr(self, name):
+        return self._tag.get(name)
+
+
+class LexborNode:
+    __slots__ = ("_node",)
+
+    def __init__(self, node):
+        self._node = node
+
+    def select(self, css):
+        return [LexborNode(node) for node in self._node.css(css)]
+
+    def select_one(self, css):
+        node = self._node.css_first(css)
+        return LexborNode(node) if node is not None else None
+
+    @property
+    def text(self):
+        return self._node.text(deep=True)
+
+    def attr(self, name):
+        return self._node.attributes.get(name)
+
+
+def parse(html, backend=DEFAULT_BACKEND):
+    if backend == "html.parser":
+        return SoupNode(BeautifulSoup(html, 'html.parser'))
+    if backend == "lxml":
+        return SoupNode(BeautifulSoup(html, 'lxml'))
+    if backend == "selectolax":
+        if LexborHTMLParser is None:
+            raise ImportError("The 'selectolax' backend needs the selectolax package: pip install selectolax")
+        return LexborNode(LexborHTMLParser(html).root)
+    raise ValueError(f"Unknown HTML parser backend: {backend!r}, expected one of {BACKENDS}")
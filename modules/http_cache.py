@@ -0,0 +1,238 @@
+"""
+This module is an on-disk HTTP response cache for the `cloudscraper` / `requests` sessions used by the scrapers.
+
+Layout (under `results/http_cache/` by default):
+- `blobs/ab/<sha256>.gz` - gzip-compressed response bodies, content-addressed by the SHA-256 of the body, so the same
+  page stored under several URLs (or re-downloaded unchanged) takes the disk space once;
+- `index.sqlite`         - URL -> blob hash, final URL (after redirects), status, encoding, `ETag` / `Last-Modified`,
+  fetch and access times.
+
+`ResponseCache.get(session, url, headers)` behaves like `session.get(url, headers=headers)`:
+- a fresh entry (younger than `ttl` seconds) is returned from disk without touching the network;
+- a stale entry is revalidated with `If-None-Match` / `If-Modified-Since` (when the server sent validators);
+  `304 Not Modified` only refreshes the entry, `200` stores the new body;
+- in `cache-only` mode the network is never used: any stored entry is returned, a miss raises `CacheMiss`
+  (useful for re-parsing everything that was downloaded before);
+- when the blobs grow over `max_bytes`, the least recently used entries are evicted (the size of the blobs is kept as
+  a running total, the index is only summed again when that total goes over the limit); a page stored again with a
+  different body drops its previous blob (unless another entry still uses it).
+
+A response served from the cache reports the URL the original request ended at as `.url`, like `requests` does,
+so a redirect (e.g. a search that redirects straight to the product page) is still visible.
+
+Only `200` responses are stored, and not a Cloudflare challenge served with `200` (`rate_limit.is_challenge`);
+anything else is passed through untouched.
+"""
+
+import os
+import gzip
+import time
+import sqlite3
+import hashlib
+import threading
+
+from rate_limit import is_challenge
+
+
+MODULE_DIR = os.path.dirname(os.path.abspath(__file__))
+CACHE_DIR = os.path.join(MODULE_DIR, "..", "results", "http_cache")
+
+CACHE_MODES = ("off", "on", "only")
+
+
+class CacheMiss(Exception):
+    pass
+
+
+class CachedResponse:
+    def __init__(self, url, status_code, content, encoding, headers=None, from_cache=True):
+        self.url = url
+        self.status_code = status_code
+        self.content = content
+        self.encoding = encoding or "utf-8"
+        self.headers = headers or {}
+        self.from_cache = from_cache
+
+    @property
+    def text(self):
+        return self.content.decode(self.encoding, errors="replace")
+
+    @property
+    def ok(self):
+        return self.status_code < 400
+
+
+class ResponseCache:
+    def __init__(self, path=CACHE_DIR, ttl=0, max_bytes=2 * 1024 ** 3, mode="on"):
+        if mode not in CACHE_MODES:
+            raise ValueError(f"Unknown cache mode: {mode!r}, expected one of {CACHE_MODES}")
+        self.path = os.path.abspath(path)
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.mode = mode
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.join(self.path, "blobs"), exist_ok=True)
+        self._db = sqlite3.connect(os.path.join(self.path, "index.sqlite"), check_same_thread=False)
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                url TEXT PRIMARY KEY,
+                blob TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                status INTEGER NOT NULL,
+                encoding TEXT,
+                etag TEXT,
+                last_modified TEXT,
+                fetched_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+        """)
+        self._db.execute("CREATE INDEX IF NOT EXISTS responses_accessed_at ON responses (accessed_at)")
+        # added later: caches created before it keep working, their entries report the request URL
+        columns = [row[1] for row in self._db.execute("PRAGMA table_info(responses)")]
+        if "final_url" not in columns:
+            self._db.execute("ALTER TABLE responses ADD COLUMN final_url TEXT")
+        self._db.commit()
+        self._total = self._stored_bytes()
+
+    # ------------------------------------------------------------ blobs
+
+    def _blob_path(self, digest):
+        return os.path.join(self.path, "blobs", digest[:2], digest + ".gz")
+
+    def _read_blob(self, digest):
+        with gzip.open(self._blob_path(digest), "rb") as f:
+            return f.read()
+
+    def _write_blob(self, content):
+        digest = hashlib.sha256(content).hexdigest()
+        path = self._blob_path(digest)
+        created = not os.path.exists(path)
+        if created:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp = f"{path}.{threading.get_ident()}.tmp"
+            with gzip.open(tmp, "wb", compresslevel=6) as f:
+                f.write(content)
+            os.replace(tmp, path)
+        return digest, os.path.getsize(path), created
+
+    # ------------------------------------------------------------ index
+
+    def _lookup(self, url):
+        with self._lock:
+            return self._db.execute(
+                "SELECT blob, status, encoding, etag, last_modified, fetched_at, final_url FROM responses WHERE url = ?", (url,)
+            ).fetchone()
+
+    def _touch(self, url, refetched=False):
+        now = time.time()
+        with self._lock:
+            if refetched:
+                self._db.execute("UPDATE responses SET fetched_at = ?, accessed_at = ? WHERE url = ?", (now, now, url))
+            else:
+                self._db.execute("UPDATE responses SET accessed_at = ? WHERE url = ?", (now, url))
+            self._db.commit()
+
+    def _store(self, url, response):
+        digest, size, created = self._write_blob(response.content)
+        now = time.time()
+        with self._lock:
+            old = self._db.execute("SELECT blob, size FROM responses WHERE url = ?", (url,)).fetchone()
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses "
+                "(url, blob, size, status, encoding, etag, last_modified, fetched_at, accessed_at, final_url) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    url, digest, size, response.status_code, response.encoding,
+                    response.headers.get("ETag"), response.headers.get("Last-Modified"), now, now,
+                    getattr(response, "url", None) or url,
+                ),
+            )
+            if created:
+                self._total += size
+            # a changed page replaces the entry: its previous body goes unless another URL has it too
+            if old is not None and old[0] != digest:
+                self._drop_blob(*old)
+            self._db.commit()
+        self.evict()
+
+    def _drop_blob(self, digest, size):
+        # under the lock, after the index row(s) pointing to it were changed or deleted
+        if self._db.execute("SELECT 1 FROM responses WHERE blob = ? LIMIT 1", (digest,)).fetchone():
+            return
+        try:
+            os.remove(self._blob_path(digest))
+        except FileNotFoundError:
+            pass
+        self._total -= size
+
+    def _stored_bytes(self):
+        return self._db.execute("SELECT COALESCE(SUM(size), 0) FROM (SELECT DISTINCT blob, size FROM responses)").fetchone()[0]
+
+    def evict(self):
+        with self._lock:
+            if self._total <= self.max_bytes:
+                return
+            # other processes may share the cache: count again before deleting anything
+            self._total = self._stored_bytes()
+            if self._total <= self.max_bytes:
+                return
+            rows = self._db.execute("SELECT url, blob, size FROM responses ORDER BY accessed_at").fetchall()
+            for url, digest, size in rows:
+                if self._total <= self.max_bytes * 0.9:
+                    break
+                self._db.execute("DELETE FROM responses WHERE url = ?", (url,))
+                self._drop_blob(digest, size)
+            self._db.commit()
+
+    # ------------------------------------------------------------ public
+
+    def _cached(self, url, entry):
+        digest, status, encoding, _, _, _, final_url = entry
+        try:
+            content = self._read_blob(digest)
+        except (OSError, EOFError):
+            return None
+        return CachedResponse(final_url or url, status, content, encoding)
+
+    def get(self, session, url, headers=None, **kwargs):
+        if self.mode == "off":
+            return session.get(url, headers=headers, **kwargs)
+
+        entry = self._lookup(url)
+        if entry is not None:
+            fresh = time.time() - entry[5] < self.ttl
+            if fresh or self.mode == "only":
+                cached = self._cached(url, entry)
+                if cached is not None:
+                    self._touch(url)
+                    return cached
+
+        if self.mode == "only":
+            raise CacheMiss(url)
+
+        request_headers = dict(headers or {})
+        if entry is not None:
+            _, _, _, etag, last_modified, _, _ = entry
+            if etag:
+                request_headers["If-None-Match"] = etag
+            if last_modified:
+                request_headers["If-Modified-Since"] = last_modified
+
+        response = session.get(url, headers=request_headers, **kwargs)
+
+        if response.status_code == 304 and entry is not None:
+            cached = self._cached(url, entry)
+            if cached is not None:
+                self._touch(url, refetched=True)
+                return cached
+            # the blob is gone - fetch the page again without validators
+            response = session.get(url, headers=headers, **kwargs)
+
+        if response.status_code == 200 and not is_challenge(response.headers, response.text):
+            self._store(url, response)
+        return response
+
+    def close(self):
+        with self._lock:
+            self._db.close()
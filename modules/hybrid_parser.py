@@ -0,0 +1,103 @@
+"""
+This script scrapes Rozetka products with the cheapest engine that works for each page (see `engines.py`):
+
+    python hybrid_parser.py --file urls.txt --workers 8 --browser playwright
+
+Every product URL or search query is first fetched with `cloudscraper` + HTML parsing (`1_requestsBS4_parse.py`).
+Only pages that come back blocked (403/429/503, a Cloudflare challenge), fail, or miss one of the `--require` fields
+are escalated to the browser engine (`--browser selenium|playwright`, at most `--browser-workers` browser pages at
+a time; `--browser none` never escalates). Both engines return the same record, which is written to one Excel file
+(`--output`) and upserted into the database in batches, as in `1_requestsBS4_parse.py`.
+
+At the end the run prints how many pages each tier served and why pages were escalated; the path of every page
+through the tiers is appended to `--stats` (JSON lines, `results/escalations.jsonl` by default) for tuning the policy.
+Each tier's stages are timed under its own engine (`requests`, `selenium`, `playwright`) in `metrics.py`, the Excel
+and database writes under `hybrid`; the summary is printed and saved under `results/metrics/` with the tier report.
+"""
+
+import os
+import argparse
+
+from _7_exel_template_write import RESULTS_DIR, ExelExporter
+from engines import REQUIRED_FIELDS, PlaywrightParser, RequestsParser, SeleniumParser, TieredParser
+from html_backends import BACKENDS, DEFAULT_BACKEND
+from http_cache import CACHE_MODES, ResponseCache
+from scraper_pool import fetch_all
+from url_cache import DEFAULT_TTL, UrlCache, read_items
+from pacing import Pacing
+import rate_limit
+import metrics
+
+
+BROWSERS = ("playwright", "selenium", "none")
+
+
+def make_tiers(args, cache, url_cache, limiter):
+    requests_tier = RequestsParser(args.parser, cache, url_cache, limiter)
+    if args.browser == "none":
+        return [requests_tier]
+    pacing = Pacing(limiter=limiter)
+    headless = not args.no_headless
+    if args.browser == "selenium":
+        return [requests_tier, SeleniumParser(args.browser_workers, headless, pacing, url_cache)]
+    return [requests_tier, PlaywrightParser(args.browser_workers, headless, pacing, url_cache)]
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Scrape Rozetka products, escalating to a browser only when needed.")
+    arg_parser.add_argument("items", nargs="*", help="product page URLs or search queries")
+    arg_parser.add_argument("--file", help="text file with one product URL or search query per line")
+    arg_parser.add_argument("--workers", type=int, default=8, help="pages processed concurrently")
+    arg_parser.add_argument("--browser", choices=BROWSERS, default="playwright", help="engine for escalated pages")
+    arg_parser.add_argument("--browser-workers", type=int, default=1, help="escalated pages in a browser at a time")
+    arg_parser.add_argument("--no-headless", action="store_true", help="show the browser window")
+    arg_parser.add_argument("--require", default=",".join(REQUIRED_FIELDS), help="comma-separated fields a record must have")
+    arg_parser.add_argument("--parser", choices=BACKENDS, default=DEFAULT_BACKEND, help="HTML parser backend")
+    arg_parser.add_argument("--cache", choices=CACHE_MODES, default="on", help="on-disk response cache for the HTML tier")
+    arg_parser.add_argument("--batch-size", type=int, default=100, help="products written to the database per transaction")
+    arg_parser.add_argument("--output", default=os.path.join(RESULTS_DIR, "hybrid_parse.xlsx"), help="Excel file")
+    arg_parser.add_argument("--stats", default=os.path.join(RESULTS_DIR, "escalations.jsonl"), help="per-page tier log ('' for none)")
+    arg_parser.add_argument("--url-cache-ttl", type=int, default=DEFAULT_TTL, help="seconds a resolved query -> product URL is reused (0: forever)")
+    arg_parser.add_argument("--no-url-cache", action="store_true", help="always search for queries")
+    rate_limit.add_arguments(arg_parser)
+    args = arg_parser.parse_args()
+
+    items = list(args.items)
+    if args.file:
+        items += read_items(args.file)
+    if not items:
+        arg_parser.error("no product URLs or queries given")
+
+    cache = ResponseCache(mode=args.cache) if args.cache != "off" else None
+    url_cache = None if args.no_url_cache else UrlCache(ttl=args.url_cache_ttl)
+    limiter = rate_limit.from_args(args)
+    required = tuple(field.strip() for field in args.require.split(",") if field.strip())
+
+    metrics.configure("hybrid_parser", "hybrid")
+    tiers = make_tiers(args, cache, url_cache, limiter)
+    hybrid = TieredParser(tiers, required, args.stats or None)
+    requests_parser = tiers[0].module
+
+    batch = []
+    try:
+        with ExelExporter(args.output) as exporter:
+            # the tiers get their own sessions / browsers: a cloudscraper session is made only if the requests tier runs
+            for item, record, error in fetch_all(items, hybrid.parse, workers=args.workers, sessions=False):
+                if error:
+                    print(f"[{item}] Error: {error}")
+                    metrics.count("errors", error=type(error).__name__)
+                    continue
+                batch.append(record)
+                if len(batch) >= args.batch_size:
+                    requests_parser.save_products(batch, exporter)
+                    batch = []
+            if batch:
+                requests_parser.save_products(batch, exporter)
+    finally:
+        hybrid.report()
+        hybrid.close()
+        metrics.finish()
+
+
+if __name__ == "__main__":
+    main()
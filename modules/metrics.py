@@ -0,0 +1,190 @@
+"""
+This module is the instrumentation of the scrape pipeline: per-stage timings and counters, shared by every engine.
+
+    metrics.configure("requestsBS4_parse", engine="requests")
+    with metrics.stage("fetch", "requests"):      # duration, calls and errors of the stage, per engine
+        response = scraper.get(url)
+    metrics.count("bytes_downloaded", len(response.content), engine="requests")
+    metrics.record_fields(data, "requests")       # field_missing{field=...} for every empty field
+    metrics.finish()                              # end of run: JSON summary
+
+Stages used by the scrapers: `fetch`, `spec_fetch` (the characteristics tab), `parse`, `spec_parse`,
+`rate_limit_wait`, `challenge` (from a block / Cloudflare challenge to the last retry), `excel_write`, `excel_save`,
+`db_write`, `photo_insert`, `price_history`, plus `listing_fetch` / `listing_parse` (category crawler) and `claim`
+(queue worker). Stages may nest: `fetch` includes the `rate_limit_wait` and `challenge` time of its request.
+Counters: `bytes_downloaded`, `cache_hits`, `challenges`, `field_missing` (by field), `errors` (by exception type),
+`products` (by outcome), `escalations` (by tier and reason).
+
+While a run is going, a snapshot is written every few seconds to `results/metrics/live/<job>-<host>-<pid>.json`;
+the Django view `/metrics` (`parser_app.views.metrics`) serves all recent snapshots in the Prometheus text format,
+so one scrape target shows every scraper process on the machine. `finish()` writes the final snapshot and the
+summary (`results/metrics/<job>-<timestamp>.json`: per stage calls, errors, total / mean / max seconds, and the
+counters) and prints it.
+"""
+
+import os
+import json
+import time
+import socket
+import threading
+from contextlib import contextmanager
+
+
+MODULE_DIR = os.path.dirname(os.path.abspath(__file__))
+METRICS_DIR = os.path.join(MODULE_DIR, "..", "results", "metrics")
+FLUSH_EVERY = 5
+
+# name -> (type, help) of every family in the snapshot
+FAMILIES = {
+    "scrape_stage_calls_total": ("counter", "Calls of a pipeline stage."),
+    "scrape_stage_errors_total": ("counter", "Calls of a pipeline stage that raised."),
+    "scrape_stage_seconds_total": ("counter", "Time spent in a pipeline stage."),
+    "scrape_stage_seconds_max": ("gauge", "Longest single call of a pipeline stage."),
+    "scrape_counter_total": ("counter", "Pipeline counters (bytes downloaded, missing fields, challenges, ...)."),
+    "scrape_run_started_timestamp_seconds": ("gauge", "Start of the scraper process."),
+    "scrape_run_updated_timestamp_seconds": ("gauge", "Last snapshot of the scraper process."),
+}
+
+
+class Metrics:
+    def __init__(self):
+        self.job = "scraper"
+        self.engine = "all"
+        self.live = False
+        self.started_at = time.time()
+        self._stages = {}
+        self._counters = {}
+        self._lock = threading.Lock()
+        self._flushed_at = 0
+
+    def configure(self, job, engine="all", live=True):
+        self.job = job
+        self.engine = engine
+        self.live = live
+
+    def observe(self, stage, seconds, engine=None, error=False):
+        key = (engine or self.engine, stage)
+        with self._lock:
+            calls, errors, total, longest = self._stages.get(key, (0, 0, 0.0, 0.0))
+            self._stages[key] = (calls + 1, errors + error, total + seconds, max(longest, seconds))
+        self.flush()
+
+    @contextmanager
+    def stage(self, stage, engine=None):
+        started = time.perf_counter()
+        error = False
+        try:
+            yield
+        except BaseException:
+            error = True
+            raise
+        finally:
+            self.observe(stage, time.perf_counter() - started, engine, error)
+
+    def count(self, name, value=1, engine=None, **labels):
+        key = (name, engine or self.engine, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def record_fields(self, data, engine=None, fields=None):
+        for field in fields or data:
+            if data.get(field) in (None, "", [], {}):
+                self.count("field_missing", engine=engine, field=field)
+
+    # ------------------------------------------------------------ output
+
+    def samples(self):
+        # [name, labels, value] in the Prometheus data model
+        with self._lock:
+            stages = dict(self._stages)
+            counters = dict(self._counters)
+        samples = []
+        for (engine, stage), (calls, errors, total, longest) in sorted(stages.items()):
+            labels = {"engine": engine, "stage": stage}
+            samples += [
+                ["scrape_stage_calls_total", labels, calls],
+                ["scrape_stage_errors_total", labels, errors],
+                ["scrape_stage_seconds_total", labels, round(total, 6)],
+                ["scrape_stage_seconds_max", labels, round(longest, 6)],
+            ]
+        for (name, engine, extra), value in sorted(counters.items()):
+            samples.append(["scrape_counter_total", {"name": name, "engine": engine, **dict(extra)}, value])
+        samples.append(["scrape_run_started_timestamp_seconds", {}, self.started_at])
+        samples.append(["scrape_run_updated_timestamp_seconds", {}, time.time()])
+        return samples
+
+    def snapshot(self):
+        return {
+            "job": self.job,
+            "instance": f"{socket.gethostname()}:{os.getpid()}",
+            "families": FAMILIES,
+            "samples": self.samples(),
+        }
+
+    def summary(self):
+        with self._lock:
+            stages = dict(self._stages)
+            counters = dict(self._counters)
+        return {
+            "job": self.job,
+            "started_at": self.started_at,
+            "seconds": round(time.time() - self.started_at, 3),
+            "stages": {
+                f"{engine}/{stage}": {
+                    "calls": calls,
+                    "errors": errors,
+                    "total_seconds": round(total, 3),
+                    "mean_seconds": round(total / calls, 4) if calls else 0,
+                    "max_seconds": round(longest, 3),
+                }
+                for (engine, stage), (calls, errors, total, longest) in sorted(stages.items(), key=lambda item: -item[1][2])
+            },
+            "counters": {
+                "/".join([engine, name] + [f"{k}={v}" for k, v in extra]): value
+                for (name, engine, extra), value in sorted(counters.items())
+            },
+        }
+
+    def flush(self, force=False):
+        # the live snapshot for /metrics, at most every FLUSH_EVERY seconds
+        if not self.live:
+            return
+        now = time.time()
+        with self._lock:
+            if not force and now - self._flushed_at < FLUSH_EVERY:
+                return
+            self._flushed_at = now
+        path = os.path.join(METRICS_DIR, "live", f"{self.job}-{socket.gethostname()}-{os.getpid()}.json")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.snapshot(), f, ensure_ascii=False)
+        os.replace(tmp, path)
+
+    def finish(self, path=None):
+        self.flush(force=True)
+        summary = self.summary()
+        path = path or os.path.join(METRICS_DIR, f"{self.job}-{time.strftime('%Y%m%d-%H%M%S')}.json")
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(summary, f, ensure_ascii=False, indent=2)
+
+        print(f"[metrics] {summary['seconds']:.1f} s, summary in {path}")
+        for name, stage in summary["stages"].items():
+            print(
+                f"[metrics] {name:<28} {stage['calls']:>7} calls {stage['errors']:>5} errors "
+                f"{stage['total_seconds']:>9.2f} s total {stage['mean_seconds'] * 1000:>9.1f} ms mean"
+            )
+        for name, value in summary["counters"].items():
+            print(f"[metrics] {name}: {value}")
+        return path
+
+
+METRICS = Metrics()
+
+configure = METRICS.configure
+stage = METRICS.stage
+observe = METRICS.observe
+count = METRICS.count
+record_fields = METRICS.record_fields
+finish = METRICS.finish
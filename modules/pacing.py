@@ -0,0 +1,53 @@
+"""
+This module is the opt-in "human-like" pacing policy of the browser scrapers.
+
+Waiting for the page itself is done with readiness conditions (selectors, URL changes, load states); pacing only adds
+deliberate idle time, and only once per navigation (before a `goto`, a search submit or a click that opens a new page),
+never per field:
+
+- `Pacing()`                            - no idle time at all, text is filled in at once;
+- `Pacing.from_arg("3000-5000")`        - a random pause of 3-5 s before every navigation;
+- `Pacing(jitter_ms=..., typing_delay_ms=(700, 900))` - also type the search query key by key;
+- `Pacing(limiter=RateLimiter(...))`    - every navigation also waits for a token of the shared rate limiter
+                                          (`rate_limit.py`), which is what keeps the request rate sustainable.
+"""
+
+import time
+import random
+import asyncio
+
+
+class Pacing:
+    def __init__(self, jitter_ms=None, typing_delay_ms=None, limiter=None):
+        self.jitter_ms = jitter_ms
+        self.typing_delay_ms = typing_delay_ms
+        self.limiter = limiter
+
+    @classmethod
+    def from_arg(cls, value, limiter=None):
+        # "3000-5000" or "4000"; an empty value disables pacing. Keys are typed at ~1/5 of the pause
+        if not value:
+            return cls(limiter=limiter)
+        low, _, high = value.partition("-")
+        jitter = (int(low), int(high or low))
+        return cls(jitter_ms=jitter, typing_delay_ms=(jitter[0] // 5, jitter[1] // 5), limiter=limiter)
+
+    def _pick(self, bounds):
+        return random.randint(*bounds) if bounds else 0
+
+    def typing_delay(self):
+        return self._pick(self.typing_delay_ms)
+
+    async def before_navigation(self, url=None):
+        if self.limiter:
+            await self.limiter.wait_async(url)
+        delay = self._pick(self.jitter_ms)
+        if delay:
+            await asyncio.sleep(delay / 1000)
+
+    def before_navigation_sync(self, url=None):
+        if self.limiter:
+            self.limiter.wait(url)
+        delay = self._pick(self.jitter_ms)
+        if delay:
+            time.sleep(delay / 1000)
@@ -0,0 +1,214 @@
+"""
+This module turns the HTML of a Rozetka product page (and of its "Характеристики" tab) into the `data` dict used by the scrapers.
+
+Extraction is done in two steps:
+1. Fast path - `client_state.extract_state()` reads the embedded `ld+json` / `rz-client-state` JSON with a targeted
+   scan, without building an HTML tree.
+2. Fallback - only if some fields are still missing, the page is parsed with the chosen HTML backend
+   (`html.parser`, `lxml` or `selectolax`, see `html_backends.py`) and CSS selectors fill in just those fields.
+   The selectors give the same output on every backend.
+
+- `parse_product_page(html, backend)` returns `(data, characteristics_url)`.
+- `parse_characteristics(html, backend)` returns the full specifications dict (grouped by sections) or `None`.
+- `parse_html_fields(root, fields)` extracts the given fields from an already parsed page, without the JSON fast path.
+- `label_index(root)` builds, in one pass, a normalized label -> value index of the variant options and the short
+  spec list; every labelled field (`LABELLED_FIELDS`) is then a dict lookup.
+- `fingerprint(data)` is a SHA-256 of the normalized product page record (`FIELDS`, photos in sorted order); it is
+  stored with the product (`Mobile.fingerprint`), so a re-scrape can tell an unchanged product before fetching the
+  characteristics tab.
+"""
+
+import json
+import hashlib
+
+from client_state import extract_state, normalize_seller
+from html_backends import DEFAULT_BACKEND, parse
+
+
+FIELDS = (
+    "full_name_of_the_product",
+    "regular_price",
+    "promotional_price",
+    "color",
+    "memory_size",
+    "product_code",
+    "number_of_reviews",
+    "series",
+    "screen_diagonal",
+    "display_resolution",
+    "all_product_photos",
+    "seller",
+)
+
+
+def _number(text, *noise):
+    for n in ('\xa0', ' ', '₴') + noise:
+        text = text.replace(n, '')
+    return int(text.strip())
+
+
+def _name(root, data):
+    h1 = root.select_one('h1')
+    data["full_name_of_the_product"] = h1.text.strip() if h1 else None
+
+
+def _prices(root, data):
+    price = root.select_one('p.product-price__small')
+    promo = root.select_one('p.product-price__small ~ p')
+    try:
+        data["regular_price"] = _number(price.text)
+    except (AttributeError, ValueError):
+        data["regular_price"] = None
+    try:
+        data["promotional_price"] = _number(promo.text)
+    except (AttributeError, ValueError):
+        data["promotional_price"] = None
+
+
+def _product_code(root, data):
+    code_span = root.select_one('div.product-about__right div.rating.text-base span')
+    try:
+        data["product_code"] = _number(code_span.text, 'Код:')
+    except (AttributeError, ValueError):
+        data["product_code"] = None
+
+
+def _reviews(root, data):
+    data["number_of_reviews"] = None
+    for span in root.select('div.product-comment-rating span'):
+        if "відгуки" in span.text:
+            try:
+                data["number_of_reviews"] = _number(span.text, "відгуки")
+            except ValueError:
+                pass
+            break
+
+
+def normalize_label(label):
+    return " ".join(label.replace('\xa0', ' ').split()).rstrip(':').strip().casefold()
+
+
+def label_index(root):
+    # one pass over the variant options ("Колір: Black") and the short spec list ("Серія" -> "iPhone 15");
+    # the first occurrence of a label wins, like the old per-field loops
+    index = {}
+    for p in root.select('div.var-options > p'):
+        spans = p.select('span')
+        if len(spans) > 1:
+            index.setdefault(normalize_label(spans[0].text), spans[1].text.strip())
+    for item in root.select('dl.list > div'):
+        dt, dd = item.select_one('dt.label'), item.select_one('dd')
+        if dt and dd:
+            index.setdefault(normalize_label(dt.text), dd.text.strip())
+    return index
+
+
+def _memory_size(value):
+    return _number(value, 'ГБ')
+
+
+# field -> (label on the page, converter); new labelled attributes only need a line here
+LABELLED_FIELDS = {
+    "color": ("Колір", None),
+    "memory_size": ("Вбудована пам'ять", _memory_size),
+    "series": ("Серія", None),
+    "screen_diagonal": ("Діагональ екрана", None),
+    "display_resolution": ("Роздільна здатність дисплея", None),
+}
+
+
+def _labelled(root, data):
+    index = label_index(root)
+    for field, (label, convert) in LABELLED_FIELDS.items():
+        value = index.get(normalize_label(label))
+        if value is not None and convert is not None:
+            try:
+                value = convert(value)
+            except ValueError:
+                value = None
+        data[field] = value
+
+
+def _photos(root, data):
+    slider = root.select_one('app-slider.preview-slider')
+    if slider is None:
+        data["all_product_photos"] = None
+        return
+    data["all_product_photos"] = [img.attr('src') for img in slider.select('img') if img.attr('src')]
+
+
+def _seller(root, data):
+    data["seller"] = None
+    link = root.select_one('p.seller-title a')
+    logo = root.select_one('p.seller-title img')
+    if link and link.text.strip():
+        data["seller"] = normalize_seller(link.text)
+    elif logo and logo.attr('alt'):
+        data["seller"] = normalize_seller(logo.attr('alt'))
+    else:
+        for span in root.select('div.comment__vars span'):
+            if "Продавець:" in span.text:
+                data["seller"] = normalize_seller(span.text.replace("Продавець:", ''))
+                break
+
+
+def _characteristics_link(root):
+    link = root.select_one('a.product-characteristics')
+    return link.attr('href') if link else None
+
+
+# field -> function that fills it (some functions fill several related fields at once)
+FALLBACKS = {
+    "full_name_of_the_product": _name,
+    "regular_price": _prices,
+    "promotional_price": _prices,
+    "color": _labelled,
+    "memory_size": _labelled,
+    "product_code": _product_code,
+    "number_of_reviews": _reviews,
+    "series": _labelled,
+    "screen_diagonal": _labelled,
+    "display_resolution": _labelled,
+    "all_product_photos": _photos,
+    "seller": _seller,
+}
+
+
+def parse_html_fields(root, fields=FIELDS):
+    parsed = {}
+    for field in fields:
+        if field not in parsed:
+            FALLBACKS[field](root, parsed)
+    return {field: parsed[field] for field in fields}
+
+
+def parse_product_page(html, backend=DEFAULT_BACKEND):
+    data, link_c = extract_state(html)
+
+    missing = [field for field in FIELDS if field not in data]
+    if missing or not link_c:
+        root = parse(html, backend)
+        data.update(parse_html_fields(root, missing))
+        if not link_c:
+            link_c = _characteristics_link(root)
+
+    return {field: data[field] for field in FIELDS}, link_c
+
+
+def fingerprint(data):
+    record = {field: data.get(field) for field in FIELDS}
+    record["all_product_photos"] = sorted(record["all_product_photos"] or [])
+    payload = json.dumps(record, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def parse_characteristics(html, backend=DEFAULT_BACKEND):
+    root = parse(html, backend)
+    product_specifications = {}
+    for i, section in enumerate(root.select('main.product-tabs__content section')):
+        specs = {}
+        for div in section.select('div'):
+            for dt, dd in zip(div.select('dt'), div.select('dd')):
+                specs[dt.text.strip()] = dd.text.strip()
+        product_specifications[f"product_specification_{i}"] = specs
+    return product_specifications or None
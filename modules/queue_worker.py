@@ -0,0 +1,182 @@
+"""
+This script is the worker entry point of the Postgres job queue (`parser_app.jobs`): every machine that can reach
+the database runs workers, and they share the work without any other coordination.
+
+    python queue_worker.py enqueue --file urls.txt          # product URLs or search queries
+    python queue_worker.py work --workers 8 --batch-size 20  # on as many machines as you like
+    python queue_worker.py stats
+    python queue_worker.py requeue-dead
+
+`work` claims a batch of jobs (`SELECT ... FOR UPDATE SKIP LOCKED`), scrapes it with `1_requestsBS4_parse.py`
+(`parse_product` on `--workers` threads), writes the products with one batch upsert and marks the jobs done.
+Products whose page fingerprint matches the stored one are marked done without being parsed further or written
+(`--no-skip` turns this off); the worker loads the fingerprints once and keeps them up to date with its own writes.
+Failed jobs are retried with exponential backoff and dead-lettered after their `max_attempts`.
+While a batch is being scraped a heartbeat thread extends its leases; if the worker is killed, the leases expire
+and the jobs are claimed again by another worker after `--lease` seconds.
+
+A worker's stage timings and counters (`metrics.py`: the `requests` stages, `claim`, the database writes, errors by
+type) are served live by the Django `/metrics` endpoint; the run summary is written when the worker stops.
+"""
+
+import os
+import time
+import socket
+import argparse
+import importlib
+import threading
+from functools import partial
+
+from load_django import *
+from django.db import connection
+from parser_app.bulk import stored_fingerprints, upsert_products
+from parser_app.jobs import BACKOFF, MAX_BACKOFF, claim, complete, enqueue, extend_leases, fail, queue_stats, requeue_dead
+from html_backends import BACKENDS, DEFAULT_BACKEND
+from scraper_pool import fetch_all
+from http_cache import CACHE_MODES, ResponseCache
+from url_cache import read_items
+import rate_limit
+import metrics
+
+requests_parser = importlib.import_module("1_requestsBS4_parse")
+
+
+class LeaseKeeper:
+    # extends the leases of the claimed jobs every lease / 3 seconds until the batch is finished
+    def __init__(self, ids, worker, lease):
+        self.ids = ids
+        self.worker = worker
+        self.lease = lease
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        try:
+            while not self._stop.wait(self.lease / 3):
+                extend_leases(self.ids, self.worker, self.lease)
+        finally:
+            connection.close()
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+
+def process_batch(jobs, worker, handler, workers, lease, backoff=BACKOFF, max_backoff=MAX_BACKOFF, limiter=None, fingerprints=None):
+    by_url = {job.url: job for job in jobs}
+    done = []
+    records = []
+    unchanged = []
+    with LeaseKeeper(list(job.pk for job in jobs), worker, lease):
+        for url, data, error in fetch_all(by_url, handler, workers=workers, limiter=limiter):
+            if error:
+                print(f"[{url}] Error: {error}")
+                metrics.count("errors", engine="requests", error=type(error).__name__)
+                fail(by_url[url], worker, error, backoff, max_backoff)
+                continue
+            if data.get("unchanged"):
+                unchanged.append(by_url[url])
+                continue
+            done.append(by_url[url])
+            records.append(data)
+
+    jobs_of = {id(data): job for job, data in zip(done, records)}
+
+    def rejected(data, error):
+        # this record only: the rest of the batch is saved
+        job = jobs_of[id(data)]
+        print(f"[{job.url}] Error while saving: {error}")
+        fail(job, worker, error, backoff, max_backoff)
+        done.remove(job)
+        del jobs_of[id(data)]
+
+    try:
+        upsert_products(records, stage=metrics.stage, on_error=rejected)
+        if fingerprints is not None:
+            fingerprints.update(
+                (data["product_code"], data["fingerprint"])
+                for data in records if id(data) in jobs_of and data.get("product_code") is not None
+            )
+    except Exception as e:
+        print(f"[{worker}] Error while saving {len(records)} products: {e}")
+        for job in done:
+            fail(job, worker, e, backoff, max_backoff)
+        return complete([job.pk for job in unchanged], worker)
+    print(f"[{worker}] {len(records)} products new or changed, {len(unchanged)} unchanged (skipped)")
+    return complete([job.pk for job in done + unchanged], worker)
+
+
+def work(args):
+    metrics.configure("queue_worker", "requests")
+    try:
+        run_worker(args)
+    finally:
+        metrics.finish()
+
+
+def run_worker(args):
+    cache = ResponseCache(mode=args.cache) if args.cache != "off" else None
+    fingerprints = None if args.no_skip else stored_fingerprints()
+    handler = partial(requests_parser.parse_product, backend=args.parser, cache=cache, fingerprints=fingerprints)
+    limiter = rate_limit.from_args(args)
+
+    worker = args.worker_id or f"{socket.gethostname()}:{os.getpid()}"
+    total = 0
+    while True:
+        with metrics.stage("claim"):
+            jobs = claim(worker, args.batch_size, args.lease)
+        if not jobs:
+            if args.exit_when_empty:
+                break
+            time.sleep(args.idle_sleep)
+            continue
+        total += process_batch(jobs, worker, handler, args.workers, args.lease, args.backoff, args.max_backoff, limiter, fingerprints)
+        print(f"[{worker}] {total} jobs done, queue: {queue_stats()}")
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Postgres job queue for the Rozetka scrapers.")
+    commands = arg_parser.add_subparsers(dest="command", required=True)
+
+    enqueue_parser = commands.add_parser("enqueue", help="add product URLs or search queries to the queue")
+    enqueue_parser.add_argument("urls", nargs="*", help="product page URLs or search queries")
+    enqueue_parser.add_argument("--file", help="text file with one product URL or search query per line")
+    enqueue_parser.add_argument("--max-attempts", type=int, default=5, help="attempts before a job is dead-lettered")
+    enqueue_parser.add_argument("--refresh", action="store_true", help="queue finished and dead jobs for these URLs again")
+
+    work_parser = commands.add_parser("work", help="claim and scrape jobs until stopped")
+    work_parser.add_argument("--worker-id", help="default: <hostname>:<pid>")
+    work_parser.add_argument("--workers", type=int, default=8, help="concurrent product page workers")
+    work_parser.add_argument("--batch-size", type=int, default=20, help="jobs claimed at a time")
+    work_parser.add_argument("--lease", type=int, default=300, help="seconds a claimed job stays with this worker without a heartbeat")
+    work_parser.add_argument("--backoff", type=int, default=BACKOFF, help="seconds before the first retry, doubled for every next one")
+    work_parser.add_argument("--max-backoff", type=int, default=MAX_BACKOFF, help="longest delay between retries")
+    work_parser.add_argument("--idle-sleep", type=float, default=10, help="seconds to wait when no job is ready")
+    work_parser.add_argument("--exit-when-empty", action="store_true", help="stop when no job is ready instead of waiting")
+    work_parser.add_argument("--parser", choices=BACKENDS, default=DEFAULT_BACKEND, help="HTML parser backend")
+    work_parser.add_argument("--cache", choices=CACHE_MODES, default="off", help="on-disk response cache")
+    work_parser.add_argument("--no-skip", action="store_true", help="parse and write every product, even if its page did not change")
+    rate_limit.add_arguments(work_parser)
+
+    commands.add_parser("stats", help="number of jobs per status")
+    commands.add_parser("requeue-dead", help="give the dead-lettered jobs another max_attempts")
+    args = arg_parser.parse_args()
+
+    if args.command == "enqueue":
+        urls = list(args.urls)
+        if args.file:
+            urls += read_items(args.file)
+        print(f"{enqueue(urls, args.max_attempts, args.refresh)} new jobs")
+    elif args.command == "work":
+        work(args)
+    elif args.command == "requeue-dead":
+        print(f"{requeue_dead()} jobs requeued")
+    print(f"queue: {queue_stats()}")
+
+
+if __name__ == "__main__":
+    main()
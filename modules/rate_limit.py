@@ -0,0 +1,245 @@
+"""
+This module is the request rate limiter shared by all scrapers (`cloudscraper`, Selenium, Playwright).
+
+Every host (or host + proxy) has a token bucket: `burst` requests may go at once, after that one request every
+`1 / rate` seconds. The rate adapts (AIMD):
+- a `403` / `429` / `503` or a Cloudflare challenge page halves the rate (down to `min_rate`) and pauses the host
+  for a cooldown (`Retry-After` when the server sends one), doubled for every further block in a row;
+- every successful response raises the rate by `increase` requests/s (up to `max_rate`), so the limiter climbs back
+  to the highest rate the site tolerates instead of sleeping a fixed, pessimistic delay.
+
+The buckets live in a SQLite file (`results/rate_limit.sqlite` by default) and are updated in `BEGIN IMMEDIATE`
+transactions, so all threads and processes on a machine (several scrapers, several queue workers) share one budget
+per host; `path=":memory:"` keeps them private to the process.
+
+    limiter = RateLimiter(rate=1, max_rate=4)
+    limiter.wait(url)                           # blocks until a token is free (`await limiter.wait_async(url)`,
+                                                # which updates the bucket on an executor thread)
+    limiter.record(url, response.status_code)   # feedback
+    session = RateLimitedSession(scraper, limiter)  # both, around `session.get`, with retries after a block
+
+`is_blocked(response)` tells a block (throttling status or challenge, whatever its status - Cloudflare also serves
+challenges with `200`) from a normal page; the scrapers raise `Blocked` for those instead of parsing the challenge
+page, and the response cache does not store them.
+
+Time spent waiting for a token is recorded as the `rate_limit_wait` stage in `metrics.py`; every challenge / throttled
+response is counted (`challenges`), and a `RateLimitedSession.get` that hit one is timed from the first block to its
+last retry as the `challenge` stage.
+"""
+
+import os
+import time
+import asyncio
+import sqlite3
+import threading
+from urllib.parse import urlsplit
+
+import metrics
+
+
+MODULE_DIR = os.path.dirname(os.path.abspath(__file__))
+STATE_PATH = os.path.join(MODULE_DIR, "..", "results", "rate_limit.sqlite")
+
+DEFAULT_HOST = "rozetka.com.ua"
+THROTTLE_STATUSES = (403, 429, 503)
+CHALLENGE_MARKERS = ("/cdn-cgi/challenge-platform/", "cf-chl-", "Just a moment...")
+
+
+def host_of(url):
+    # navigations without a URL (clicks) stay on Rozetka
+    if not url:
+        return DEFAULT_HOST
+    return urlsplit(url).hostname or DEFAULT_HOST
+
+
+def is_challenge(headers=None, text=None):
+    if headers and headers.get("cf-mitigated") == "challenge":
+        return True
+    return bool(text) and any(marker in text[:20000] for marker in CHALLENGE_MARKERS)
+
+
+class Blocked(Exception):
+    pass
+
+
+def is_blocked(response):
+    # Cloudflare may serve its challenge with a 200: the body is checked whatever the status
+    return response.status_code in THROTTLE_STATUSES or is_challenge(response.headers, response.text)
+
+
+def retry_after(headers):
+    try:
+        return float(headers.get("Retry-After"))
+    except (AttributeError, TypeError, ValueError):
+        return None
+
+
+class RateLimiter:
+    def __init__(self, rate=1.0, burst=2, min_rate=0.1, max_rate=5.0, increase=0.05, decrease=0.5,
+                 cooldown=30, max_cooldown=600, path=STATE_PATH):
+        self.rate = rate
+        self.burst = burst
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.increase = increase
+        self.decrease = decrease
+        self.cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.path = path if path == ":memory:" else os.path.abspath(path)
+        self._lock = threading.Lock()
+
+        if self.path != ":memory:":
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._db = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS buckets (
+                key TEXT PRIMARY KEY,
+                rate REAL NOT NULL,
+                tokens REAL NOT NULL,
+                updated_at REAL NOT NULL,
+                blocked_until REAL NOT NULL DEFAULT 0,
+                strikes INTEGER NOT NULL DEFAULT 0
+            )
+        """)
+
+    def key(self, url, proxy=None):
+        return f"{host_of(url)}|{proxy}" if proxy else host_of(url)
+
+    def _update(self, key, change):
+        # runs change(state, now) -> result on the bucket inside one cross-process transaction
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                now = time.time()
+                row = self._db.execute(
+                    "SELECT rate, tokens, updated_at, blocked_until, strikes FROM buckets WHERE key = ?", (key,)
+                ).fetchone()
+                state = dict(zip(("rate", "tokens", "updated_at", "blocked_until", "strikes"),
+                                 row or (self.rate, self.burst, now, 0, 0)))
+                state["tokens"] = min(self.burst, state["tokens"] + (now - state["updated_at"]) * state["rate"])
+                state["updated_at"] = now
+                result = change(state, now)
+                self._db.execute(
+                    "INSERT OR REPLACE INTO buckets VALUES (?, ?, ?, ?, ?, ?)",
+                    (key, state["rate"], state["tokens"], now, state["blocked_until"], state["strikes"]),
+                )
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+        return result
+
+    def _take(self, key):
+        # seconds to wait before trying again, 0 when a token was taken
+        def take(state, now):
+            if now < state["blocked_until"]:
+                return state["blocked_until"] - now
+            if state["tokens"] >= 1:
+                state["tokens"] -= 1
+                return 0
+            return (1 - state["tokens"]) / state["rate"]
+        return self._update(key, take)
+
+    def wait(self, url=None, proxy=None):
+        key = self.key(url, proxy)
+        with metrics.stage("rate_limit_wait"):
+            while True:
+                delay = self._take(key)
+                if not delay:
+                    return
+                time.sleep(delay)
+
+    async def wait_async(self, url=None, proxy=None):
+        key = self.key(url, proxy)
+        loop = asyncio.get_running_loop()
+        with metrics.stage("rate_limit_wait"):
+            while True:
+                # the bucket transaction may wait up to 30 s for another process: not on the event loop
+                delay = await loop.run_in_executor(None, self._take, key)
+                if not delay:
+                    return
+                await asyncio.sleep(delay)
+
+    def record(self, url=None, status=None, challenged=False, retry_after=None, proxy=None):
+        # True when the response means "slow down"
+        throttled = challenged or status in THROTTLE_STATUSES
+        if not throttled and status is not None and status >= 400:
+            return False
+
+        def feedback(state, now):
+            if throttled:
+                state["rate"] = max(self.min_rate, state["rate"] * self.decrease)
+                state["tokens"] = 0
+                state["strikes"] += 1
+                pause = min(self.cooldown * 2 ** (state["strikes"] - 1), self.max_cooldown)
+                state["blocked_until"] = max(state["blocked_until"], now + max(pause, retry_after or 0))
+            else:
+                state["rate"] = min(self.max_rate, state["rate"] + self.increase)
+                state["strikes"] = 0
+            return state["rate"], state["blocked_until"] - now
+
+        rate, pause = self._update(self.key(url, proxy), feedback)
+        if throttled:
+            reason = "challenge" if challenged else status
+            print(f"[rate_limit] {self.key(url, proxy)}: {reason}, {rate:.2f} req/s after a {pause:.1f} s pause")
+        return throttled
+
+    def stats(self):
+        with self._lock:
+            rows = self._db.execute("SELECT key, rate, blocked_until, strikes FROM buckets ORDER BY key").fetchall()
+        return {key: {"rate": rate, "blocked_for": max(0, until - time.time()), "strikes": strikes}
+                for key, rate, until, strikes in rows}
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    def on_playwright_response(self, response):
+        # context.on("response", ...): only top-level navigations count, not every image and script
+        request = response.request
+        if request.is_navigation_request() and request.frame.parent_frame is None:
+            if self.record(response.url, response.status, is_challenge(response.headers), retry_after(response.headers)):
+                metrics.count("challenges", engine="playwright")
+
+
+class RateLimitedSession:
+    # wraps a `requests` / `cloudscraper` session: `get` waits for a token, reports the outcome and retries
+    # (after the cooldown) when the response was a block
+    def __init__(self, session, limiter, retries=2):
+        self.session = session
+        self.limiter = limiter
+        self.retries = retries
+
+    def __getattr__(self, name):
+        return getattr(self.session, name)
+
+    def get(self, url, **kwargs):
+        proxy = (self.session.proxies or {}).get(urlsplit(url).scheme)
+        blocked_at = None
+        for attempt in range(self.retries + 1):
+            self.limiter.wait(url, proxy)
+            response = self.session.get(url, **kwargs)
+            challenged = is_challenge(response.headers, response.text)
+            throttled = self.limiter.record(url, response.status_code, challenged, retry_after(response.headers), proxy)
+            if not throttled:
+                break
+            metrics.count("challenges", engine="requests")
+            blocked_at = blocked_at or time.perf_counter()
+        if blocked_at is not None:
+            # cooldown + retries until the page came through (or the retries ran out: an error)
+            metrics.observe("challenge", time.perf_counter() - blocked_at, "requests", error=throttled)
+        return response
+
+
+def add_arguments(arg_parser):
+    arg_parser.add_argument("--rate", type=float, default=1.0, help="starting requests per second per host")
+    arg_parser.add_argument("--max-rate", type=float, default=5.0, help="the rate never climbs above this")
+    arg_parser.add_argument("--burst", type=int, default=2, help="requests that may go at once")
+    arg_parser.add_argument("--rate-state", default=STATE_PATH, help="SQLite file shared by all scrapers on this machine (':memory:' for none)")
+    arg_parser.add_argument("--no-rate-limit", action="store_true", help="send requests as fast as the workers go")
+
+
+def from_args(args):
+    if args.no_rate_limit:
+        return None
+    return RateLimiter(rate=args.rate, burst=args.burst, max_rate=max(args.rate, args.max_rate), path=args.rate_state)
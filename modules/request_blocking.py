@@ -0,0 +1,126 @@
+"""
+This module blocks non-essential requests of the Playwright scraper (`3_playwright_parser.py`) with `context.route`.
+
+What is blocked is configurable:
+- `resource_types` - Playwright resource types that are never needed to read the page (images, fonts, video/audio
+  by default; product photo URLs are still read from the `src` attributes, the files themselves are not downloaded);
+- `hosts`          - third-party hosts (analytics, ads, tag managers, the Cloudflare Insights beacon) matched by suffix.
+  Scripts from these hosts are stubbed with an empty `200` response instead of aborted, so page code waiting for them
+  does not fall into error handlers; everything else is aborted.
+
+The Cloudflare challenge itself (`challenges.cloudflare.com`, `/cdn-cgi/challenge-platform/`) is never blocked.
+
+`ResourceBlocker.report(label)` prints, per page, how many requests were blocked and roughly how many bytes that saved,
+next to the bytes actually loaded. A blocked request is never downloaded, so its size is estimated from the average
+size of the same resource type loaded in this context (or from `TYPICAL_SIZES` when none was loaded).
+The loaded bytes also go to the `bytes_downloaded` counter of the `playwright` engine in `metrics.py`.
+"""
+
+from collections import defaultdict
+from urllib.parse import urlsplit
+
+import metrics
+
+
+BLOCKED_RESOURCE_TYPES = ("image", "media", "font")
+
+BLOCKED_HOSTS = (
+    "google-analytics.com",
+    "googletagmanager.com",
+    "googlesyndication.com",
+    "doubleclick.net",
+    "googleadservices.com",
+    "facebook.net",
+    "criteo.com",
+    "criteo.net",
+    "hotjar.com",
+    "clarity.ms",
+    "analytics.tiktok.com",
+    "bat.bing.com",
+    "mc.yandex.ru",
+    "cloudflareinsights.com",
+)
+
+NEVER_BLOCKED = ("challenges.cloudflare.com", "/cdn-cgi/challenge-platform/")
+
+# rough sizes used to estimate savings for resource types nothing was loaded for, bytes
+TYPICAL_SIZES = {
+    "image": 40_000,
+    "media": 500_000,
+    "font": 30_000,
+    "script": 50_000,
+    "stylesheet": 30_000,
+}
+DEFAULT_SIZE = 10_000
+
+
+def _host_matches(host, hosts):
+    return any(host == blocked or host.endswith("." + blocked) for blocked in hosts)
+
+
+class ResourceBlocker:
+    def __init__(self, resource_types=BLOCKED_RESOURCE_TYPES, hosts=BLOCKED_HOSTS, stub_scripts=True):
+        self.resource_types = set(resource_types)
+        self.hosts = tuple(hosts)
+        self.stub_scripts = stub_scripts
+        self._reset()
+        # bytes / count of loaded responses per resource type, kept for the whole context
+        self._loaded_sizes = defaultdict(lambda: [0, 0])
+
+    def _reset(self):
+        self.blocked = defaultdict(int)
+        self.loaded_requests = 0
+        self.loaded_bytes = 0
+
+    def should_block(self, url, resource_type):
+        if any(marker in url for marker in NEVER_BLOCKED):
+            return False
+        if resource_type in self.resource_types:
+            return True
+        return _host_matches(urlsplit(url).hostname or "", self.hosts)
+
+    async def _handle(self, route, request):
+        if not self.should_block(request.url, request.resource_type):
+            await route.continue_()
+            return
+
+        self.blocked[request.resource_type] += 1
+        if self.stub_scripts and request.resource_type == "script":
+            await route.fulfill(status=200, content_type="application/javascript", body="")
+        else:
+            await route.abort("blockedbyclient")
+
+    async def _on_finished(self, request):
+        try:
+            sizes = await request.sizes()
+        except Exception:
+            return
+        size = sizes["responseBodySize"] + sizes["responseHeadersSize"]
+        self.loaded_requests += 1
+        self.loaded_bytes += size
+        metrics.count("bytes_downloaded", size, engine="playwright")
+        total = self._loaded_sizes[request.resource_type]
+        total[0] += size
+        total[1] += 1
+
+    async def install(self, context):
+        if self.resource_types or self.hosts:
+            await context.route("**/*", self._handle)
+        context.on("requestfinished", self._on_finished)
+
+    def estimated_saved_bytes(self):
+        saved = 0
+        for resource_type, count in self.blocked.items():
+            size, loaded = self._loaded_sizes.get(resource_type, (0, 0))
+            average = size / loaded if loaded else TYPICAL_SIZES.get(resource_type, DEFAULT_SIZE)
+            saved += average * count
+        return int(saved)
+
+    def report(self, label):
+        blocked = sum(self.blocked.values())
+        by_type = ", ".join(f"{t}: {n}" for t, n in sorted(self.blocked.items())) or "-"
+        print(
+            f"[{label}] blocked {blocked} requests ({by_type}), ~{self.estimated_saved_bytes() / 1024:.0f} KB saved; "
+            f"loaded {self.loaded_requests} requests, {self.loaded_bytes / 1024:.0f} KB"
+        )
+        self._reset()
@@ -0,0 +1,223 @@
+"""
+Offline tests of the browser extraction: `extract_product.js` and the Selenium `elements` path must return the same
+`data` dict and `product_specifications` for the same page.
+
+- The JS runs under Node with `jsdom` (`npm install jsdom`; skipped when Node or jsdom is missing);
+- the `elements` path of `2_selenium_parser.py` runs on a fake driver that answers `find_element(s)` with lxml XPath
+  (skipped when Selenium is not installed);
+- the `locators` path of `3_playwright_parser.py` runs on a fake page whose locators are lxml XPath (skipped when
+  Patchright is not installed).
+"""
+
+import re
+import json
+import shutil
+import asyncio
+import importlib
+import subprocess
+import unittest
+
+from lxml import html
+
+from dom_extraction import EXTRACT_JS, extraction_args, product_data
+
+
+PAGE = """<html><body>
+<h1> Мобільний телефон Apple iPhone 15 128GB Black </h1>
+<div class="var-options">
+  <p><span>Колір:</span> <span>Black</span></p>
+  <p><span>Вбудована пам'ять:</span> <span>128 ГБ</span></p>
+</div>
+<p class="product-price__small">37&nbsp;999₴</p><p>33&nbsp;999₴</p>
+<div class="product-about__right"><div class="rating text-base"><span> Код:&nbsp;395460480 </span><a>12 відгуки</a></div></div>
+<dl>
+  <div><dt class="label"><span>Серія</span></dt><dd>iPhone 15</dd></div>
+  <div><dt class="label"><span>Діагональ екрана</span></dt><dd>6.1</dd></div>
+  <div><dt class="label"><span>Роздільна здатність дисплея</span></dt><dd>2556x1179</dd></div>
+</dl>
+<p class="seller-title">Продавець: <img alt="Rozetka" src="/logo.svg"></p>
+<div class="scrollbar__content"><ul>
+  <li><img src="https://content.rozetka.com.ua/1.jpg"></li>
+  <li><a href="#"><img src="https://content.rozetka.com.ua/2.jpg"></a></li>
+</ul></div>
+<div class="scrollbar__content"><ul><li><img src="https://content.rozetka.com.ua/similar.jpg"></li></ul></div>
+<main class="product-tabs__content">
+  <section>
+    <h3>Основні</h3>
+    <dl>
+      <div><dt>Екран</dt><dd>6.1"</dd></div>
+      <div><dt>Процесор</dt><dd>A16</dd><dt>Ядра</dt><dd>6</dd></div>
+    </dl>
+    <dl><div><dt>Вага</dt><dd>171 г</dd></div></dl>
+  </section>
+  <section><p>Без характеристик</p></section>
+  <section><dl><div><dt>Гарантія</dt><dd> 12 місяців </dd></div></dl></section>
+</main>
+</body></html>"""
+
+# a product without a seller block, photos or characteristics
+BARE_PAGE = re.sub(r'<p class="seller-title">.*?</p>|<div class="scrollbar__content">.*?</div>|<main.*</main>', "", PAGE, flags=re.S)
+
+EXPECTED = {
+    "full_name_of_the_product": "Мобільний телефон Apple iPhone 15 128GB Black",
+    "color": "Black",
+    "memory_size": 128,
+    "promotional_price": 33999,
+    "regular_price": 37999,
+    "product_code": 395460480,
+    "number_of_reviews": 12,
+    "series": "iPhone 15",
+    "screen_diagonal": "6.1",
+    "display_resolution": "2556x1179",
+    "seller": "Rozetka",
+    "all_product_photos": ["https://content.rozetka.com.ua/1.jpg", "https://content.rozetka.com.ua/2.jpg"],
+}
+EXPECTED_SPECS = {
+    "product_specification_0": {"Екран": '6.1"', "Процесор": "A16", "Ядра": "6", "Вага": "171 г"},
+    "product_specification_2": {"Гарантія": "12 місяців"},
+}
+EXPECTED_BARE = {**EXPECTED, "seller": None, "all_product_photos": []}
+
+# `innerText` is not implemented by jsdom: collapse the whitespace of `textContent` like a browser would
+JSDOM_RUNNER = """
+const { JSDOM } = require("jsdom");
+const input = JSON.parse(require("fs").readFileSync(0, "utf8"));
+const { window } = new JSDOM(input.html);
+Object.defineProperty(window.HTMLElement.prototype, "innerText", {
+  get() { return this.textContent.replace(/[ \\t\\r\\n]+/g, " "); },
+});
+global.document = window.document;
+global.XPathResult = window.XPathResult;
+process.stdout.write(JSON.stringify(eval(input.script)(input.args)));
+"""
+
+
+def jsdom_available():
+    node = shutil.which("node")
+    if node is None:
+        return False
+    return subprocess.run([node, "-e", "require.resolve('jsdom')"], capture_output=True).returncode == 0
+
+
+class LxmlElement:
+    # the part of the WebElement / WebDriver API the `elements` path uses, on top of lxml
+    def __init__(self, node, errors):
+        self.node = node
+        self.errors = errors
+
+    @property
+    def text(self):
+        return re.sub(r"[ \t\r\n]+", " ", self.node.text_content()).strip()
+
+    def get_attribute(self, name):
+        return self.node.get(name)
+
+    def is_displayed(self):
+        return True
+
+    def find_elements(self, by, xpath):
+        return [LxmlElement(node, self.errors) for node in self.node.xpath(xpath)]
+
+    def find_element(self, by, xpath):
+        found = self.find_elements(by, xpath)
+        if not found:
+            raise self.errors.NoSuchElementException(xpath)
+        return found[0]
+
+
+class LxmlLocator:
+    # the part of the Playwright Locator / Page API the `locators` path uses, on top of lxml
+    def __init__(self, nodes):
+        self.nodes = nodes
+
+    def locator(self, selector):
+        xpath = selector.removeprefix("xpath=")
+        return LxmlLocator([found for node in self.nodes for found in node.xpath(xpath)])
+
+    async def wait_for_selector(self, selector, timeout=None):
+        if not await self.locator(selector).count():
+            raise TimeoutError(selector)
+
+    async def count(self):
+        return len(self.nodes)
+
+    @property
+    def first(self):
+        return self.nth(0)
+
+    def nth(self, i):
+        return LxmlLocator(self.nodes[i:i + 1])
+
+    async def inner_text(self, timeout=None):
+        if len(self.nodes) != 1:
+            raise TimeoutError(f"{len(self.nodes)} elements")
+        return re.sub(r"[ \t\r\n]+", " ", self.nodes[0].text_content()).strip()
+
+    async def get_attribute(self, name, timeout=None):
+        if not self.nodes:
+            raise TimeoutError(name)
+        return self.nodes[0].get(name)
+
+
+class ExtractionTest(unittest.TestCase):
+    def run_script(self, page):
+        args = json.dumps({"html": page, "script": EXTRACT_JS, "args": extraction_args(photos=self.selenium_photos)})
+        result = subprocess.run(["node", "-e", JSDOM_RUNNER], input=args, capture_output=True, text=True, check=True)
+        raw = json.loads(result.stdout)
+        return product_data(raw), raw["specifications"]
+
+    def run_elements(self, page):
+        selenium = self.selenium()
+        driver = LxmlElement(html.fromstring(page), selenium.errors)
+        return selenium.parser.read_product(driver), selenium.parser.read_specifications(driver)
+
+    def run_locators(self, page):
+        try:
+            parser = importlib.import_module("3_playwright_parser")
+        except ImportError as e:
+            self.skipTest(f"Playwright scraper cannot be imported: {e}")
+        root = LxmlLocator([html.fromstring(page)])
+
+        async def read():
+            return await parser.read_product_locators(root, "events"), await parser.read_specifications_locators(root)
+        return asyncio.run(read())
+
+    @property
+    def selenium_photos(self):
+        # what 2_selenium_parser.py passes to the script: the first photo list only
+        from xpath_fields import PHOTOS_LIST
+        return f"({PHOTOS_LIST})[1]/li//img"
+
+    def selenium(self):
+        try:
+            parser = importlib.import_module("2_selenium_parser")
+            errors = importlib.import_module("selenium.common.exceptions")
+        except ImportError as e:
+            self.skipTest(f"Selenium scraper cannot be imported: {e}")
+        parser.TIMEOUT = 0
+        return type("Selenium", (), {"parser": parser, "errors": errors})
+
+    @unittest.skipUnless(jsdom_available(), "needs node and jsdom")
+    def test_script(self):
+        self.assertEqual(self.run_script(PAGE), (EXPECTED, EXPECTED_SPECS))
+        self.assertEqual(self.run_script(BARE_PAGE), (EXPECTED_BARE, {}))
+
+    def test_elements(self):
+        self.assertEqual(self.run_elements(PAGE), (EXPECTED, EXPECTED_SPECS))
+        self.assertEqual(self.run_elements(BARE_PAGE), (EXPECTED_BARE, {}))
+
+    def test_locators(self):
+        # Playwright reads every photo list (as its `evaluate` mode does), not only the product's
+        photos = {"all_product_photos": EXPECTED["all_product_photos"] + ["https://content.rozetka.com.ua/similar.jpg"]}
+        self.assertEqual(self.run_locators(PAGE), ({**EXPECTED, **photos}, EXPECTED_SPECS))
+        self.assertEqual(self.run_locators(BARE_PAGE), (EXPECTED_BARE, {}))
+        # no discount: only the regular price is shown
+        no_promo = PAGE.replace(
+            '<p class="product-price__small">37&nbsp;999₴</p><p>33&nbsp;999₴</p>', '<p class="product-price__small">37 999₴</p>'
+        )
+        data, _ = self.run_locators(no_promo)
+        self.assertEqual((data["regular_price"], data["promotional_price"]), (37999, None))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,111 @@
+"""
+Offline tests of the response cache: run from `modules/` with `python -m unittest discover tests`.
+"""
+
+import os
+import glob
+import shutil
+import tempfile
+import unittest
+
+from http_cache import CacheMiss, ResponseCache
+
+
+class FakeResponse:
+    def __init__(self, url, content=b"<html></html>", status_code=200, headers=None):
+        self.url = url
+        self.content = content
+        self.status_code = status_code
+        self.encoding = "utf-8"
+        self.headers = headers or {}
+
+    @property
+    def text(self):
+        return self.content.decode(self.encoding, errors="replace")
+
+
+class FakeSession:
+    # answers every request with the next response of the script and remembers the request headers
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.requests = []
+
+    def get(self, url, headers=None, **kwargs):
+        self.requests.append((url, dict(headers or {})))
+        return self.responses.pop(0)
+
+
+SEARCH = "https://rozetka.com.ua/ua/search/?text=iphone+15"
+PRODUCT = "https://rozetka.com.ua/ua/apple-iphone-15-128gb-black/p395460480/"
+
+
+class ResponseCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.path)
+
+    def test_redirect_is_kept_for_fresh_entries(self):
+        cache = ResponseCache(self.path, ttl=3600)
+        cache.get(FakeSession(FakeResponse(PRODUCT)), SEARCH)
+
+        session = FakeSession()
+        response = cache.get(session, SEARCH)
+        self.assertTrue(response.from_cache)
+        self.assertEqual(response.url, PRODUCT)
+        self.assertEqual(session.requests, [])
+
+    def test_redirect_is_kept_after_revalidation(self):
+        cache = ResponseCache(self.path)
+        cache.get(FakeSession(FakeResponse(PRODUCT, headers={"ETag": '"v1"'})), SEARCH)
+
+        session = FakeSession(FakeResponse(SEARCH, b"", 304))
+        response = cache.get(session, SEARCH)
+        self.assertEqual(session.requests[0][1]["If-None-Match"], '"v1"')
+        self.assertEqual(response.url, PRODUCT)
+
+    def test_redirect_is_kept_in_cache_only_mode(self):
+        ResponseCache(self.path).get(FakeSession(FakeResponse(PRODUCT)), SEARCH)
+
+        cache = ResponseCache(self.path, mode="only")
+        self.assertEqual(cache.get(FakeSession(), SEARCH).url, PRODUCT)
+        with self.assertRaises(CacheMiss):
+            cache.get(FakeSession(), PRODUCT)
+
+    def test_eviction_keeps_the_size_under_the_limit(self):
+        cache = ResponseCache(self.path, max_bytes=2000)
+        for i in range(20):
+            url = f"https://rozetka.com.ua/p{i}/"
+            cache.get(FakeSession(FakeResponse(url, bytes(range(256)) * 4 + str(i).encode())), url)
+            self.assertLessEqual(cache._total, 2000)
+        self.assertEqual(cache._total, cache._stored_bytes())
+        self.assertLess(cache._db.execute("SELECT COUNT(*) FROM responses").fetchone()[0], 20)
+
+    def test_refetched_page_replaces_its_blob(self):
+        cache = ResponseCache(self.path, max_bytes=2000)
+        for i in range(20):
+            cache.get(FakeSession(FakeResponse(PRODUCT, bytes(range(256)) * 4 + str(i).encode())), PRODUCT)
+        self.assertEqual(cache._db.execute("SELECT COUNT(*) FROM responses").fetchone()[0], 1)
+        self.assertEqual(len(glob.glob(os.path.join(self.path, "blobs", "*", "*.gz"))), 1)
+        self.assertEqual(cache._total, cache._stored_bytes())
+
+    def test_blob_shared_with_another_url_is_kept(self):
+        cache = ResponseCache(self.path)
+        cache.get(FakeSession(FakeResponse(SEARCH, b"same page")), SEARCH)
+        cache.get(FakeSession(FakeResponse(PRODUCT, b"same page")), PRODUCT)
+        cache.get(FakeSession(FakeResponse(PRODUCT, b"new page")), PRODUCT)
+        self.assertEqual(len(glob.glob(os.path.join(self.path, "blobs", "*", "*.gz"))), 2)
+        self.assertEqual(cache._total, cache._stored_bytes())
+        self.assertEqual(ResponseCache(self.path, mode="only").get(FakeSession(), SEARCH).content, b"same page")
+
+    def test_challenge_served_with_200_is_not_stored(self):
+        cache = ResponseCache(self.path, ttl=3600)
+        challenge = b"<html><title>Just a moment...</title></html>"
+        self.assertEqual(cache.get(FakeSession(FakeResponse(PRODUCT, challenge)), PRODUCT).content, challenge)
+
+        session = FakeSession(FakeResponse(PRODUCT, b"<html>product</html>"))
+        self.assertEqual(cache.get(session, PRODUCT).content, b"<html>product</html>")
+        self.assertEqual(len(session.requests), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
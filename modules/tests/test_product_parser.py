@@ -0,0 +1,50 @@
+"""
+Offline tests of `product_parser` on the saved product page `iphone.html`: run from `modules/` with
+`python -m unittest discover tests`.
+"""
+
+import unittest
+
+from benchmark_parsers import PAGE, json_mismatches
+from client_state import extract_state, normalize_seller
+from html_backends import BACKENDS, parse
+from product_parser import FIELDS, fingerprint, parse_html_fields, parse_product_page
+
+
+class ExtractionPathsTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        with open(PAGE, encoding="utf-8") as f:
+            cls.html = f.read()
+
+    def html_data(self, backend):
+        try:
+            return parse_html_fields(parse(self.html, backend))
+        except ImportError as e:
+            self.skipTest(f"{backend} is not installed: {e}")
+
+    def test_backends_give_the_same_dict(self):
+        reference = self.html_data("html.parser")
+        for backend in BACKENDS:
+            with self.subTest(backend=backend):
+                self.assertEqual(self.html_data(backend), reference)
+
+    def test_json_and_html_paths_give_the_same_dict(self):
+        state, _ = extract_state(self.html)
+        self.assertEqual(set(state), set(FIELDS))
+        for backend in BACKENDS:
+            with self.subTest(backend=backend):
+                data = self.html_data(backend)
+                self.assertEqual(json_mismatches(self.html, data), {})
+                # so a page that switches paths keeps its fingerprint
+                self.assertEqual(fingerprint(data), fingerprint(parse_product_page(self.html)[0]))
+
+    def test_seller_spelling(self):
+        for name in ("Rozetka", "Rozetka.", " Rozetka. ", "Rozetka;\n"):
+            self.assertEqual(normalize_seller(name), "Rozetka")
+        self.assertIsNone(normalize_seller(" . "))
+        self.assertIsNone(normalize_seller(None))
+
+
+if __name__ == "__main__":
+    unittest.main()
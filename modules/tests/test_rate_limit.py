@@ -0,0 +1,36 @@
+"""
+Offline tests of the block detection in the rate limiter: run from `modules/` with `python -m unittest discover tests`.
+"""
+
+import unittest
+
+from rate_limit import RateLimitedSession, RateLimiter, is_blocked
+
+from tests.test_http_cache import FakeResponse, FakeSession
+
+
+PRODUCT = "https://rozetka.com.ua/ua/apple-iphone-15-128gb-black/p395460480/"
+CHALLENGE = b'<html><title>Just a moment...</title><script src="/cdn-cgi/challenge-platform/h/g/orchestrate/chl_page/v1"></script></html>'
+
+
+class BlockDetectionTest(unittest.TestCase):
+    def test_challenge_served_with_200_is_a_block(self):
+        self.assertTrue(is_blocked(FakeResponse(PRODUCT, CHALLENGE)))
+        self.assertTrue(is_blocked(FakeResponse(PRODUCT, b"", headers={"cf-mitigated": "challenge"})))
+        self.assertTrue(is_blocked(FakeResponse(PRODUCT, b"", 429)))
+        self.assertFalse(is_blocked(FakeResponse(PRODUCT, b"<html>product</html>")))
+
+    def test_session_retries_after_a_challenge_served_with_200(self):
+        limiter = RateLimiter(rate=100, burst=5, cooldown=0, path=":memory:")
+        session = FakeSession(FakeResponse(PRODUCT, CHALLENGE), FakeResponse(PRODUCT, b"<html>product</html>"))
+        session.proxies = {}
+
+        response = RateLimitedSession(session, limiter).get(PRODUCT)
+        self.assertEqual(response.content, b"<html>product</html>")
+        self.assertEqual(len(session.requests), 2)
+        # the challenge slowed the host down
+        self.assertLess(limiter.stats()["rozetka.com.ua"]["rate"], 100)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,96 @@
+"""
+This module is a persistent search query -> product URL / product code cache shared by all three scrapers.
+
+Reaching a product through the search (homepage, submit, click on the first result) costs three page loads;
+once a query has been resolved, the next run opens the product page directly:
+
+    cache = UrlCache(ttl=7 * 24 * 3600)
+    hit = cache.get("Apple iPhone 15 128GB Black")   # (url, product_code) or None
+    cache.put("Apple iPhone 15 128GB Black", url, product_code)
+    cache.forget(query)                              # the cached page is gone - search again next time
+
+Queries are matched case-insensitively with whitespace collapsed. Entries older than `ttl` seconds are treated
+as a miss (and refreshed by the next search), `ttl=0` keeps them forever.
+Storage is a small SQLite file (`results/url_cache.sqlite` by default), safe to use from several threads.
+
+`read_items(path)` reads the `--file` of every scraper: one product URL or search query per line (`is_url` tells
+them apart), `#` starts a comment.
+"""
+
+import os
+import time
+import sqlite3
+import threading
+
+
+MODULE_DIR = os.path.dirname(os.path.abspath(__file__))
+CACHE_PATH = os.path.join(MODULE_DIR, "..", "results", "url_cache.sqlite")
+
+DEFAULT_TTL = 7 * 24 * 3600
+
+
+def normalize_query(query):
+    return " ".join(query.casefold().split())
+
+
+def is_url(item):
+    return item.startswith(("http://", "https://"))
+
+
+def read_items(path):
+    # one product URL or search query per line, `#` starts a comment
+    items = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.split("#", 1)[0].strip()
+            if line:
+                items.append(line)
+    return items
+
+
+class UrlCache:
+    def __init__(self, path=CACHE_PATH, ttl=DEFAULT_TTL):
+        self.path = os.path.abspath(path)
+        self.ttl = ttl
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._db = sqlite3.connect(self.path, check_same_thread=False)
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS resolved (
+                query TEXT PRIMARY KEY,
+                url TEXT NOT NULL,
+                product_code INTEGER,
+                resolved_at REAL NOT NULL
+            )
+        """)
+        self._db.commit()
+
+    def get(self, query):
+        with self._lock:
+            row = self._db.execute(
+                "SELECT url, product_code, resolved_at FROM resolved WHERE query = ?", (normalize_query(query),)
+            ).fetchone()
+        if row is None:
+            return None
+        url, product_code, resolved_at = row
+        if self.ttl and time.time() - resolved_at > self.ttl:
+            return None
+        return url, product_code
+
+    def put(self, query, url, product_code=None):
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO resolved VALUES (?, ?, ?, ?)",
+                (normalize_query(query), url, product_code, time.time()),
+            )
+            self._db.commit()
+
+    def forget(self, query):
+        with self._lock:
+            self._db.execute("DELETE FROM resolved WHERE query = ?", (normalize_query(query),))
+            self._db.commit()
+
+    def close(self):
+        with self._lock:
+            self._db.close()
@@ -0,0 +1,31 @@
+"""
+This module keeps the XPath expressions used by the browser scrapers (`2_selenium_parser.py` and `3_playwright_parser.py`)
+in one place, so both scripts and the offline benchmark (`benchmark_suite.py`) work with exactly the same field set.
+"""
+
+
+SEARCH_INPUT = '//input[@name="search"]'
+SEARCH_BUTTON = '//button[contains(text(),"Знайти")]'
+FIRST_SEARCH_RESULT = '(//ul[@class="catalog-grid"]/li[1]//a)[1]'
+
+FIELD_XPATHS = {
+    "full_name_of_the_product": '//h1',
+    "color": '//div[@class="var-options"]/p/span[contains(text(),"Колір")]/following-sibling::span',
+    "memory_size": '//div[@class="var-options"]/p/span[contains(text(),"Вбудована пам\'ять")]/following-sibling::span',
+    "promotional_price": '//p[@class="product-price__small"]/following-sibling::p',
+    "regular_price": '//p[@class="product-price__small"]',
+    "product_code": '//div[@class="product-about__right"]//div[@class="rating text-base"]/span',
+    "number_of_reviews": '//div[@class="product-about__right"]//div[@class="rating text-base"]/a',
+    "series": '//dl/div[dt[@class="label" and span[contains(text(),"Серія")]]]/dd',
+    "screen_diagonal": '//dl/div[dt[@class="label" and span[contains(text(),"Діагональ екрана")]]]/dd',
+    "display_resolution": '//dl/div[dt[@class="label" and span[contains(text(),"Роздільна здатність дисплея")]]]/dd',
+}
+
+SELLER_BLOCK = '//p[@class="seller-title"]'
+SELLER_LINK = '//p[@class="seller-title"]//a'
+SELLER_LOGO = '//p[@class="seller-title"]//img'
+
+PHOTOS_LIST = '//div[@class="scrollbar__content"]/ul'
+PHOTOS = '//div[@class="scrollbar__content"]/ul//li//img'
+
+SPEC_SECTIONS = '//main[@class="product-tabs__content"]//section'
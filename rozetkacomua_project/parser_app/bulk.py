@@ -0,0 +1,164 @@
+"""
+Batch persistence for scraped products.
+
+`upsert_products(records)` takes the `data` dicts produced by the scrapers and writes them in batches,
+one transaction per batch:
+- `Mobile` rows are upserted on `product_code` (`INSERT ... ON CONFLICT (product_code) DO UPDATE`),
+  so a price change updates the existing product instead of creating a new one;
+- photos are inserted with `bulk_create(ignore_conflicts=True)` (`ON CONFLICT DO NOTHING` on `(mobile_id, url)`),
+  so already known photos cost nothing;
+- a `PriceObservation` is appended for products whose price or review count changed (`parser_app.prices`);
+- `updated_at` moves only for new products and products whose fields or photo set changed, so incremental exports
+  (`parser_app.exports`) pick up exactly those;
+- records without a `product_code` cannot be upserted: they are skipped and reported (count and names);
+- a batch the database rejects (e.g. a record without a `regular_price`) is written again one record at a time, so
+  one bad record does not lose the others; the rejected ones go to `on_error(record, error)` (the callers mark
+  their URL / job failed) or are reported;
+- the record's `fingerprint` (when the scraper computed one) is stored with the product; `stored_fingerprints()`
+  loads them back, so the next run can skip unchanged products before parsing them further.
+
+`stage` is an optional `stage(name)` context manager factory (the scrapers pass `metrics.stage`): the product
+upsert, the photo insert and the price history are timed as `db_write`, `photo_insert` and `price_history`.
+
+That is a handful of queries per batch instead of ~2 queries per field lookup and per photo.
+"""
+
+from contextlib import nullcontext
+
+from django.db import DatabaseError, transaction
+from django.utils import timezone
+
+from .models import Mobile, Photo
+from .prices import record_price_changes
+
+
+MOBILE_FIELDS = [
+    "full_name_of_the_product",
+    "color",
+    "memory_size",
+    "seller",
+    "regular_price",
+    "promotional_price",
+    "product_code",
+    "number_of_reviews",
+    "series",
+    "screen_diagonal",
+    "display_resolution",
+    "product_specifications",
+]
+UPDATE_FIELDS = [field for field in MOBILE_FIELDS if field != "product_code"] + ["updated_at", "fingerprint"]
+
+
+def _batches(records, batch_size):
+    batch = []
+    for record in records:
+        batch.append(record)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _values(record):
+    # the MOBILE_FIELDS of a record as stored; a page without a characteristics tab has no specifications
+    values = {field: record.get(field) for field in MOBILE_FIELDS}
+    if values["product_specifications"] is None:
+        values["product_specifications"] = {}
+    return values
+
+
+def _current_state(codes):
+    # product_code -> (field values, photo urls, updated_at) of the stored products
+    state = {
+        row["product_code"]: (tuple(row[field] for field in MOBILE_FIELDS), set(), row["updated_at"])
+        for row in Mobile.objects.filter(product_code__in=codes).values(*MOBILE_FIELDS, "updated_at")
+    }
+    for code, url in Photo.objects.filter(mobile_id__product_code__in=codes).values_list("mobile_id__product_code", "url"):
+        state[code][1].add(url)
+    return state
+
+
+def _updated_at(record, stored, now):
+    if stored is None:
+        return now
+    values, photos, updated_at = stored
+    if tuple(_values(record).values()) != values:
+        return now
+    if not set(record.get("all_product_photos") or []) <= photos:
+        return now
+    return updated_at
+
+
+def _no_stage(name):
+    return nullcontext()
+
+
+def upsert_batch(records, stage=_no_stage):
+    # the same product twice in one statement is an error for ON CONFLICT DO UPDATE - the last one wins
+    by_code = {}
+    skipped = []
+    for record in records:
+        if record.get("product_code") is not None:
+            by_code[record["product_code"]] = record
+        else:
+            skipped.append(record)
+    if skipped:
+        # nothing to upsert on - usually a page that was not a product page (or was parsed from a block page)
+        names = ", ".join(repr(record.get("full_name_of_the_product")) for record in skipped[:5])
+        print(f"[bulk] {len(skipped)} of {len(records)} records without product_code not saved: {names}"
+              + (", ..." if len(skipped) > 5 else ""))
+    if not by_code:
+        return []
+
+    now = timezone.now()
+    with transaction.atomic():
+        with stage("db_write"):
+            stored = _current_state(list(by_code))
+            mobiles = Mobile.objects.bulk_create(
+                [
+                    Mobile(
+                        **_values(record),
+                        updated_at=_updated_at(record, stored.get(code), now),
+                        fingerprint=record.get("fingerprint"),
+                    )
+                    for code, record in by_code.items()
+                ],
+                update_conflicts=True,
+                unique_fields=["product_code"],
+                update_fields=UPDATE_FIELDS,
+            )
+        with stage("photo_insert"):
+            photos = [
+                Photo(url=url, mobile_id=mobile)
+                for mobile, record in zip(mobiles, by_code.values())
+                for url in dict.fromkeys(record.get("all_product_photos") or [])
+            ]
+            Photo.objects.bulk_create(photos, ignore_conflicts=True)
+        with stage("price_history"):
+            record_price_changes(mobiles, list(by_code.values()))
+    return mobiles
+
+
+def stored_fingerprints():
+    # product_code -> fingerprint of every product that has one
+    return dict(Mobile.objects.exclude(fingerprint=None).values_list("product_code", "fingerprint").iterator(chunk_size=5000))
+
+
+def upsert_products(records, batch_size=500, stage=_no_stage, on_error=None):
+    mobiles = []
+    for batch in _batches(records, batch_size):
+        try:
+            mobiles += upsert_batch(batch, stage)
+        except DatabaseError as e:
+            # the batch was rolled back as a whole: find the record(s) the database rejects
+            print(f"[bulk] batch of {len(batch)} records not saved ({e}), saving them one by one")
+            for record in batch:
+                try:
+                    mobiles += upsert_batch([record], stage)
+                except DatabaseError as e:
+                    if on_error is not None:
+                        on_error(record, e)
+                    else:
+                        print(f"[bulk] {record.get('full_name_of_the_product')!r} ({record.get('product_code')}) not saved: {e}")
+    return mobiles
@@ -0,0 +1,214 @@
+"""
+Streaming exports of the catalog (`Mobile` + photos + specifications) to JSONL, CSV and Parquet.
+
+- Rows are read with `.iterator(chunk_size=...)`, which is a server-side cursor on Postgres, so only one chunk
+  is in Python memory at a time; photos are aggregated into an array by the same query (`ARRAY_AGG`).
+- Specifications are flattened into one `spec: <label>` column per label; the set of columns is collected
+  by Postgres beforehand (`jsonb_each` / `jsonb_object_keys`), so CSV and Parquet get a fixed header/schema
+  without a first pass in Python.
+- Parquet is written one row group per chunk (`pyarrow`, optional dependency).
+- The column list and the rows are read in one `REPEATABLE READ` transaction, so they come from the same snapshot:
+  a label added by a scraper while the export streams is neither missing from the header nor an unknown column.
+- Incremental exports only include products whose `updated_at` moved since the previous export to the same
+  output (see `parser_app.bulk`); the watermark is kept in a small JSON file next to the output, and every
+  incremental run writes its own `<name>.<timestamp>.<ext>` file. The scrapers set `updated_at` before their
+  transaction commits, so a product can become visible with an `updated_at` a little older than the export's
+  snapshot: the watermark is saved `WATERMARK_OVERLAP` before the snapshot, and products changed in that window are
+  exported again by the next run - consumers keep the row with the latest `updated_at` per `product_code`.
+"""
+
+import os
+import csv
+import json
+from datetime import timedelta
+
+from django.db import connection, transaction
+from django.db.models import Q, Value
+from django.contrib.postgres.aggregates import ArrayAgg
+from django.utils.dateparse import parse_datetime
+
+from .models import Mobile
+from .bulk import MOBILE_FIELDS
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+
+EXPORT_FORMATS = ("jsonl", "csv", "parquet")
+
+SPEC_PREFIX = "spec: "
+BASE_COLUMNS = ["id"] + [field for field in MOBILE_FIELDS if field != "product_specifications"] + [
+    "updated_at",
+    "all_product_photos",
+]
+# longer than any scraper transaction (one batch upsert)
+WATERMARK_OVERLAP = timedelta(minutes=10)
+INT_COLUMNS = {"id", "memory_size", "regular_price", "promotional_price", "product_code", "number_of_reviews"}
+
+SPEC_KEYS_SQL = """
+    SELECT DISTINCT label
+    FROM {table} AS m,
+         jsonb_each(CASE WHEN jsonb_typeof(m.product_specifications) = 'object'
+                         THEN m.product_specifications ELSE '{{}}'::jsonb END) AS section,
+         jsonb_object_keys(CASE WHEN jsonb_typeof(section.value) = 'object'
+                                THEN section.value ELSE '{{}}'::jsonb END) AS label
+    {where}
+    ORDER BY label
+"""
+
+
+def spec_labels(since=None):
+    sql = SPEC_KEYS_SQL.format(
+        table=connection.ops.quote_name(Mobile._meta.db_table),
+        where="WHERE m.updated_at > %s" if since else "",
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [since] if since else [])
+        return [label for (label,) in cursor.fetchall()]
+
+
+def flatten_specs(specifications):
+    flat = {}
+    for section in (specifications or {}).values():
+        if isinstance(section, dict):
+            for label, value in section.items():
+                flat[SPEC_PREFIX + label] = value
+    return flat
+
+
+def catalog_rows(since=None, chunk_size=2000):
+    queryset = Mobile.objects.order_by("pk")
+    if since:
+        queryset = queryset.filter(updated_at__gt=since)
+    queryset = queryset.annotate(
+        photos=ArrayAgg("mobile__url", filter=Q(mobile__isnull=False), ordering="mobile__id", default=Value([])),
+    ).values("id", *MOBILE_FIELDS, "updated_at", "photos")
+
+    for row in queryset.iterator(chunk_size=chunk_size):
+        specifications = row.pop("product_specifications")
+        row["all_product_photos"] = row.pop("photos")
+        row.update(flatten_specs(specifications))
+        yield row
+
+
+# ---------------------------------------------------------------- writers
+
+def _chunks(rows, size):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def write_jsonl(rows, path, columns, chunk_size):
+    count = 0
+    with open(path, "w", encoding="utf-8") as f:
+        for row in rows:
+            f.write(json.dumps(row, ensure_ascii=False, default=str))
+            f.write("\n")
+            count += 1
+    return count
+
+
+def write_csv(rows, path, columns, chunk_size):
+    count = 0
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=columns)
+        writer.writeheader()
+        for row in rows:
+            row["all_product_photos"] = ", ".join(row["all_product_photos"])
+            row["updated_at"] = row["updated_at"].isoformat()
+            writer.writerow(row)
+            count += 1
+    return count
+
+
+def parquet_schema(columns):
+    fields = []
+    for column in columns:
+        if column in INT_COLUMNS:
+            fields.append(pa.field(column, pa.int64()))
+        elif column == "updated_at":
+            fields.append(pa.field(column, pa.timestamp("us", tz="UTC")))
+        elif column == "all_product_photos":
+            fields.append(pa.field(column, pa.list_(pa.string())))
+        else:
+            fields.append(pa.field(column, pa.string()))
+    return pa.schema(fields)
+
+
+def write_parquet(rows, path, columns, chunk_size):
+    if pa is None:
+        raise ImportError("Parquet export needs pyarrow: pip install pyarrow")
+    schema = parquet_schema(columns)
+    count = 0
+    with pq.ParquetWriter(path, schema, compression="zstd") as writer:
+        for chunk in _chunks(rows, chunk_size):
+            for row in chunk:
+                for column in row:
+                    if column.startswith(SPEC_PREFIX) and row[column] is not None:
+                        row[column] = str(row[column])
+            writer.write_table(pa.Table.from_pylist(chunk, schema=schema))
+            count += len(chunk)
+    return count
+
+
+WRITERS = {
+    "jsonl": write_jsonl,
+    "csv": write_csv,
+    "parquet": write_parquet,
+}
+
+
+# ---------------------------------------------------------------- incremental state
+
+def _state_path(path):
+    return f"{path}.state.json"
+
+
+def last_export(path):
+    try:
+        with open(_state_path(path), encoding="utf-8") as f:
+            return parse_datetime(json.load(f)["exported_until"])
+    except (FileNotFoundError, KeyError, ValueError):
+        return None
+
+
+def _save_state(path, exported_until):
+    with open(_state_path(path), "w", encoding="utf-8") as f:
+        json.dump({"exported_until": exported_until.isoformat()}, f)
+
+
+def _incremental_path(path, started):
+    root, ext = os.path.splitext(path)
+    return f"{root}.{started:%Y%m%dT%H%M%S}{ext}"
+
+
+def export_catalog(path, fmt, incremental=False, chunk_size=2000):
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format: {fmt!r}, expected one of {EXPORT_FORMATS}")
+
+    path = os.path.abspath(path)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    since = last_export(path) if incremental else None
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ")
+            cursor.execute("SELECT transaction_timestamp()")
+            started = cursor.fetchone()[0]
+        output = _incremental_path(path, started) if incremental else path
+
+        columns = BASE_COLUMNS + [SPEC_PREFIX + label for label in spec_labels(since)]
+        count = WRITERS[fmt](catalog_rows(since, chunk_size), output, columns, chunk_size)
+
+    if incremental:
+        _save_state(path, started - WATERMARK_OVERLAP)
+    return output, count
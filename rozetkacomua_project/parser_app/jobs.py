@@ -0,0 +1,114 @@
+"""
+A Postgres-backed job queue for scrape workers (`ScrapeJob`), so several machines that share only the database
+can work through one list of product URLs.
+
+- `enqueue(urls)` adds jobs; a URL that is already queued is not added twice (`refresh=True` puts finished and
+  dead ones back to pending).
+- `claim(worker, batch_size, lease)` takes a batch of ready jobs with `SELECT ... FOR UPDATE SKIP LOCKED`:
+  concurrent workers never wait for each other's rows and never get the same job. A claimed job is leased to the
+  worker for `lease` seconds; `extend_leases` keeps it while the worker is busy, and a job whose lease expired
+  (the worker died) is claimed again by someone else.
+- `complete(ids, worker)` / `fail(job, worker, error)`: a failed job is retried after an exponential backoff
+  (`backoff * 2 ** (attempts - 1)`, capped, with jitter) until `max_attempts`, then it is dead-lettered
+  (`status = dead`, with the last error) instead of being retried forever. `requeue_dead()` gives them another go.
+- Updates from a worker that has lost its lease in the meantime are ignored (`locked_by` must still match).
+"""
+
+import random
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Count, F, Q
+from django.utils import timezone
+
+from .models import ScrapeJob
+
+
+BACKOFF = 60
+MAX_BACKOFF = 3600
+
+
+def enqueue(urls, max_attempts=5, refresh=False, batch_size=1000):
+    urls = list(dict.fromkeys(urls))
+    added = 0
+    for i in range(0, len(urls), batch_size):
+        chunk = urls[i:i + batch_size]
+        existing = set(ScrapeJob.objects.filter(url__in=chunk).values_list("url", flat=True))
+        ScrapeJob.objects.bulk_create(
+            [ScrapeJob(url=url, max_attempts=max_attempts) for url in chunk if url not in existing],
+            ignore_conflicts=True,
+        )
+        added += len(chunk) - len(existing)
+        if refresh and existing:
+            ScrapeJob.objects.filter(url__in=existing, status__in=[ScrapeJob.DONE, ScrapeJob.DEAD]).update(
+                status=ScrapeJob.PENDING, attempts=0, max_attempts=max_attempts, run_after=timezone.now(),
+                last_error=None, finished_at=None,
+            )
+    return added
+
+
+def claim(worker, batch_size=10, lease=300):
+    now = timezone.now()
+    with transaction.atomic():
+        jobs = list(
+            ScrapeJob.objects.select_for_update(skip_locked=True)
+            .filter(Q(status=ScrapeJob.PENDING, run_after__lte=now) | Q(status=ScrapeJob.RUNNING, lease_expires_at__lt=now))
+            .order_by("run_after")[:batch_size]
+        )
+        # a job whose worker keeps dying with it is dead-lettered as well
+        dead = [job for job in jobs if job.status == ScrapeJob.RUNNING and job.attempts >= job.max_attempts]
+        if dead:
+            ScrapeJob.objects.filter(pk__in=[job.pk for job in dead]).update(
+                status=ScrapeJob.DEAD, locked_by=None, lease_expires_at=None, finished_at=now,
+                last_error="lease expired",
+            )
+        jobs = [job for job in jobs if job not in dead]
+        ScrapeJob.objects.filter(pk__in=[job.pk for job in jobs]).update(
+            status=ScrapeJob.RUNNING, locked_by=worker, lease_expires_at=now + timedelta(seconds=lease),
+            attempts=F("attempts") + 1,
+        )
+    for job in jobs:
+        job.status, job.locked_by, job.attempts = ScrapeJob.RUNNING, worker, job.attempts + 1
+    return jobs
+
+
+def extend_leases(ids, worker, lease=300):
+    return ScrapeJob.objects.filter(pk__in=ids, status=ScrapeJob.RUNNING, locked_by=worker).update(
+        lease_expires_at=timezone.now() + timedelta(seconds=lease),
+    )
+
+
+def complete(ids, worker):
+    return ScrapeJob.objects.filter(pk__in=ids, status=ScrapeJob.RUNNING, locked_by=worker).update(
+        status=ScrapeJob.DONE, locked_by=None, lease_expires_at=None, last_error=None, finished_at=timezone.now(),
+    )
+
+
+def retry_delay(attempts, backoff=BACKOFF, max_backoff=MAX_BACKOFF):
+    delay = min(backoff * 2 ** max(attempts - 1, 0), max_backoff)
+    return delay * random.uniform(0.75, 1.25)
+
+
+def fail(job, worker, error, backoff=BACKOFF, max_backoff=MAX_BACKOFF):
+    now = timezone.now()
+    jobs = ScrapeJob.objects.filter(pk=job.pk, status=ScrapeJob.RUNNING, locked_by=worker)
+    if job.attempts >= job.max_attempts:
+        return jobs.update(
+            status=ScrapeJob.DEAD, locked_by=None, lease_expires_at=None, last_error=str(error), finished_at=now,
+        )
+    return jobs.update(
+        status=ScrapeJob.PENDING, locked_by=None, lease_expires_at=None, last_error=str(error),
+        run_after=now + timedelta(seconds=retry_delay(job.attempts, backoff, max_backoff)),
+    )
+
+
+def requeue_dead():
+    return ScrapeJob.objects.filter(status=ScrapeJob.DEAD).update(
+        status=ScrapeJob.PENDING, attempts=0, run_after=timezone.now(), finished_at=None,
+    )
+
+
+def queue_stats():
+    stats = dict(ScrapeJob.objects.values_list("status").annotate(Count("pk")))
+    stats["ready"] = ScrapeJob.objects.filter(status=ScrapeJob.PENDING, run_after__lte=timezone.now()).count()
+    return stats
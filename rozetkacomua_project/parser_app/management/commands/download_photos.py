@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from parser_app.photos import PHOTOS_DIR, download_photos
+
+
+class Command(BaseCommand):
+    help = "Download the images of all Photo rows that are not stored yet into a content-addressed local store."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--root", default=PHOTOS_DIR, help="photo store directory (default: results/photos)")
+        parser.add_argument("--concurrency", type=int, default=16, help="downloads in flight at a time")
+        parser.add_argument("--chunk-size", type=int, default=500, help="URLs downloaded between two database updates")
+        parser.add_argument("--thumbnails", type=int, metavar="PX", help="also make thumbnails of at most PX x PX")
+        parser.add_argument("--thumbnail-workers", type=int, help="processes making thumbnails (default: CPU count)")
+        parser.add_argument("--timeout", type=int, default=60, help="seconds per download")
+        parser.add_argument("--limit", type=int, help="at most this many URLs in this run")
+        parser.add_argument("--verify", action="store_true", help="download again the photos whose file is gone")
+
+    def handle(self, *args, **options):
+        try:
+            stats = download_photos(
+                options["root"], options["concurrency"], options["chunk_size"], options["thumbnails"],
+                options["thumbnail_workers"], options["timeout"], options["limit"], options["verify"],
+            )
+        except RuntimeError as e:
+            raise CommandError(e)
+        self.stdout.write(self.style.SUCCESS(
+            f"{stats['downloaded']} downloaded ({stats['bytes'] / 1024 ** 2:.1f} MB), {stats['reused']} already stored, "
+            f"{stats['failed']} failed; {stats['photos']} photos updated, {stats['thumbnails']} thumbnails"
+        ))
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from parser_app.exports import EXPORT_FORMATS, export_catalog
+
+
+class Command(BaseCommand):
+    help = "Stream the Mobile catalog (with photos and flattened specifications) to JSONL, CSV or Parquet."
+
+    def add_arguments(self, parser):
+        parser.add_argument("output", help="output file, e.g. ../results/exports/mobiles.parquet")
+        parser.add_argument("--format", choices=EXPORT_FORMATS, help="default: taken from the output extension")
+        parser.add_argument("--incremental", action="store_true", help="only products changed since the previous export to this output")
+        parser.add_argument("--chunk-size", type=int, default=2000, help="rows fetched from the database at a time")
+
+    def handle(self, *args, **options):
+        fmt = options["format"] or options["output"].rsplit(".", 1)[-1].lower()
+        output, count = export_catalog(options["output"], fmt, options["incremental"], options["chunk_size"])
+        self.stdout.write(self.style.SUCCESS(f"{count} products exported to {output}"))
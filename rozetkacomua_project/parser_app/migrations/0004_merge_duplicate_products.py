@@ -0,0 +1,40 @@
+# Generated by Django 5.2.18 on 2026-10-16 22:28
+
+from django.db import migrations
+from django.db.models import Count, Max, Min
+
+
+def merge_duplicates(apps, schema_editor):
+    # before the unique constraints: keep the newest Mobile per product_code
+    # and one Photo per (mobile, url)
+    Mobile = apps.get_model('parser_app', 'Mobile')
+    Photo = apps.get_model('parser_app', 'Photo')
+
+    duplicated = (
+        Mobile.objects.values('product_code')
+        .annotate(rows=Count('id'), keep=Max('id'))
+        .filter(rows__gt=1)
+    )
+    for row in duplicated:
+        stale = Mobile.objects.filter(product_code=row['product_code']).exclude(id=row['keep'])
+        Photo.objects.filter(mobile_id__in=stale).update(mobile_id=row['keep'])
+        stale.delete()
+
+    duplicated = (
+        Photo.objects.values('mobile_id', 'url')
+        .annotate(rows=Count('id'), keep=Min('id'))
+        .filter(rows__gt=1)
+    )
+    for row in duplicated:
+        Photo.objects.filter(mobile_id=row['mobile_id'], url=row['url']).exclude(id=row['keep']).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('parser_app', '0003_rename_all_product_photos_photo_mobile_id_and_more'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicates, migrations.RunPython.noop),
+    ]
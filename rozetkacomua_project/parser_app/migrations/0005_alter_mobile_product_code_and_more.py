@@ -0,0 +1,22 @@
+# Generated by Django 5.2.18 on 2026-10-16 22:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('parser_app', '0004_merge_duplicate_products'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='mobile',
+            name='product_code',
+            field=models.IntegerField(unique=True),
+        ),
+        migrations.AddConstraint(
+            model_name='photo',
+            constraint=models.UniqueConstraint(fields=('mobile_id', 'url'), name='unique_photo_per_mobile'),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-16 22:29
+
+import django.contrib.postgres.indexes
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('parser_app', '0005_alter_mobile_product_code_and_more'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='photo',
+            name='mobile_id',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='mobile', to='parser_app.mobile'),
+        ),
+        migrations.AddIndex(
+            model_name='mobile',
+            index=models.Index(fields=['series'], name='mobile_series_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='mobile',
+            index=models.Index(fields=['regular_price'], name='mobile_regular_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='mobile',
+            index=models.Index(fields=['promotional_price'], name='mobile_promotional_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='mobile',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['product_specifications'], name='mobile_specs_gin_idx', opclasses=['jsonb_path_ops']),
+        ),
+    ]
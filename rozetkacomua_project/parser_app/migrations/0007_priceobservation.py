@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-16 22:30
+
+import django.contrib.postgres.indexes
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('parser_app', '0006_alter_photo_mobile_id_mobile_mobile_series_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PriceObservation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('observed_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('regular_price', models.IntegerField(null=True)),
+                ('promotional_price', models.IntegerField(null=True)),
+                ('number_of_reviews', models.IntegerField(null=True)),
+                ('mobile_id', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='price_observations', to='parser_app.mobile')),
+            ],
+            options={
+                'indexes': [django.contrib.postgres.indexes.BrinIndex(fields=['observed_at'], name='price_observed_at_brin_idx'), models.Index(fields=['mobile_id', '-observed_at'], name='price_latest_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-16 22:33
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('parser_app', '0007_priceobservation'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='mobile',
+            name='updated_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.AddIndex(
+            model_name='mobile',
+            index=models.Index(fields=['updated_at'], name='mobile_updated_at_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-16 22:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('parser_app', '0009_scrapejob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='mobile',
+            name='fingerprint',
+            field=models.CharField(blank=True, max_length=64, null=True),
+        ),
+    ]
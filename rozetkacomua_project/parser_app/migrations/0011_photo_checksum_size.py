@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-16 22:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('parser_app', '0010_mobile_fingerprint'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='photo',
+            name='checksum',
+            field=models.CharField(blank=True, max_length=64, null=True),
+        ),
+        migrations.AddField(
+            model_name='photo',
+            name='file',
+            field=models.CharField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='photo',
+            name='size',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='photo',
+            index=models.Index(condition=models.Q(('checksum', None)), fields=['url'], name='photo_pending_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='photo',
+            index=models.Index(fields=['checksum'], name='photo_checksum_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-16 23:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('parser_app', '0011_photo_checksum_size'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='photo',
+            name='failed_downloads',
+            field=models.IntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 5.2.18 on 2026-10-16 23:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('parser_app', '0012_photo_failed_downloads'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='mobile',
+            name='color',
+            field=models.CharField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='mobile',
+            name='display_resolution',
+            field=models.CharField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='mobile',
+            name='memory_size',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='mobile',
+            name='number_of_reviews',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='mobile',
+            name='promotional_price',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='mobile',
+            name='screen_diagonal',
+            field=models.CharField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='mobile',
+            name='seller',
+            field=models.CharField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='mobile',
+            name='series',
+            field=models.CharField(blank=True, null=True),
+        ),
+    ]
@@ -1,5 +1,7 @@
 from django.db import models
+from django.utils import timezone
 from django.contrib.postgres.fields import ArrayField
+from django.contrib.postgres.indexes import BrinIndex, GinIndex
 
 # Create your models here.
 
@@ -7,30 +9,109 @@ from django.contrib.postgres.fields import ArrayField
 
 class Mobile(models.Model):
     full_name_of_the_product = models.CharField()
-    color = models.CharField()
-    memory_size = models.IntegerField()
-    seller = models.CharField()
+    # NULL when the page does not show it (no seller block, no discount, no characteristics row...)
+    color = models.CharField(null=True, blank=True)
+    memory_size = models.IntegerField(null=True, blank=True)
+    seller = models.CharField(null=True, blank=True)
     regular_price = models.IntegerField()
-    promotional_price = models.IntegerField()#(if_any)
-    product_code = models.IntegerField()
-    number_of_reviews = models.IntegerField()
-    series = models.CharField()
-    screen_diagonal = models.CharField()
-    display_resolution = models.CharField()
+    promotional_price = models.IntegerField(null=True, blank=True)#(if_any)
+    product_code = models.IntegerField(unique=True)
+    number_of_reviews = models.IntegerField(null=True, blank=True)
+    series = models.CharField(null=True, blank=True)
+    screen_diagonal = models.CharField(null=True, blank=True)
+    display_resolution = models.CharField(null=True, blank=True)
     product_specifications = models.JSONField() #All_specifications_on_the_tab._Collect_specifications_as_a_dictionary
+    updated_at = models.DateTimeField(default=timezone.now) #_moved_only_when_the_scraped_data_changed_(see_parser_app/bulk.py)
+    fingerprint = models.CharField(max_length=64, null=True, blank=True) #_sha256_of_the_product_page_record_(see_modules/product_parser.py)
 
     def __str__(self):
         return f"Name: {self.full_name_of_the_product}."
 
     class Meta:
         verbose_name = "Mobile"
+        indexes = [
+            models.Index(fields=["series"], name="mobile_series_idx"),
+            models.Index(fields=["regular_price"], name="mobile_regular_price_idx"),
+            models.Index(fields=["promotional_price"], name="mobile_promotional_price_idx"),
+            # incremental exports: updated_at > <last export>
+            models.Index(fields=["updated_at"], name="mobile_updated_at_idx"),
+            # containment queries: product_specifications__contains={...}
+            GinIndex(fields=["product_specifications"], opclasses=["jsonb_path_ops"], name="mobile_specs_gin_idx"),
+        ]
 
 
 class Photo(models.Model):
     # alt = models.CharField() 
     url = models.CharField() 
-    mobile_id = models.ForeignKey(Mobile, on_delete=models.CASCADE, related_name="mobile") #_Here_you_need_to_collect_links_to_photos_and_save_to_the_list
+    mobile_id = models.ForeignKey(Mobile, on_delete=models.CASCADE, related_name="mobile", db_index=False) #_covered_by_unique_photo_per_mobile #_Here_you_need_to_collect_links_to_photos_and_save_to_the_list
+    # filled by the photo downloader (see parser_app/photos.py); NULL until the image is stored
+    checksum = models.CharField(max_length=64, null=True, blank=True) #_sha256_of_the_image
+    size = models.IntegerField(null=True, blank=True) #_bytes
+    file = models.CharField(null=True, blank=True) #_path_in_the_photo_store,_e.g._ab/ab12....jpg
+    failed_downloads = models.IntegerField(default=0) #_URLs_that_keep_failing_go_to_the_end_of_the_work_list
 
 
     def __str__(self):
-        return f"Name: {self.url}."
\ No newline at end of file
+        return f"Name: {self.url}."
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["mobile_id", "url"], name="unique_photo_per_mobile"),
+        ]
+        indexes = [
+            # the downloader's work list: photos that are not stored yet
+            models.Index(fields=["url"], name="photo_pending_idx", condition=models.Q(checksum=None)),
+            # the same image under several products / URLs
+            models.Index(fields=["checksum"], name="photo_checksum_idx"),
+        ]
+
+
+class PriceObservation(models.Model):
+    # append-only; a row is written only when one of the values changed (see parser_app/prices.py)
+    mobile_id = models.ForeignKey(Mobile, on_delete=models.CASCADE, related_name="price_observations", db_index=False) #_covered_by_price_latest_idx
+    observed_at = models.DateTimeField(default=timezone.now)
+    regular_price = models.IntegerField(null=True)
+    promotional_price = models.IntegerField(null=True)
+    number_of_reviews = models.IntegerField(null=True)
+
+    def __str__(self):
+        return f"{self.mobile_id_id}: {self.regular_price}/{self.promotional_price} at {self.observed_at}."
+
+    class Meta:
+        indexes = [
+            # rows are appended in time order, so a BRIN index stays tiny and serves time range scans
+            BrinIndex(fields=["observed_at"], name="price_observed_at_brin_idx"),
+            # "latest observation of a product" is one index probe
+            models.Index(fields=["mobile_id", "-observed_at"], name="price_latest_idx"),
+        ]
+
+
+class ScrapeJob(models.Model):
+    # one product URL (or search query) to scrape; claimed by workers with SELECT ... FOR UPDATE SKIP LOCKED (see parser_app/jobs.py)
+    PENDING = "pending"
+    RUNNING = "running"
+    DONE = "done"
+    DEAD = "dead"
+    STATUSES = [(PENDING, "pending"), (RUNNING, "running"), (DONE, "done"), (DEAD, "dead")]
+
+    url = models.CharField(unique=True)
+    status = models.CharField(max_length=16, choices=STATUSES, default=PENDING)
+    attempts = models.IntegerField(default=0)
+    max_attempts = models.IntegerField(default=5)
+    run_after = models.DateTimeField(default=timezone.now) #_retry_backoff
+    locked_by = models.CharField(null=True, blank=True)
+    lease_expires_at = models.DateTimeField(null=True, blank=True) #_a_running_job_with_an_expired_lease_is_claimed_again
+    last_error = models.TextField(null=True, blank=True)
+    created_at = models.DateTimeField(default=timezone.now)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.url}: {self.status} ({self.attempts}/{self.max_attempts})."
+
+    class Meta:
+        indexes = [
+            # the claim query: ready pending jobs in run_after order
+            models.Index(fields=["run_after"], name="job_ready_idx", condition=models.Q(status="pending")),
+            # running jobs whose worker died
+            models.Index(fields=["lease_expires_at"], name="job_lease_idx", condition=models.Q(status="running")),
+        ]
@@ -0,0 +1,227 @@
+"""
+Downloads the images behind `Photo.url` into a local, content-addressed store.
+
+Layout (under `results/photos/` by default):
+- `blobs/ab/<sha256>.<ext>`  - the image bytes, named by their SHA-256, so the same image used by several products
+  (or served under several URLs) is stored once; the extension is taken from the image's magic bytes;
+- `thumbs/ab/<sha256>.jpg`   - optional thumbnails, made by Pillow in a process pool (CPU-bound, off the event loop).
+
+`download_photos()` works through the photos that have no `checksum` yet, in chunks:
+- a URL is downloaded once, however many `Photo` rows share it, and a URL already stored for another row is not
+  downloaded at all;
+- downloads run on one `aiohttp` session (keep-alive connections, at most `concurrency` requests in flight);
+- a response that is not an image (an HTML block / error page served with 200, a `Content-Type` other than
+  `image/*`, or a body without known image magic bytes) counts as failed and is not stored;
+- `checksum`, `size` and `file` are written back with one `bulk_update` per chunk, so a repeated run only fetches
+  what is still missing (failed downloads stay pending and are retried next time);
+- every failure increments `Photo.failed_downloads`, and the work list is ordered by it, so URLs that keep failing
+  go to the end and do not take the `limit` slots of a run from URLs that were never tried.
+`verify=True` first puts photos whose file has disappeared (or was stored before the image check) back into the work
+list.
+"""
+
+import os
+import asyncio
+import hashlib
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db.models import F, Max
+
+from .models import Photo
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+
+PHOTOS_DIR = os.path.join(settings.BASE_DIR.parent, "results", "photos")
+
+HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/117.0.0.0 Safari/537.36",
+    "Referer": "https://rozetka.com.ua/",
+}
+MAGIC = (
+    (b"\xff\xd8\xff", "jpg"),
+    (b"\x89PNG\r\n\x1a\n", "png"),
+    (b"GIF8", "gif"),
+)
+
+
+class NotAnImage(Exception):
+    pass
+
+
+def image_extension(content):
+    for magic, ext in MAGIC:
+        if content.startswith(magic):
+            return ext
+    if content[:4] == b"RIFF" and content[8:12] == b"WEBP":
+        return "webp"
+    if content[4:12] in (b"ftypavif", b"ftypavis"):
+        return "avif"
+    return "bin"
+
+
+def make_thumbnail(source, target, size):
+    # runs in a worker process
+    with Image.open(source) as image:
+        image.thumbnail((size, size))
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        tmp = f"{target}.{os.getpid()}.tmp"
+        image.convert("RGB").save(tmp, "JPEG", quality=85)
+        os.replace(tmp, target)
+    return target
+
+
+class PhotoStore:
+    def __init__(self, root=PHOTOS_DIR):
+        self.root = os.path.abspath(root)
+
+    def path(self, file):
+        return os.path.join(self.root, "blobs", file)
+
+    def thumb_path(self, checksum):
+        return os.path.join(self.root, "thumbs", checksum[:2], checksum + ".jpg")
+
+    def put(self, content):
+        # -> (checksum, size, file); writing an image that is already stored costs nothing
+        checksum = hashlib.sha256(content).hexdigest()
+        file = f"{checksum[:2]}/{checksum}.{image_extension(content)}"
+        path = self.path(file)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp = f"{path}.{threading.get_ident()}.tmp"
+            with open(tmp, "wb") as f:
+                f.write(content)
+            os.replace(tmp, path)
+        return checksum, len(content), file
+
+
+def _pending_urls(limit=None):
+    # never tried first; a URL's rows may differ when a product was added after the failures
+    urls = (
+        Photo.objects.filter(checksum=None).values("url").annotate(failures=Max("failed_downloads"))
+        .order_by("failures", "url").values_list("url", flat=True)
+    )
+    return list(urls[:limit] if limit else urls)
+
+
+def _known(urls):
+    # url -> (checksum, size, file) of URLs already stored for another row
+    return {
+        url: (checksum, size, file)
+        for url, checksum, size, file in Photo.objects.filter(url__in=urls)
+        .exclude(checksum=None)
+        .values_list("url", "checksum", "size", "file")
+    }
+
+
+def _save(results):
+    photos = list(Photo.objects.filter(url__in=list(results), checksum=None).only("pk", "url"))
+    for photo in photos:
+        photo.checksum, photo.size, photo.file = results[photo.url]
+    Photo.objects.bulk_update(photos, ["checksum", "size", "file"], batch_size=1000)
+    return len(photos)
+
+
+def _record_failures(urls):
+    return Photo.objects.filter(url__in=urls, checksum=None).update(failed_downloads=F("failed_downloads") + 1)
+
+
+def reset_missing(store):
+    missing = [
+        pk for pk, file in Photo.objects.exclude(checksum=None).values_list("pk", "file").iterator(chunk_size=5000)
+        if not file or file.endswith(".bin") or not os.path.exists(store.path(file))
+    ]
+    for i in range(0, len(missing), 1000):
+        Photo.objects.filter(pk__in=missing[i:i + 1000]).update(checksum=None, size=None, file=None)
+    return len(missing)
+
+
+async def _download(session, semaphore, store, url):
+    async with semaphore:
+        async with session.get(url) as response:
+            response.raise_for_status()
+            content_type = response.headers.get("Content-Type", "")
+            if content_type and not content_type.startswith("image/"):
+                raise NotAnImage(f"not an image: {content_type}")
+            content = await response.read()
+    if image_extension(content) == "bin":
+        raise NotAnImage(f"not an image: {len(content)} bytes starting with {content[:16]!r}")
+    # hashing and writing a file would block the loop for every other download
+    return await asyncio.get_running_loop().run_in_executor(None, store.put, content)
+
+
+async def _thumbnails(pool, store, results, size):
+    loop = asyncio.get_running_loop()
+    jobs = [
+        loop.run_in_executor(pool, make_thumbnail, store.path(file), store.thumb_path(checksum), size)
+        for checksum, _, file in {result[0]: result for result in results.values()}.values()
+        if not os.path.exists(store.thumb_path(checksum))
+    ]
+    done = await asyncio.gather(*jobs, return_exceptions=True)
+    return sum(1 for result in done if not isinstance(result, Exception))
+
+
+async def _run(store, concurrency, chunk_size, thumbnail_size, thumbnail_workers, timeout, limit, stats):
+    pending = await sync_to_async(_pending_urls)(limit)
+    print(f"[photos] {len(pending)} URLs to store")
+
+    pool = ProcessPoolExecutor(thumbnail_workers) if thumbnail_size else None
+    connector = aiohttp.TCPConnector(limit=concurrency, ttl_dns_cache=300)
+    semaphore = asyncio.Semaphore(concurrency)
+    try:
+        async with aiohttp.ClientSession(
+            connector=connector, headers=HEADERS, timeout=aiohttp.ClientTimeout(total=timeout),
+        ) as session:
+            for i in range(0, len(pending), chunk_size):
+                chunk = pending[i:i + chunk_size]
+                results = await sync_to_async(_known)(chunk)
+                stats["reused"] += len(results)
+
+                urls = [url for url in chunk if url not in results]
+                done = await asyncio.gather(*(_download(session, semaphore, store, url) for url in urls), return_exceptions=True)
+                failed = []
+                for url, result in zip(urls, done):
+                    if isinstance(result, Exception):
+                        failed.append(url)
+                        print(f"[{url}] Error: {result}")
+                    else:
+                        results[url] = result
+                        stats["downloaded"] += 1
+                        stats["bytes"] += result[1]
+
+                stats["failed"] += len(failed)
+                if failed:
+                    await sync_to_async(_record_failures)(failed)
+                stats["photos"] += await sync_to_async(_save)(results)
+                if pool is not None:
+                    stats["thumbnails"] += await _thumbnails(pool, store, results, thumbnail_size)
+                print(f"[photos] {min(i + chunk_size, len(pending))}/{len(pending)} URLs, {dict(stats)}")
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+
+def download_photos(root=PHOTOS_DIR, concurrency=16, chunk_size=500, thumbnail_size=None, thumbnail_workers=None,
+                    timeout=60, limit=None, verify=False):
+    if aiohttp is None:
+        raise RuntimeError("Downloading photos needs aiohttp: pip install aiohttp")
+    if thumbnail_size and Image is None:
+        raise RuntimeError("Thumbnails need Pillow: pip install Pillow")
+
+    store = PhotoStore(root)
+    stats = dict.fromkeys(("downloaded", "reused", "failed", "photos", "bytes", "thumbnails"), 0)
+    if verify:
+        stats["missing"] = reset_missing(store)
+    asyncio.run(_run(store, concurrency, chunk_size, thumbnail_size, thumbnail_workers, timeout, limit, stats))
+    return stats
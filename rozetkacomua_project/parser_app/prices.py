@@ -0,0 +1,53 @@
+"""
+Price history helpers.
+
+- `record_price_changes(mobiles, records)` appends a `PriceObservation` for every product whose regular price,
+  promotional price or number of reviews differs from its latest observation (or that has none yet);
+  unchanged products cost nothing but one shared lookup per batch.
+- `with_latest_prices(queryset)` annotates `Mobile` rows with their latest observation. Every product is a single
+  probe of the `(mobile_id, observed_at DESC)` index, so it does not slow down as the history grows.
+"""
+
+from django.db.models import OuterRef, Subquery
+from django.utils import timezone
+
+from .models import Mobile, PriceObservation
+
+
+TRACKED_FIELDS = ("regular_price", "promotional_price", "number_of_reviews")
+
+
+def _latest(field):
+    return Subquery(
+        PriceObservation.objects.filter(mobile_id=OuterRef("pk")).order_by("-observed_at").values(field)[:1]
+    )
+
+
+def with_latest_prices(queryset=None):
+    queryset = Mobile.objects.all() if queryset is None else queryset
+    return queryset.annotate(
+        latest_observed_at=_latest("observed_at"),
+        **{f"latest_{field}": _latest(field) for field in TRACKED_FIELDS},
+    )
+
+
+def record_price_changes(mobiles, records, observed_at=None):
+    observed_at = observed_at or timezone.now()
+    latest = {
+        row["pk"]: tuple(row[f"latest_{field}"] for field in TRACKED_FIELDS)
+        for row in with_latest_prices(Mobile.objects.filter(pk__in=[m.pk for m in mobiles])).values(
+            "pk", "latest_observed_at", *[f"latest_{field}" for field in TRACKED_FIELDS]
+        )
+        if row["latest_observed_at"] is not None
+    }
+
+    observations = []
+    for mobile, record in zip(mobiles, records):
+        values = tuple(record.get(field) for field in TRACKED_FIELDS)
+        if latest.get(mobile.pk) != values:
+            observations.append(PriceObservation(
+                mobile_id=mobile,
+                observed_at=observed_at,
+                **dict(zip(TRACKED_FIELDS, values)),
+            ))
+    return PriceObservation.objects.bulk_create(observations)
@@ -0,0 +1,81 @@
+"""
+The Prometheus text exposition of the scrape pipeline, served by `views.metrics` at `/metrics`.
+
+Every scraper process writes a live snapshot of its stage timings and counters to `results/metrics/live/` every few
+seconds (`modules/metrics.py`). `render()` merges the snapshots written in the last `max_age` seconds (older ones
+belong to processes that stopped) into one exposition, each sample labelled with the `scraper` (job name) and
+`process` (host:pid) it came from - not `job` / `instance`, which Prometheus sets for the target itself - and adds
+gauges read from the database: jobs in the queue per status, products, and photos not downloaded yet.
+"""
+
+import os
+import glob
+import json
+import time
+
+from django.conf import settings
+
+from .jobs import queue_stats
+from .models import Mobile, Photo
+
+
+LIVE_DIR = os.path.join(settings.BASE_DIR.parent, "results", "metrics", "live")
+MAX_AGE = 300
+
+DATABASE_FAMILIES = {
+    "scrape_queue_jobs": ("gauge", "Jobs in the scrape queue per status (ready: pending and due)."),
+    "scrape_products": ("gauge", "Products in the database."),
+    "scrape_photos_pending": ("gauge", "Photos whose image is not stored yet."),
+}
+
+
+def live_snapshots(directory=LIVE_DIR, max_age=MAX_AGE):
+    now = time.time()
+    snapshots = []
+    for path in sorted(glob.glob(os.path.join(directory, "*.json"))):
+        try:
+            if now - os.path.getmtime(path) > max_age:
+                continue
+            with open(path, encoding="utf-8") as f:
+                snapshots.append(json.load(f))
+        except (OSError, ValueError):
+            # removed or being replaced while we read it
+            continue
+    return snapshots
+
+
+def database_samples():
+    samples = [["scrape_queue_jobs", {"status": status}, count] for status, count in sorted(queue_stats().items())]
+    samples.append(["scrape_products", {}, Mobile.objects.count()])
+    samples.append(["scrape_photos_pending", {}, Photo.objects.filter(checksum=None).count()])
+    return samples
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _line(name, labels, value):
+    if not labels:
+        return f"{name} {value}"
+    return name + "{" + ",".join(f'{key}="{_escape(val)}"' for key, val in labels.items()) + "}" + f" {value}"
+
+
+def render(snapshots, extra_samples=()):
+    # name -> (type, help, [lines]); the samples of a family must be written together
+    families = {}
+    for snapshot in snapshots:
+        process = {"scraper": snapshot["job"], "process": snapshot["instance"]}
+        for name, labels, value in snapshot["samples"]:
+            kind, help_text = snapshot["families"].get(name, ("untyped", ""))
+            families.setdefault(name, (kind, help_text, []))[2].append(_line(name, {**process, **labels}, value))
+    for name, labels, value in extra_samples:
+        kind, help_text = DATABASE_FAMILIES[name]
+        families.setdefault(name, (kind, help_text, []))[2].append(_line(name, labels, value))
+
+    lines = []
+    for name, (kind, help_text, samples) in families.items():
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        lines += samples
+    return "\n".join(lines) + "\n"
@@ -1,3 +1,360 @@
-from django.test import TestCase
+"""
+Tests of the job queue (`parser_app.jobs`), the batch upsert (`parser_app.bulk`) and the photo downloader
+(`parser_app.photos`, against a local HTTP server; skipped without aiohttp).
 
-# Create your tests here.
+They need Postgres (`SELECT ... FOR UPDATE SKIP LOCKED`, `ON CONFLICT`, `jsonb`): point the `POSTGRES_*` environment
+variables at a local server and run `python manage.py test parser_app`.
+"""
+
+import shutil
+import asyncio
+import tempfile
+import threading
+from contextlib import redirect_stdout
+from datetime import timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import StringIO
+from unittest import skipIf
+
+from asgiref.sync import sync_to_async
+from django.db import connection, connections, transaction
+from django.test import TestCase, TransactionTestCase
+from django.utils import timezone
+
+from .bulk import upsert_batch, upsert_products
+from .jobs import claim, complete, enqueue, extend_leases, fail, queue_stats, requeue_dead, retry_delay
+from .models import Mobile, Photo, PriceObservation, ScrapeJob
+from .photos import _pending_urls, aiohttp, download_photos
+
+
+def urls(n, start=0):
+    return [f"https://rozetka.com.ua/product/p{i}/" for i in range(start, start + n)]
+
+
+def expire(jobs):
+    ScrapeJob.objects.filter(pk__in=[job.pk for job in jobs]).update(lease_expires_at=timezone.now() - timedelta(seconds=1))
+
+
+def make_due(jobs):
+    ScrapeJob.objects.filter(pk__in=[job.pk for job in jobs]).update(run_after=timezone.now() - timedelta(seconds=1))
+
+
+class EnqueueTest(TestCase):
+    def test_enqueue_skips_known_urls(self):
+        self.assertEqual(enqueue(urls(3)), 3)
+        self.assertEqual(enqueue(urls(5)), 2)
+        self.assertEqual(ScrapeJob.objects.count(), 5)
+
+    def test_refresh_requeues_finished_jobs(self):
+        enqueue(urls(2))
+        jobs = claim("w1", 2)
+        complete([jobs[0].pk], "w1")
+
+        enqueue(urls(2), refresh=True)
+        done = ScrapeJob.objects.get(pk=jobs[0].pk)
+        self.assertEqual((done.status, done.attempts), (ScrapeJob.PENDING, 0))
+        # a running job is not taken away from its worker
+        self.assertEqual(ScrapeJob.objects.get(pk=jobs[1].pk).status, ScrapeJob.RUNNING)
+
+
+class ClaimTest(TestCase):
+    def test_claim_leases_the_jobs_to_the_worker(self):
+        enqueue(urls(5))
+        jobs = claim("w1", batch_size=3, lease=60)
+        self.assertEqual(len(jobs), 3)
+        for job in ScrapeJob.objects.filter(pk__in=[job.pk for job in jobs]):
+            self.assertEqual((job.status, job.locked_by, job.attempts), (ScrapeJob.RUNNING, "w1", 1))
+            self.assertGreater(job.lease_expires_at, timezone.now() + timedelta(seconds=50))
+
+        # leased jobs are not handed out again while the lease runs
+        self.assertEqual({job.pk for job in claim("w2", batch_size=10)} & {job.pk for job in jobs}, set())
+        self.assertEqual(claim("w3", batch_size=10), [])
+
+    def test_jobs_not_due_are_not_claimed(self):
+        enqueue(urls(1))
+        ScrapeJob.objects.update(run_after=timezone.now() + timedelta(minutes=5))
+        self.assertEqual(claim("w1"), [])
+        self.assertEqual(queue_stats(), {ScrapeJob.PENDING: 1, "ready": 0})
+
+    def test_expired_lease_is_claimed_by_another_worker(self):
+        enqueue(urls(1))
+        job, = claim("w1")
+        expire([job])
+
+        again, = claim("w2")
+        self.assertEqual((again.pk, again.locked_by, again.attempts), (job.pk, "w2", 2))
+        # the first worker lost the job: its late updates are ignored
+        self.assertEqual(complete([job.pk], "w1"), 0)
+        self.assertEqual(extend_leases([job.pk], "w1"), 0)
+        self.assertEqual(complete([job.pk], "w2"), 1)
+
+    def test_extended_lease_keeps_the_job(self):
+        enqueue(urls(1))
+        job, = claim("w1", lease=60)
+        expire([job])
+        self.assertEqual(extend_leases([job.pk], "w1", lease=60), 1)
+        self.assertEqual(claim("w2"), [])
+
+    def test_job_whose_worker_keeps_dying_is_dead_lettered(self):
+        enqueue(urls(1), max_attempts=2)
+        job, = claim("w1")
+        expire([job])
+        claim("w2")
+        expire([job])
+
+        self.assertEqual(claim("w3"), [])
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.last_error, job.locked_by), (ScrapeJob.DEAD, "lease expired", None))
+
+
+class FailTest(TestCase):
+    def test_failed_job_is_retried_after_a_backoff(self):
+        enqueue(urls(1))
+        job, = claim("w1")
+        before = timezone.now()
+        self.assertEqual(fail(job, "w1", ValueError("boom"), backoff=100), 1)
+
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.last_error, job.locked_by), (ScrapeJob.PENDING, "boom", None))
+        self.assertGreaterEqual(job.run_after, before + timedelta(seconds=75))
+        self.assertLessEqual(job.run_after, timezone.now() + timedelta(seconds=125))
+        self.assertEqual(claim("w1"), [])
+
+    def test_backoff_doubles_up_to_the_cap(self):
+        for attempts, expected in ((1, 60), (2, 120), (3, 240), (10, 3600)):
+            delay = retry_delay(attempts, backoff=60, max_backoff=3600)
+            self.assertGreaterEqual(delay, expected * 0.75)
+            self.assertLessEqual(delay, expected * 1.25)
+
+    def test_job_is_dead_lettered_after_max_attempts(self):
+        enqueue(urls(1), max_attempts=2)
+        for attempt in range(2):
+            job, = claim("w1")
+            fail(job, "w1", f"error {attempt}")
+            make_due([job])
+
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts, job.last_error), (ScrapeJob.DEAD, 2, "error 1"))
+        self.assertIsNotNone(job.finished_at)
+        self.assertEqual(claim("w1"), [])
+
+    def test_requeue_dead_gives_another_max_attempts(self):
+        enqueue(urls(1), max_attempts=1)
+        job, = claim("w1")
+        fail(job, "w1", "boom")
+
+        self.assertEqual(requeue_dead(), 1)
+        again, = claim("w2")
+        self.assertEqual((again.pk, again.attempts), (job.pk, 1))
+
+
+class SkipLockedTest(TransactionTestCase):
+    # the claims must run on their own connections, committed, like separate workers
+
+    def test_claim_skips_rows_locked_by_another_transaction(self):
+        enqueue(urls(6))
+        locked = list(ScrapeJob.objects.order_by("pk").values_list("pk", flat=True)[:3])
+        holding, release = threading.Event(), threading.Event()
+
+        def other_worker():
+            try:
+                with transaction.atomic():
+                    list(ScrapeJob.objects.select_for_update().filter(pk__in=locked))
+                    holding.set()
+                    release.wait(10)
+            finally:
+                connection.close()
+
+        thread = threading.Thread(target=other_worker)
+        thread.start()
+        try:
+            self.assertTrue(holding.wait(10))
+            claimed = [job.pk for job in claim("w1", batch_size=10)]
+        finally:
+            release.set()
+            thread.join()
+        self.assertEqual(len(claimed), 3)
+        self.assertEqual(set(claimed) & set(locked), set())
+
+    def test_concurrent_workers_never_get_the_same_job(self):
+        enqueue(urls(40))
+        claimed = {}
+        start = threading.Barrier(4)
+
+        def worker(name):
+            try:
+                start.wait(10)
+                while True:
+                    jobs = claim(name, batch_size=3)
+                    if not jobs:
+                        break
+                    claimed.setdefault(name, []).extend(job.pk for job in jobs)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=worker, args=(f"w{i}",)) for i in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        every = [pk for pks in claimed.values() for pk in pks]
+        self.assertEqual(len(every), 40)
+        self.assertEqual(len(set(every)), 40)
+
+
+def product(code, **fields):
+    record = {
+        "full_name_of_the_product": f"Phone {code}",
+        "color": "Black",
+        "memory_size": 128,
+        "seller": "Rozetka",
+        "regular_price": 1000,
+        "promotional_price": 900,
+        "product_code": code,
+        "number_of_reviews": 10,
+        "series": "X",
+        "screen_diagonal": "6.1",
+        "display_resolution": "2556x1179",
+        "product_specifications": {"product_specification_0": {"Екран": "6.1"}},
+        "all_product_photos": [f"https://content.rozetka.com.ua/{code}/1.jpg"],
+        "fingerprint": f"fp{code}",
+    }
+    record.update(fields)
+    return record
+
+
+class UpsertTest(TestCase):
+    def test_insert_writes_products_photos_and_prices(self):
+        mobiles = upsert_batch([product(1), product(2, all_product_photos=["a", "b", "a"])])
+        self.assertEqual(len(mobiles), 2)
+        self.assertEqual(Mobile.objects.get(product_code=1).fingerprint, "fp1")
+        self.assertEqual(sorted(Photo.objects.filter(mobile_id__product_code=2).values_list("url", flat=True)), ["a", "b"])
+        self.assertEqual(PriceObservation.objects.count(), 2)
+
+    def test_price_change_updates_the_same_product(self):
+        upsert_batch([product(1)])
+        first = Mobile.objects.get(product_code=1)
+
+        upsert_batch([product(1, regular_price=1100, all_product_photos=["https://content.rozetka.com.ua/1/1.jpg", "new"])])
+        self.assertEqual(Mobile.objects.count(), 1)
+        mobile = Mobile.objects.get(product_code=1)
+        self.assertEqual((mobile.pk, mobile.regular_price), (first.pk, 1100))
+        self.assertGreater(mobile.updated_at, first.updated_at)
+        self.assertEqual(Photo.objects.filter(mobile_id=mobile).count(), 2)
+        self.assertEqual(list(mobile.price_observations.order_by("observed_at").values_list("regular_price", flat=True)), [1000, 1100])
+
+    def test_unchanged_product_keeps_updated_at_and_history(self):
+        upsert_batch([product(1)])
+        first = Mobile.objects.get(product_code=1)
+        upsert_batch([product(1)])
+        self.assertEqual(Mobile.objects.get(product_code=1).updated_at, first.updated_at)
+        self.assertEqual(PriceObservation.objects.count(), 1)
+
+    def test_last_record_of_a_product_wins_within_a_batch(self):
+        upsert_batch([product(1, regular_price=1), product(1, regular_price=2)])
+        self.assertEqual(Mobile.objects.get(product_code=1).regular_price, 2)
+
+    def test_records_without_product_code_are_reported(self):
+        out = StringIO()
+        with redirect_stdout(out):
+            mobiles = upsert_products([product(1), product(None, full_name_of_the_product="Blocked page")], batch_size=1)
+        self.assertEqual(len(mobiles), 1)
+        self.assertIn("1 of 1 records without product_code", out.getvalue())
+        self.assertIn("Blocked page", out.getvalue())
+
+    def test_fields_the_page_does_not_show_are_stored_as_null(self):
+        upsert_batch([product(1, promotional_price=None, seller=None, series=None, product_specifications=None)])
+        mobile = Mobile.objects.get(product_code=1)
+        self.assertEqual((mobile.promotional_price, mobile.seller, mobile.series), (None, None, None))
+        self.assertEqual(mobile.product_specifications, {})
+        self.assertEqual(mobile.price_observations.get().promotional_price, None)
+
+        # stored as it came: the same record again is unchanged
+        updated_at = mobile.updated_at
+        upsert_batch([product(1, promotional_price=None, seller=None, series=None, product_specifications=None)])
+        self.assertEqual(Mobile.objects.get(product_code=1).updated_at, updated_at)
+
+    def test_rejected_record_does_not_lose_the_batch(self):
+        rejected = []
+        with redirect_stdout(StringIO()):
+            mobiles = upsert_products(
+                [product(1), product(2, regular_price=None), product(3)],
+                on_error=lambda record, error: rejected.append(record["product_code"]),
+            )
+        self.assertEqual(len(mobiles), 2)
+        self.assertEqual(rejected, [2])
+        self.assertEqual(sorted(Mobile.objects.values_list("product_code", flat=True)), [1, 3])
+
+    def test_stages_are_timed(self):
+        stages = []
+
+        def stage(name):
+            stages.append(name)
+            return transaction.atomic()
+
+        upsert_batch([product(1)], stage)
+        self.assertEqual(stages, ["db_write", "photo_insert", "price_history"])
+
+
+PNG = b"\x89PNG\r\n\x1a\n" + b"\x00" * 32
+RESPONSES = {
+    "/photo.png": (200, "image/png", PNG),
+    "/blocked.jpg": (200, "text/html; charset=utf-8", b"<html>Access denied</html>"),
+    "/untyped.jpg": (200, "", b"<html>Access denied</html>"),
+    "/gone.jpg": (404, "text/html", b"Not found"),
+}
+
+
+class PhotoServer(BaseHTTPRequestHandler):
+    def do_GET(self):
+        status, content_type, body = RESPONSES[self.path]
+        self.send_response(status)
+        if content_type:
+            self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@skipIf(aiohttp is None, "needs aiohttp")
+class DownloadPhotosTest(TransactionTestCase):
+    # the downloader reaches the database from its own thread, so the rows must be committed
+
+    def setUp(self):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), PhotoServer)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.root = tempfile.mkdtemp()
+        self.base = f"http://127.0.0.1:{self.server.server_port}"
+        upsert_batch([product(1, all_product_photos=[self.base + path for path in RESPONSES])])
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        shutil.rmtree(self.root)
+
+    def download(self, **options):
+        with redirect_stdout(StringIO()):
+            stats = download_photos(self.root, **options)
+        # the database calls ran on asgiref's executor thread: close its connection too, or the test database
+        # cannot be dropped
+        asyncio.run(sync_to_async(connections.close_all)())
+        return stats
+
+    def test_only_images_are_stored(self):
+        stats = self.download()
+        self.assertEqual((stats["downloaded"], stats["failed"], stats["photos"]), (1, 3, 1))
+
+        stored = Photo.objects.get(url=self.base + "/photo.png")
+        self.assertTrue(stored.file.endswith(".png"))
+        self.assertEqual(stored.failed_downloads, 0)
+        for photo in Photo.objects.exclude(pk=stored.pk):
+            self.assertEqual((photo.checksum, photo.failed_downloads), (None, 1))
+
+    def test_failing_urls_go_to_the_end_of_the_work_list(self):
+        self.download()
+        Photo.objects.create(url=self.base + "/photo.png?new", mobile_id=Mobile.objects.get())
+        self.assertEqual(_pending_urls(limit=1), [self.base + "/photo.png?new"])
@@ -1,3 +1,8 @@
-from django.shortcuts import render
+from django.http import HttpResponse
 
-# Create your views here.
+from .prometheus import database_samples, live_snapshots, render
+
+
+def metrics(request):
+    # scrape target for Prometheus: the live numbers of every scraper process on this machine + queue / photo gauges
+    return HttpResponse(render(live_snapshots(), database_samples()), content_type="text/plain; version=0.0.4; charset=utf-8")